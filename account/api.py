@@ -1,6 +1,7 @@
 from django.http import JsonResponse
 from rest_framework.response import Response
 from rest_framework import status
+from smdb.metrics import timed
 from .serializers import RoleSerializer, UserSerializer
 
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
@@ -14,7 +15,9 @@ from drf_spectacular.utils import (
 def me(request):
   user = request.user
   user_serializer = UserSerializer(user)
-  return JsonResponse(user_serializer.data, safe=False)
+  with timed("serialize"):
+    data = user_serializer.data
+  return JsonResponse(data, safe=False)
 
 @extend_schema(
     tags=["auth"],
@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import authenticate
 
+from smdb.metrics import timed
 from .serializers import UserSerializer
 
 # ⬇️ remplace ces imports drf_yasg :
@@ -98,7 +99,8 @@ class CustomLoginView(APIView):
 
         if user:
             refresh = RefreshToken.for_user(user)
-            user_data = UserSerializer(user).data
+            with timed("serialize"):
+                user_data = UserSerializer(user).data
 
             return Response({
                 'token': {
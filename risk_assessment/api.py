@@ -1,8 +1,9 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from rest_framework.decorators import api_view, authentication_classes, permission_classes, parser_classes
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from smdb.cache import REFERENCE_CACHE_TIMEOUT, bump_generation, versioned_json
 from .serializers import RiskAssementSerializer
 from .models import RiskAssessment
 from rest_framework.pagination import PageNumberPagination
@@ -91,6 +92,8 @@ def create_risk_assement(request):
             name=name,
         )
 
+        bump_generation('risk_assessments')
+
         serialized_risk = RiskAssementSerializer(risk)
         return JsonResponse(serialized_risk.data, status=status.HTTP_201_CREATED)
 
@@ -99,3 +102,45 @@ def create_risk_assement(request):
 
     except Exception as e:
         return JsonResponse({'message': f'Erreur inattendue : {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@extend_schema(
+    tags=["Risk Assessment"],
+    summary="Lister les assessments de risque",
+    description=(
+        "Retourne la **liste complète** des assessments (sans pagination).\n\n"
+        "La réponse est mise en cache et invalidée à chaque création d'assessment "
+        "(en-tête `X-Cache: HIT|MISS`)."
+    ),
+    responses={
+        200: OpenApiResponse(
+            response=RiskAssementSerializer(many=True),
+            description="Liste des assessments"
+        ),
+        500: OpenApiResponse(
+            response=inline_serializer(
+                name="RiskAssementListServerError",
+                fields={
+                    "message": serializers.CharField(),
+                    "error": serializers.CharField()
+                }
+            ),
+            description="Erreur interne"
+        ),
+    },
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def get_all_risk_assessment(request):
+    try:
+        body, hit = versioned_json(
+            'risk_assessments', 'all',
+            lambda: RiskAssementSerializer(RiskAssessment.objects.all(), many=True).data,
+            REFERENCE_CACHE_TIMEOUT,
+        )
+        response = HttpResponse(body, content_type='application/json', status=status.HTTP_200_OK)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+    except Exception as e:
+        return JsonResponse({'message': 'Internal server error', 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
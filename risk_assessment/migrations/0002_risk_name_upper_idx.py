@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:17
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("risk_assessment", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="riskassessment",
+            index=models.Index(
+                django.db.models.functions.text.Upper("name"),
+                name="risk_name_upper_idx",
+            ),
+        ),
+    ]
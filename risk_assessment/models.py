@@ -1,9 +1,16 @@
 import uuid
 from django.db import models
+from django.db.models.functions import Upper
 
 # Create your models here.
 
 class RiskAssessment(models.Model):
   id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
   name = models.CharField(max_length=100, blank=True, null=True)
-  created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+  created_at = models.DateTimeField(auto_now_add=True)
+
+  class Meta:
+    indexes = [
+      # Recherche par nom insensible à la casse (name__iexact : UPPER(name) = UPPER(%s) sur PostgreSQL)
+      models.Index(Upper('name'), name='risk_name_upper_idx'),
+    ]
@@ -1,3 +1,27 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from .models import RiskAssessment
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class RiskAssessmentListCacheTests(TestCase):
+    url = "/api/risk-assessment/all/"
+
+    def setUp(self):
+        cache.clear()
+        RiskAssessment.objects.create(name="Low")
+
+    def test_create_invalidates_cached_list(self):
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "HIT")
+
+        response = self.client.post("/api/risk-assessment/create/", {"name": "High"})
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(sorted(r["name"] for r in response.json()), ["High", "Low"])
+
+        stats = self.client.get("/api/cache/stats/").json()
+        self.assertGreaterEqual(stats["risk_assessments"]["hits"], 1)
@@ -1,20 +1,39 @@
 # views.py
-from openpyxl import load_workbook
+import tempfile
+
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.utils.text import slugify
 
 from rest_framework.decorators import api_view, authentication_classes, permission_classes, parser_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.pagination import PageNumberPagination
-from .serializers import SitesSerializer
+from smdb.cache import bump_generation
+from smdb.conditional import conditional_list
+from smdb.metrics import timed
+from .serializers import EXPANDABLE_RELATIONS, ImportJobSerializer, ImportUploadSerializer, SitesSerializer, SitesSyncSerializer
 from vendor.models import Vendor
 from account.models import User
 from risk_assessment.models import RiskAssessment
-from .models import Sites
+from .models import ImportJob, ImportUpload, Sites, SiteTombstone
+from .geo import LATITUDE_RANGE, LONGITUDE_RANGE, bbox_q, nearest_sites, parse_bbox, parse_coordinate
+from .importer import HEADERS as IMPORT_HEADERS, IMPORT_FORMATS, SitesImportError, import_sheets, read_import
+from .export import csv_lines, encode, error_report_lines, gzip_stream, ndjson_lines, write_xlsx
+from .jobs import record_dry_run
+from .bulk import BULK_MAX_ITEMS, create_sites
+from .uploads import UploadError, append_chunk, complete_upload, create_upload, delete_upload
+from .search import search_q, typeahead
+from .sync import changes_since
+from .stats import sites_stats
+from .projection import site_rows
+from .tiles import CLUSTER_MAX_ZOOM, MAX_ZOOM, get_tile
+from .pagination import InvalidCursor, get_page_size, is_paginated, paginate_keyset, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.db.models import Count
 from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
 # import pandas as pd
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
@@ -26,6 +45,18 @@ from drf_spectacular.utils import (
 from drf_spectacular.types import OpenApiTypes
 from rest_framework import serializers
 
+NEARBY_DEFAULT_K = 20
+NEARBY_MAX_RESULTS = 1000
+NEARBY_MAX_RADIUS_KM = 1000
+TYPEAHEAD_DEFAULT_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+
 @extend_schema(
     tags=["sites"],
     summary="Créer un site",
@@ -128,24 +159,32 @@ def create_site(request):
     zm = None
     if 'zm' in data:
         try:
-            zm = User.objects.get(id=data['zm'])
+            zm = User.objects.select_related('role', 'function').get(id=data['zm'])
         except User.DoesNotExist:
             return Response({"message": "Utilisateur (ZM) introuvable."}, status=status.HTTP_404_NOT_FOUND)
 
+    try:
+        latitude = parse_coordinate(data.get('latitude'), LATITUDE_RANGE)
+        longitude = parse_coordinate(data.get('longitude'), LONGITUDE_RANGE)
+    except (TypeError, ValueError):
+        return Response({"message": "Coordonnées invalides (latitude/longitude)."}, status=status.HTTP_400_BAD_REQUEST)
+
     # Préparation des données pour la création du site
     site_data = {
         'name': data['name'],
         'site_id': data['site_id'],
-        'latitude': data.get('latitude'),
-        'longitude': data.get('longitude'),
+        'latitude': latitude,
+        'longitude': longitude,
         'vendor': vendor,
         'risk_assessment': risk_assessment,
         'zm': zm
     }
 
     try:
-        # Création du site
-        site = Sites.objects.create(**site_data)
+        # Création du site (et de ses compteurs de statistiques, même transaction)
+        with transaction.atomic():
+            site = Sites.objects.create(**site_data)
+        bump_generation('sites')
         serialized_site = SitesSerializer(site)
         return Response(serialized_site.data, status=status.HTTP_201_CREATED)
     except Exception as e:
@@ -153,15 +192,133 @@ def create_site(request):
         return Response({"message": {str(e)}}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+BULK_RESULT = inline_serializer(
+    name="SitesBulkCreateResult",
+    fields={
+        "created": serializers.IntegerField(),
+        "failed": serializers.IntegerField(),
+        "results": serializers.ListField(child=inline_serializer(
+            name="SitesBulkCreateItem",
+            fields={
+                "index": serializers.IntegerField(),
+                "site_id": serializers.CharField(allow_null=True),
+                "id": serializers.UUIDField(allow_null=True),
+                "errors": serializers.ListField(child=serializers.CharField()),
+            },
+        )),
+    },
+)
+
+
+@extend_schema(
+    tags=["sites"],
+    summary="Créer des sites en lot",
+    description=(
+        f"Crée jusqu'à {BULK_MAX_ITEMS} sites en une requête : tableau JSON de payloads de "
+        "`POST create/` (`name`, `site_id`, `latitude`, `longitude`, `vendor`, `risk_assessment`, "
+        "`zm`, et `security_type`).\n\n"
+        "Les Vendor / RiskAssessment / ZM et les `site_id` existants sont vérifiés en une requête par "
+        "modèle pour tout le lot, puis les sites sont insérés par lots dans une seule transaction.\n\n"
+        "Chaque élément reçoit un résultat (même ordre, `index` dans le tableau) : `id` du site créé, "
+        "ou `errors` (champ requis, coordonnées, relation introuvable, `site_id` déjà en base ou "
+        "répété dans le lot).\n\n"
+        "**Modes** :\n"
+        "- par défaut, tout ou rien : une seule erreur n'enregistre aucun site (`400`) ;\n"
+        "- avec `?partial=1`, les éléments valides sont créés malgré les erreurs des autres "
+        "(`207` s'il y en a)."
+    ),
+    parameters=[
+        OpenApiParameter(
+            name="partial",
+            description="`1` pour créer les éléments valides même si d'autres sont en erreur",
+            required=False,
+            type=bool,
+            location=OpenApiParameter.QUERY,
+        ),
+    ],
+    request=inline_serializer(name="CreateSiteRequestItem", fields={
+        "name": serializers.CharField(),
+        "site_id": serializers.CharField(),
+        "latitude": serializers.FloatField(required=False, allow_null=True),
+        "longitude": serializers.FloatField(required=False, allow_null=True),
+        "vendor": serializers.UUIDField(required=False, allow_null=True),
+        "risk_assessment": serializers.UUIDField(required=False, allow_null=True),
+        "zm": serializers.UUIDField(required=False, allow_null=True),
+        "security_type": serializers.CharField(required=False, allow_null=True),
+    }, many=True),
+    responses={
+        201: OpenApiResponse(response=BULK_RESULT, description="Tous les sites ont été créés"),
+        207: OpenApiResponse(response=BULK_RESULT, description="Mode `partial=1` : sites valides créés, erreurs des autres"),
+        400: OpenApiResponse(
+            response=BULK_RESULT,
+            description="Au moins un élément invalide, aucun site créé (ou `message` : payload invalide)",
+        ),
+        409: OpenApiResponse(
+            response=inline_serializer(name="SitesBulkCreateConflict", fields={"message": serializers.CharField()}),
+            description="`site_id` créé entre-temps par une autre requête : aucun site créé",
+        ),
+    },
+    examples=[
+        OpenApiExample(
+            "Requête",
+            value=[
+                {"name": "KASALA", "site_id": "CDKN00001", "latitude": -4.325, "longitude": 15.322},
+                {"name": "GOMBE", "site_id": "CDKN00002", "vendor": "59a0f6f9-b6ec-4d5c-8a67-9f1e1d1b1c11"},
+            ],
+            request_only=True,
+        ),
+        OpenApiExample(
+            "Réponse 400 (tout ou rien)",
+            value={
+                "created": 0,
+                "failed": 1,
+                "results": [
+                    {"index": 0, "site_id": "CDKN00001", "id": None, "errors": []},
+                    {"index": 1, "site_id": "CDKN00002", "id": None, "errors": ["Fournisseur introuvable."]},
+                ],
+            },
+            response_only=True,
+        ),
+    ],
+)
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([])
+def bulk_create_sites(request):
+    items = request.data
+    if not isinstance(items, list) or not items:
+        return Response({"message": "Tableau JSON de sites attendu."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > BULK_MAX_ITEMS:
+        return Response(
+            {"message": f"{BULK_MAX_ITEMS} sites au plus par requête."}, status=status.HTTP_400_BAD_REQUEST
+        )
+    partial = request.GET.get("partial") in ("1", "true")
+    try:
+        results = create_sites(items, atomic=not partial)
+    except IntegrityError:
+        return Response(
+            {"message": "Un site_id a été créé entre-temps, aucun site créé : renvoyer le lot."},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    failed = sum(1 for result in results if result["errors"])
+    created = sum(1 for result in results if result["id"] is not None)
+    if not failed:
+        code = status.HTTP_201_CREATED
+    elif partial:
+        code = status.HTTP_207_MULTI_STATUS
+    else:
+        code = status.HTTP_400_BAD_REQUEST
+    return Response({"created": created, "failed": failed, "results": results}, status=code)
+
 
-def _norm(s: str) -> str:
-    """Normalise un en-tête: 'EI Site ID' -> 'ei_site_id'."""
-    return slugify(str(s).strip().lower()).replace('-', '_') if s is not None else ''
 @extend_schema(
     tags=["sites"],
-    summary="Importer des sites via Excel (.xlsx)",
+    summary="Importer des sites via Excel (.xlsx) ou CSV (.csv, .csv.gz)",
     description=(
-        "Importe des sites depuis un fichier Excel (.xlsx).\n\n"
+        "Importe des sites depuis un fichier Excel (.xlsx, toutes les feuilles) ou CSV (.csv, ou "
+        ".csv.gz compressé en gzip ; UTF-8, séparateur `,`, `;` ou tabulation). Le CSV est lu en "
+        "flux, sans le coût d'analyse du XML d'un classeur : format conseillé pour les gros flux.\n\n"
         "**Colonnes attendues (insensibles à la casse/espaces)** :\n"
         "- `EI Site ID` → `site_id`\n"
         "- `Site Name` → `name`\n"
@@ -171,11 +328,52 @@ def _norm(s: str) -> str:
         "- `risk_assessment` → correspond à **RiskAssessment.name** (insensible à la casse)\n"
         "- `zm` → correspond à **User.id** (UUID)\n\n"
         "**Règles** :\n"
-        "- Si `site_id` existe déjà, la ligne est ignorée (compteur `skipped`).\n"
+        "- Si `site_id` existe déjà, la ligne est ignorée (compteur `skipped`), ou met à jour le site "
+        "avec `?on_conflict=update`.\n"
         "- Les valeurs manquantes sur `name`/`site_id` font ignorer la ligne avec message dans `errors`.\n"
         "- Les Vendor/RiskAssessment/ZM inconnus n’empêchent pas la création du site : "
-        "la ligne est créée sans le lien et un message est ajouté dans `errors`."
+        "la ligne est créée sans le lien et un message est ajouté dans `errors`.\n\n"
+        "**Traitement** :\n"
+        "- Par défaut le fichier est enregistré et importé en arrière-plan (worker "
+        "`python manage.py process_import_jobs`) : réponse `202` avec l'`id` du job, "
+        "à suivre via `GET /api/sites/import-jobs/<id>/`.\n"
+        "- Avec `?sync=1`, l'import est fait dans la requête et le résumé est renvoyé (`200`) ; "
+        "limité à `IMPORT_SYNC_MAX_ROWS` lignes (5 000 par défaut, hors simulation), au-delà `400`.\n\n"
+        "**Simulation** (`?dry_run=1`) : toutes les lignes sont validées (champs requis, doublons de "
+        "`site_id` dans le fichier et en base, Vendor / RiskAssessment / ZM inconnus, coordonnées) "
+        "sans rien écrire. `created` / `skipped` annoncent ce que ferait l'import ; le résumé ne "
+        "contient que les 100 premières erreurs, le rapport complet (CSV) est téléchargeable via "
+        "`error_report`. Combinable avec `sync=1` ou traitée en arrière-plan comme un import.\n\n"
+        "**Mise à jour** (`?on_conflict=update`) : un site existant (même `site_id`) reçoit les valeurs "
+        "des colonnes présentes dans le fichier (cellule vide : valeur effacée ; Vendor / RiskAssessment "
+        "/ ZM introuvable : lien conservé). Les sites sont comparés par lots et seuls ceux qui changent "
+        "sont écrits : `updated` / `unchanged` les comptent. Un `site_id` répété dans le fichier reste "
+        "ignoré après sa première ligne."
     ),
+    parameters=[
+        OpenApiParameter(
+            name="sync",
+            description="`1` pour importer dans la requête et recevoir directement le résumé",
+            required=False,
+            type=bool,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name="dry_run",
+            description="`1` pour valider le fichier sans rien importer",
+            required=False,
+            type=bool,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name="on_conflict",
+            description="Ligne dont le `site_id` existe déjà : `skip` (défaut) l'ignore, `update` met le site à jour",
+            required=False,
+            type=str,
+            enum=[value for value, _ in ImportJob.ON_CONFLICT_CHOICES],
+            location=OpenApiParameter.QUERY,
+        ),
+    ],
     request={
         "multipart/form-data": {
             "type": "object",
@@ -190,13 +388,18 @@ def _norm(s: str) -> str:
             response=inline_serializer(
                 name="SitesImportSummary",
                 fields={
+                    "processed": serializers.IntegerField(),
                     "created": serializers.IntegerField(),
+                    "updated": serializers.IntegerField(),
+                    "unchanged": serializers.IntegerField(),
                     "skipped": serializers.IntegerField(),
                     "errors": serializers.ListField(child=serializers.CharField()),
                 },
             ),
-            description="Résumé de l'import"
+            description="Résumé de l'import (mode `sync=1`) ; avec `dry_run=1` : job de simulation "
+                        "(ImportJob, 100 premières erreurs)"
         ),
+        202: OpenApiResponse(response=ImportJobSerializer, description="Import mis en file d'attente"),
         400: OpenApiResponse(
             response=inline_serializer(name="ImportBadRequest", fields={"message": serializers.CharField()}),
             description="Requête invalide / fichier manquant / format incorrect"
@@ -209,12 +412,15 @@ def _norm(s: str) -> str:
     examples=[
         OpenApiExample(
             "Entêtes attendues",
-            value={"headers": ["EI Site ID", "Site Name", "Latitude", "Longitude", "Vendor", "risk_assessment", "zm", "security_type"]},
+            value={"headers": IMPORT_HEADERS},
             response_only=True,
         ),
         OpenApiExample(
             "Réponse 200 (exemple)",
-            value={"created": 42, "skipped": 3, "errors": ["L7: Vendor introuvable (name='Unknown')."]},
+            value={
+                "processed": 45, "created": 42, "updated": 0, "unchanged": 0, "skipped": 3,
+                "errors": ["L7: Vendor introuvable (name='Unknown')."],
+            },
             response_only=True,
         ),
         OpenApiExample(
@@ -232,102 +438,344 @@ def import_sites_excel(request):
     f = request.FILES.get("file")
     if not f:
         return Response({"message": "Aucun fichier reçu (champ 'file')."}, status=400)
-    if not f.name.lower().endswith(".xlsx"):
-        return Response({"message": "Format non supporté. Utilise un .xlsx."}, status=400)
+    if not f.name.lower().endswith(IMPORT_FORMATS):
+        return Response({"message": "Format non supporté. Utilise un .xlsx, .csv ou .csv.gz."}, status=400)
 
     try:
-        wb = load_workbook(f, read_only=True, data_only=True)
-        ws = wb.active
-    except Exception as e:
-        return Response({"message": f"Lecture Excel impossible: {e}"}, status=400)
+        dry_run, on_conflict = _import_options(request)
+    except ValueError as e:
+        return Response({"message": str(e)}, status=400)
+
+    # Mode synchrone (petits fichiers) : import dans la requête, résumé direct
+    if request.GET.get("sync") in ("1", "true"):
+        started_at = timezone.now()
+        try:
+            # Lecture dans la requête, sans pool de processus (réservé au worker). Une seule
+            # transaction : taille bornée pour qu'elle soit validée dans le délai de sync.SETTLE_SECONDS
+            summary = import_sheets(
+                read_import(f, f.name), dry_run=dry_run, on_conflict=on_conflict,
+                max_rows=None if dry_run else settings.IMPORT_SYNC_MAX_ROWS,
+            )
+        except SitesImportError as e:
+            return Response({"message": e.message}, status=400)
+        if dry_run:
+            # Simulation enregistrée comme un job terminé : rapport d'erreurs complet téléchargeable
+            job = record_dry_run(f.name, summary, started_at, on_conflict)
+            return Response(ImportJobSerializer(job).data, status=200)
+        return Response(summary, status=200)
+
+    # Mode par défaut : le fichier est enregistré et traité par le worker `process_import_jobs`
+    job = ImportJob.objects.create(file=f, file_name=f.name, dry_run=dry_run, on_conflict=on_conflict)
+    return Response(ImportJobSerializer(job).data, status=202)
+
+
+@extend_schema(
+    tags=["sites"],
+    summary="Suivre un import de sites",
+    description=(
+        "Retourne l'état d'un import en arrière-plan : `status` (`pending`, `running`, `done`, `failed`), "
+        "lignes traitées, créées, ignorées, erreurs (les 100 premières ; leur nombre dans `error_count`, "
+        "toutes dans le rapport CSV `error_report` une fois l'import terminé) "
+        "et débit en lignes/seconde."
+    ),
+    responses={
+        200: OpenApiResponse(response=ImportJobSerializer, description="État du job"),
+        404: OpenApiResponse(
+            response=inline_serializer(name="ImportJobNotFound", fields={"message": serializers.CharField()}),
+            description="Job introuvable"
+        ),
+    },
+)
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([])
+def get_import_job(request, job_id):
+    try:
+        job = ImportJob.objects.get(id=job_id)
+    except ImportJob.DoesNotExist:
+        return Response({"message": "Import introuvable."}, status=404)
+    return Response(ImportJobSerializer(job).data)
+
+@extend_schema(
+    tags=["sites"],
+    summary="Rapport d'erreurs d'un import (CSV)",
+    description=(
+        "Toutes les erreurs d'un import ou d'une simulation (`dry_run`) terminé, au format CSV "
+        "(colonnes `feuille`, `ligne`, `erreur`)."
+    ),
+    responses={
+        (200, "text/csv"): OpenApiTypes.STR,
+        404: OpenApiResponse(
+            response=inline_serializer(name="ImportJobErrorsNotFound", fields={"message": serializers.CharField()}),
+            description="Job introuvable"
+        ),
+    },
+)
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([])
+def get_import_job_errors(request, job_id):
+    try:
+        job = ImportJob.objects.get(id=job_id)
+    except ImportJob.DoesNotExist:
+        return Response({"message": "Import introuvable."}, status=404)
+    response = StreamingHttpResponse(encode(error_report_lines(job.errors)), content_type="text/csv")
+    response['Content-Disposition'] = f'attachment; filename="import-{job.id}-erreurs.csv"'
+    return response
+
+
+def _import_options(request):
+    """(dry_run, on_conflict) des query params d'un import ; ValueError si on_conflict est invalide."""
+    on_conflict = request.GET.get("on_conflict", ImportJob.SKIP)
+    if on_conflict not in dict(ImportJob.ON_CONFLICT_CHOICES):
+        raise ValueError("on_conflict invalide (skip ou update).")
+    return request.GET.get("dry_run") in ("1", "true"), on_conflict
+
+
+def _upload_error(error):
+    body = {"message": error.message}
+    if error.offset is not None:
+        body["offset"] = error.offset
+    return Response(body, status=error.status)
+
+
+UPLOAD_ERROR = inline_serializer(
+    name="ImportUploadError",
+    fields={"message": serializers.CharField(), "offset": serializers.IntegerField(required=False)},
+)
+
+
+@extend_schema(
+    tags=["sites"],
+    summary="Démarrer un upload par morceaux",
+    description=(
+        "Upload reprenable des gros fichiers d'import (.xlsx, .csv, .csv.gz) :\n"
+        "1. `POST uploads/create/` avec le nom et la taille du fichier ;\n"
+        "2. `PUT uploads/<id>/chunk/?offset=N` pour chaque morceau (corps brut, "
+        "`application/octet-stream`), dans l'ordre ; après une déconnexion, `GET uploads/<id>/` "
+        "donne l'`offset` à partir duquel reprendre ;\n"
+        "3. `POST uploads/<id>/complete/` avec le SHA-256 du fichier : le fichier assemblé est "
+        "vérifié puis importé en arrière-plan comme par `import-excel/` (mêmes `dry_run` / `on_conflict`).\n\n"
+        "Les morceaux sont écrits sur disque au fil de la réception : ni le fichier ni un morceau "
+        "n'est gardé en mémoire. Un upload non finalisé expire après "
+        "`IMPORT_UPLOAD_EXPIRY_HOURS` heures sans nouveau morceau ; un upload finalisé est supprimé "
+        "une fois son import terminé (suivre alors le job)."
+    ),
+    request=inline_serializer(
+        name="ImportUploadCreate",
+        fields={"file_name": serializers.CharField(), "size": serializers.IntegerField()},
+    ),
+    responses={
+        201: OpenApiResponse(response=ImportUploadSerializer, description="Upload créé (`offset` = 0)"),
+        400: OpenApiResponse(response=UPLOAD_ERROR, description="Format ou taille invalide"),
+    },
+)
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([])
+def create_import_upload(request):
+    try:
+        size = int(request.data.get("size"))
+    except (TypeError, ValueError):
+        return Response({"message": "Champ 'size' (octets) requis."}, status=400)
+    try:
+        upload = create_upload(request.data.get("file_name"), size)
+    except UploadError as e:
+        return _upload_error(e)
+    return Response(ImportUploadSerializer(upload).data, status=201)
+
+
+@extend_schema(
+    tags=["sites"],
+    summary="État d'un upload par morceaux",
+    description="Octets reçus (`offset` : position du prochain morceau) et job créé par la finalisation.",
+    responses={
+        200: OpenApiResponse(response=ImportUploadSerializer, description="État de l'upload"),
+        404: OpenApiResponse(response=UPLOAD_ERROR, description="Upload introuvable"),
+    },
+)
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([])
+def get_import_upload(request, upload_id):
+    try:
+        upload = ImportUpload.objects.get(id=upload_id)
+    except ImportUpload.DoesNotExist:
+        return Response({"message": "Upload introuvable."}, status=404)
+    return Response(ImportUploadSerializer(upload).data)
+
+
+@extend_schema(
+    tags=["sites"],
+    summary="Envoyer un morceau d'un upload",
+    description=(
+        "Corps brut du morceau, écrit à la position `offset`, qui doit être l'`offset` courant de "
+        "l'upload (sinon `409` avec l'`offset` attendu). Un morceau interrompu n'est pas compté : "
+        "le renvoyer depuis le même `offset`.\n\n"
+        "L'en-tête `Content-Length` est requis : un corps envoyé en `Transfer-Encoding: chunked` "
+        "est refusé (`411`), la taille du morceau devant être connue avant son écriture."
+    ),
+    parameters=[
+        OpenApiParameter(
+            name="offset", description="Position du morceau dans le fichier (octets)", required=True,
+            type=int, location=OpenApiParameter.QUERY,
+        ),
+    ],
+    request={"application/octet-stream": {"type": "string", "format": "binary"}},
+    responses={
+        200: OpenApiResponse(response=ImportUploadSerializer, description="Morceau enregistré"),
+        400: OpenApiResponse(response=UPLOAD_ERROR, description="Offset manquant, morceau vide, incomplet ou trop long"),
+        404: OpenApiResponse(response=UPLOAD_ERROR, description="Upload introuvable"),
+        409: OpenApiResponse(response=UPLOAD_ERROR, description="Offset inattendu ou upload déjà finalisé"),
+        411: OpenApiResponse(response=UPLOAD_ERROR, description="En-tête `Content-Length` absent"),
+    },
+)
+@api_view(["PUT"])
+@parser_classes([])  # corps lu en flux par append_chunk, jamais chargé par un parser
+@authentication_classes([])
+@permission_classes([])
+def append_import_upload_chunk(request, upload_id):
+    try:
+        upload = ImportUpload.objects.get(id=upload_id)
+    except ImportUpload.DoesNotExist:
+        return Response({"message": "Upload introuvable."}, status=404)
+    try:
+        offset = int(request.GET["offset"])
+    except (KeyError, ValueError):
+        return Response({"message": "Paramètre 'offset' requis."}, status=400)
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or "")
+    except ValueError:
+        return Response(
+            {"message": "En-tête Content-Length requis (Transfer-Encoding: chunked non supporté)."}, status=411
+        )
+    try:
+        upload = append_chunk(upload, offset, request.stream, length)
+    except UploadError as e:
+        return _upload_error(e)
+    return Response(ImportUploadSerializer(upload).data)
+
 
-    rows = ws.iter_rows(values_only=True)
+@extend_schema(
+    tags=["sites"],
+    summary="Finaliser un upload par morceaux",
+    description=(
+        "Vérifie que tous les octets sont reçus, puis crée l'import en arrière-plan du fichier "
+        "assemblé (`202`, sans copie du fichier). Le SHA-256 (hexadécimal) est vérifié par le worker "
+        "avant l'import, sans relire le fichier pendant la requête : s'il diffère, le job passe en "
+        "`failed` et le fichier est à renvoyer. Répéter la finalisation renvoie le même job (`200`)."
+    ),
+    parameters=[
+        OpenApiParameter(
+            name="dry_run", description="`1` pour valider le fichier sans rien importer",
+            required=False, type=bool, location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name="on_conflict",
+            description="Ligne dont le `site_id` existe déjà : `skip` (défaut) l'ignore, `update` met le site à jour",
+            required=False, type=str, enum=[value for value, _ in ImportJob.ON_CONFLICT_CHOICES],
+            location=OpenApiParameter.QUERY,
+        ),
+    ],
+    request=inline_serializer(name="ImportUploadComplete", fields={"sha256": serializers.CharField()}),
+    responses={
+        200: OpenApiResponse(response=ImportJobSerializer, description="Upload déjà finalisé : son job"),
+        202: OpenApiResponse(response=ImportJobSerializer, description="Import mis en file d'attente"),
+        400: OpenApiResponse(response=UPLOAD_ERROR, description="Somme de contrôle mal formée ou paramètre invalide"),
+        404: OpenApiResponse(response=UPLOAD_ERROR, description="Upload introuvable"),
+        409: OpenApiResponse(response=UPLOAD_ERROR, description="Upload incomplet (`offset` reçu)"),
+    },
+)
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([])
+def complete_import_upload(request, upload_id):
+    try:
+        upload = ImportUpload.objects.select_related('job').get(id=upload_id)
+    except ImportUpload.DoesNotExist:
+        return Response({"message": "Upload introuvable."}, status=404)
+    try:
+        dry_run, on_conflict = _import_options(request)
+    except ValueError as e:
+        return Response({"message": str(e)}, status=400)
     try:
-        header = next(rows)
-    except StopIteration:
-        return Response({"message": "Fichier vide."}, status=400)
+        job, created = complete_upload(upload, request.data.get("sha256"), dry_run=dry_run, on_conflict=on_conflict)
+    except UploadError as e:
+        return _upload_error(e)
+    return Response(ImportJobSerializer(job).data, status=202 if created else 200)
 
-    # Normalisation des entêtes
-    norm_headers = [_norm(h) for h in header]
-    idx = {h: i for i, h in enumerate(norm_headers)}
 
-    # Mapping des entêtes du fichier vers les champs Django
-    # (EI Site ID -> site_id, Site Name -> name)
-    required_map = {"ei_site_id": "site_id", "site_name": "name"}
-    for needed in required_map.keys():
-        if needed not in idx:
-            return Response({"message": f"Colonne requise manquante: {needed}."}, status=400)
+@extend_schema(
+    tags=["sites"],
+    summary="Abandonner un upload par morceaux",
+    description="Supprime l'upload et les octets reçus (le fichier d'un upload finalisé reste à son import).",
+    responses={
+        204: OpenApiResponse(description="Upload supprimé"),
+        404: OpenApiResponse(response=UPLOAD_ERROR, description="Upload introuvable"),
+    },
+)
+@api_view(["DELETE"])
+@authentication_classes([])
+@permission_classes([])
+def delete_import_upload(request, upload_id):
+    try:
+        upload = ImportUpload.objects.get(id=upload_id)
+    except ImportUpload.DoesNotExist:
+        return Response({"message": "Upload introuvable."}, status=404)
+    delete_upload(upload)
+    return Response(status=204)
+
 
-    created, skipped, errors = 0, 0, []
+def _sites_filters(request):
+    """
+    Filtres communs à la liste et aux exports de sites (query params `vendor`,
+    `risk_assessment`, `security_type`, `filter`, `bbox`). Lève ValueError si
+    un paramètre est invalide.
+    """
+    vendor_id = request.GET.get('vendor')
+    risk_assessment = request.GET.get('risk_assessment')
+    security_type_name = request.GET.get('security_type')
+    search_filter = request.GET.get('filter', '').strip()
+    bbox = request.GET.get('bbox')
 
-    for rnum, row in enumerate(rows, start=2):
+    filters = Q()
+    if vendor_id:
+        filters &= Q(vendor__id=vendor_id)
+    if risk_assessment:
+        filters &= Q(risk_assessment__id=risk_assessment)
+    if security_type_name:
+        filters &= Q(security_type=security_type_name)
+    if search_filter:
+        # Index de recherche (FTS5 / trigrammes) plutôt qu'un LIKE '%x%' sur toute la table
+        filters &= search_q(search_filter)
+    if bbox:
         try:
-            def get_col(key_norm):
-                i = idx.get(key_norm)
-                if i is None:
-                    return None
-                val = row[i]
-                return None if val in (None, "") else val
-
-            site_id = str(get_col("ei_site_id") or "").strip()
-            name = str(get_col("site_name") or "").strip()
-            if not site_id or not name:
-                skipped += 1
-                errors.append(f"L{rnum}: 'site_id' ou 'name' manquant.")
-                continue
-
-            # Doublon → on ignore
-            if Sites.objects.filter(site_id=site_id).exists():
-                skipped += 1
-                continue
-
-            latitude = get_col("latitude")
-            longitude = get_col("longitude")
-            security_type = get_col("security_type")
-
-            # Vendor par NOM
-            vendor_obj = None
-            vendor_name = get_col("vendor")
-            if vendor_name:
-                vendor_obj = Vendor.objects.filter(name__iexact=str(vendor_name).strip()).first()
-                if not vendor_obj:
-                    errors.append(f"L{rnum}: Vendor introuvable (name='{vendor_name}').")
-
-            # RiskAssessment par NOM
-            ra_obj = None
-            ra_name = get_col("risk_assessment")
-            if ra_name:
-                ra_obj = RiskAssessment.objects.filter(name__iexact=str(ra_name).strip()).first()
-                if not ra_obj:
-                    errors.append(f"L{rnum}: RiskAssessment introuvable (name='{ra_name}').")
-
-            # ZM par ID (UUID)
-            zm_obj = None
-            zm_id = get_col("zm")
-            if zm_id:
-                try:
-                    zm_obj = User.objects.get(id=str(zm_id).strip())
-                except User.DoesNotExist:
-                    errors.append(f"L{rnum}: User (ZM) introuvable (id='{zm_id}').")
-                except Exception as e:
-                    errors.append(f"L{rnum}: ID ZM invalide ({zm_id}): {e}")
-
-            Sites.objects.create(
-                name=name,
-                site_id=site_id,
-                latitude=str(latitude).strip() if latitude is not None else None,
-                longitude=str(longitude).strip() if longitude is not None else None,
-                vendor=vendor_obj,
-                risk_assessment=ra_obj,
-                zm=zm_obj,
-                security_type=str(security_type).strip() if security_type is not None else None
-            )
-            created += 1
+            min_lon, min_lat, max_lon, max_lat = parse_bbox(bbox)
+        except ValueError:
+            raise ValueError("bbox invalide (attendu: minLon,minLat,maxLon,maxLat).")
+        filters &= bbox_q(min_lon, min_lat, max_lon, max_lat)
+    return filters
 
-        except Exception as e:
-            errors.append(f"L{rnum}: {e}")
 
-    return Response({"created": created, "skipped": skipped, "errors": errors}, status=200)
+def _sites_representation(request):
+    """
+    (fields, expand) demandés par les query params `fields` et `expand`
+    (listes séparées par des virgules ; None si absent). Lève ValueError si
+    un nom est inconnu.
+    """
+    representation = []
+    for param, allowed in (('fields', SitesSerializer.Meta.fields), ('expand', EXPANDABLE_RELATIONS)):
+        raw = request.GET.get(param)
+        if raw is None:
+            representation.append(None)
+            continue
+        names = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise ValueError(f"{param} inconnu(s): {', '.join(unknown)} (attendu: {', '.join(allowed)}).")
+        representation.append(names)
+    return tuple(representation)
+
 
 @extend_schema(
     tags=["sites"],
@@ -337,7 +785,21 @@ def import_sites_excel(request):
         "**Filtres (query params)** :\n"
         "- `vendor` : UUID du Vendor (FK)\n"
         "- `risk_assessment` : UUID du RiskAssessment (FK)\n"
-        "- `filter` : recherche texte (icontains) sur `name` et `site_id`"
+        "- `filter` : recherche texte (icontains) sur `name` et `site_id`\n"
+        "- `bbox` : `minLon,minLat,maxLon,maxLat`, sites dans la zone affichée (carte)\n\n"
+        "**Représentation (optionnelle)** :\n"
+        "- `fields` : champs à retourner, ex: `site_id,name,latitude,longitude`\n"
+        "- `expand` : relations retournées en objets imbriqués (`vendor`, `risk_assessment`, `zm`) ; "
+        "les autres le sont par leur id. Sans `expand` toutes sont imbriquées, `expand=` n'en imbrique aucune.\n"
+        "Seules les colonnes et jointures nécessaires sont lues.\n\n"
+        "**Pagination (optionnelle)** :\n"
+        "Si `page_size` ou `cursor` est fourni, la réponse est paginée par curseur "
+        "(keyset sur `created_at`, `id`) : `{\"next\": <url|null>, \"results\": [...]}`. "
+        "Suivre `next` pour obtenir la page suivante ; les filtres restent appliqués.\n\n"
+        "**Requête conditionnelle** : la réponse porte `ETag` et `Last-Modified`. "
+        "Renvoyer l'`ETag` dans `If-None-Match` (ou `Last-Modified` dans `If-Modified-Since`, "
+        "précis à la seconde) donne `304 Not Modified` (sans corps) tant qu'aucun site n'a été "
+        "ajouté, modifié ou supprimé."
     ),
     parameters=[
         OpenApiParameter(
@@ -368,12 +830,55 @@ def import_sites_excel(request):
             type=str,
             location=OpenApiParameter.QUERY,
         ),
+        OpenApiParameter(
+            name="bbox",
+            description="Zone `minLon,minLat,maxLon,maxLat` (degrés WGS84), ex: `15.2,-4.4,15.4,-4.2`",
+            required=False,
+            type=str,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name="fields",
+            description="Champs à retourner, séparés par des virgules",
+            required=False,
+            type=str,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name="expand",
+            description="Relations à imbriquer (`vendor`, `risk_assessment`, `zm`) ; vide : ids seulement",
+            required=False,
+            type=str,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name="page_size",
+            description=f"Active la pagination ; taille de page (défaut {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE})",
+            required=False,
+            type=int,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name="cursor",
+            description="Curseur opaque renvoyé dans `next` par la page précédente",
+            required=False,
+            type=str,
+            location=OpenApiParameter.QUERY,
+        ),
     ],
     responses={
         200: OpenApiResponse(
             response=SitesSerializer(many=True),
             description="Liste des sites"
         ),
+        304: OpenApiResponse(description="Liste inchangée depuis l'`ETag` fourni"),
+        400: OpenApiResponse(
+            response=inline_serializer(
+                name="SitesListBadRequest",
+                fields={"message": serializers.CharField()}
+            ),
+            description="Curseur, bbox, fields ou expand invalide"
+        ),
         500: OpenApiResponse(
             response=inline_serializer(
                 name="SitesListServerError",
@@ -390,8 +895,8 @@ def import_sites_excel(request):
                     "id": "0b8c2b3e-9f3b-4a1e-bf4b-1f3f1d2c9a11",
                     "name": "KASALA",
                     "site_id": "CDKN00001",
-                    "latitude": "-4.325",
-                    "longitude": "15.322",
+                    "latitude": -4.325,
+                    "longitude": 15.322,
                     "vendor": "59a0f6f9-4258-4fff-9a7c-0e103deffab1",
                     "risk_assessment": "3b4d0348-0c7c-4f18-9e0b-1b796b7b9d10",
                     "zm": "c7b0c8b1-1c0e-4803-8d6e-3a1b799c9f22",
@@ -402,7 +907,7 @@ def import_sites_excel(request):
         )
     ],
 )
-
+@conditional_list('sites', Sites, changed_at='updated_at', deletions=(SiteTombstone, 'deleted_at'))
 @api_view(['GET'])
 @authentication_classes([])
 @permission_classes([])
@@ -410,40 +915,32 @@ def get_all_sites(request):
     """
     Récupère tous les sites enregistrés.
     """
-    vendor_id = request.GET.get('vendor')
-    risk_assessment = request.GET.get('risk_assessment')
-    security_type_name = request.GET.get('security_type')
-    search_filter = request.GET.get('filter', '').strip()
-
-    filters = Q()
-    if vendor_id:
-        filters &= Q(vendor__id=vendor_id)
-    if risk_assessment:
-        filters &= Q(risk_assessment__id=risk_assessment)
-    if security_type_name:
-        filters &= Q(security_type=security_type_name)
-    if search_filter:
-        filters &= (
-            Q(name__icontains=search_filter) |
-            Q(site_id__icontains=search_filter) 
-            # Q(si__icontains=search_filter) |
-    #         Q(email__icontains=search_filter) |
-    #         Q(telephone__icontains=search_filter) |
-    #         Q(address__icontains=search_filter)
-        )
+    try:
+        filters = _sites_filters(request)
+        fields, expand = _sites_representation(request)
+    except ValueError as e:
+        return Response({"message": str(e)}, status=400)
     try:
         # Récupérer tous les sites
         # sites = Sites.objects.all()
-        sites = Sites.objects.filter(filters).distinct().order_by('-created_at')
-
-        
-
+        sites = Sites.objects.filter(filters).order_by('-created_at')
 
-        # Sérialiser les sites
-        serializer = SitesSerializer(sites, many=True)
+        # Mode paginé (keyset) si page_size / cursor est fourni
+        if is_paginated(request):
+            try:
+                page, next_url = paginate_keyset(sites.only('id', 'created_at'), request)
+            except InvalidCursor:
+                return Response({"message": "Curseur invalide."}, status=400)
+            page_sites = Sites.objects.filter(pk__in=[site.pk for site in page]).order_by('-created_at', '-id')
+            with timed("serialize"):
+                results = site_rows(page_sites, fields, expand)
+            return Response({"next": next_url, "results": results})
 
-        # Réponse avec pagination
-        return Response(serializer.data)
+        # Même représentation que SitesSerializer, lue par `values_list` (sites.projection) :
+        # seules les colonnes demandées, sans instancier de modèle par site
+        with timed("serialize"):
+            rows = site_rows(sites, fields, expand)
+        return Response(rows)
 
     except Exception as e:
         
@@ -452,4 +949,339 @@ def get_all_sites(request):
             {"message": str(e)},
             status=500
         )
-    
\ No newline at end of file
+
+
+@extend_schema(
+    tags=["sites"],
+    summary="Synchronisation incrémentale des sites",
+    description=(
+        "Retourne uniquement ce qui a changé depuis `cursor` : sites créés ou modifiés "
+        "(`upserted`) et ids des sites supprimés (`deleted`).\n\n"
+        "- Sans `cursor` : tout l'inventaire (synchronisation initiale)\n"
+        "- Conserver le `cursor` renvoyé et le repasser à l'appel suivant ; "
+        "tant que `has_more` est vrai, rappeler immédiatement avec ce `cursor`\n\n"
+        "Les modifications des dernières secondes sont transmises à la synchronisation suivante."
+    ),
+    parameters=[
+        OpenApiParameter(name="cursor", description="Curseur renvoyé par la synchronisation précédente", required=False, type=str, location=OpenApiParameter.QUERY),
+        OpenApiParameter(
+            name="page_size",
+            description=f"Nombre maximal de modifications (défaut {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE})",
+            required=False,
+            type=int,
+            location=OpenApiParameter.QUERY,
+        ),
+    ],
+    responses={
+        200: OpenApiResponse(
+            response=inline_serializer(
+                name="SitesSyncResponse",
+                fields={
+                    "upserted": SitesSyncSerializer(many=True),
+                    "deleted": serializers.ListField(child=serializers.UUIDField()),
+                    "cursor": serializers.CharField(allow_null=True),
+                    "has_more": serializers.BooleanField(),
+                }
+            ),
+            description="Modifications depuis le curseur"
+        ),
+        400: OpenApiResponse(
+            response=inline_serializer(name="SitesSyncBadRequest", fields={"message": serializers.CharField()}),
+            description="Curseur invalide"
+        ),
+    },
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def sync_sites(request):
+    """
+    Modifications (créations, mises à jour, suppressions) depuis un curseur.
+    """
+    try:
+        upserted, deleted, cursor, has_more = changes_since(request.GET.get('cursor'), get_page_size(request))
+    except InvalidCursor:
+        return Response({"message": "Curseur invalide."}, status=400)
+    return Response({
+        "upserted": SitesSyncSerializer(upserted, many=True).data,
+        "deleted": deleted,
+        "cursor": cursor,
+        "has_more": has_more,
+    })
+
+
+@extend_schema(
+    tags=["sites"],
+    summary="Statistiques des sites (tableau de bord)",
+    description=(
+        "Nombre total de sites et répartition par vendor, risk_assessment, security_type et zm "
+        "(ordre décroissant ; `id` / valeur `null` : non renseigné).\n\n"
+        "Lues dans un résumé tenu à jour à chaque création, import ou suppression de site. "
+        "`live=1` recalcule les compteurs sur la table des sites."
+    ),
+    parameters=[
+        OpenApiParameter(name="live", description="`1` : compteurs calculés sur la table des sites", required=False, type=bool, location=OpenApiParameter.QUERY),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description="Statistiques",
+            examples=[
+                OpenApiExample(
+                    "Exemple",
+                    value={
+                        "total": 1250,
+                        "by_vendor": [{"id": "59a0f6f9-4258-4fff-9a7c-0e103deffab1", "name": "Global-Tech", "count": 900}],
+                        "by_risk_assessment": [{"id": None, "name": None, "count": 1250}],
+                        "by_security_type": [{"security_type": "Guard", "count": 700}],
+                        "by_zm": [{"id": "c7b0c8b1-1c0e-4803-8d6e-3a1b799c9f22", "name": "Jean K.", "count": 40}],
+                    },
+                )
+            ],
+        ),
+    },
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def get_sites_stats(request):
+    """
+    Compteurs du tableau de bord.
+    """
+    return Response(sites_stats(live=request.GET.get('live') in ('1', 'true')))
+
+
+@extend_schema(
+    tags=["sites"],
+    summary="Sites les plus proches d'un point",
+    description=(
+        "Retourne les sites les plus proches de (`lat`, `lon`), triés par distance, "
+        "chacun avec `distance_km`.\n\n"
+        "- `k` seul : les `k` plus proches (défaut 20)\n"
+        "- `radius_km` : tous les sites dans le rayon (au plus `k`, défaut/maximum "
+        f"{NEARBY_MAX_RESULTS})\n\n"
+        "Seuls les sites de la zone englobant le cercle sont lus (index latitude/longitude)."
+    ),
+    parameters=[
+        OpenApiParameter(name="lat", description="Latitude du point", required=True, type=float, location=OpenApiParameter.QUERY),
+        OpenApiParameter(name="lon", description="Longitude du point", required=True, type=float, location=OpenApiParameter.QUERY),
+        OpenApiParameter(name="k", description=f"Nombre de sites (max {NEARBY_MAX_RESULTS})", required=False, type=int, location=OpenApiParameter.QUERY),
+        OpenApiParameter(name="radius_km", description=f"Rayon en km (max {NEARBY_MAX_RADIUS_KM})", required=False, type=float, location=OpenApiParameter.QUERY),
+    ],
+    responses={
+        200: OpenApiResponse(response=SitesSerializer(many=True), description="Sites avec `distance_km`"),
+        400: OpenApiResponse(
+            response=inline_serializer(name="NearbySitesBadRequest", fields={"message": serializers.CharField()}),
+            description="Paramètres invalides"
+        ),
+    },
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def get_nearby_sites(request):
+    """
+    Recherche des k plus proches voisins / des sites dans un rayon.
+    """
+    try:
+        lat = parse_coordinate(request.GET.get('lat'), LATITUDE_RANGE)
+        lon = parse_coordinate(request.GET.get('lon'), LONGITUDE_RANGE)
+        if lat is None or lon is None:
+            raise ValueError
+        radius_km = request.GET.get('radius_km')
+        radius_km = float(radius_km) if radius_km else None
+        if radius_km is not None and not 0 < radius_km <= NEARBY_MAX_RADIUS_KM:
+            raise ValueError
+        default_k = NEARBY_MAX_RESULTS if radius_km is not None else NEARBY_DEFAULT_K
+        k = int(request.GET.get('k') or default_k)
+        if not 0 < k <= NEARBY_MAX_RESULTS:
+            raise ValueError
+    except ValueError:
+        return Response(
+            {"message": f"Paramètres invalides : lat, lon requis ; 0 < k <= {NEARBY_MAX_RESULTS} ; 0 < radius_km <= {NEARBY_MAX_RADIUS_KM}."},
+            status=400
+        )
+
+    nearest = nearest_sites(Sites.objects.all(), lat, lon, k, radius_km)
+    sites = Sites.objects.with_relations().in_bulk([pk for _, pk in nearest])
+    data = SitesSerializer([sites[pk] for _, pk in nearest], many=True).data
+    for row, (distance, _) in zip(data, nearest):
+        row['distance_km'] = round(distance, 3)
+    return Response(data)
+
+
+@extend_schema(
+    tags=["sites"],
+    summary="Tuile de carte des sites (z/x/y)",
+    description=(
+        "Tuile XYZ (Web Mercator) des sites.\n\n"
+        f"- `z < {CLUSTER_MAX_ZOOM}` : `clusters` pré-agrégés (nombre, centroïde, vendor et "
+        "security_type dominants)\n"
+        f"- `z >= {CLUSTER_MAX_ZOOM}` : `sites` individuels\n\n"
+        "Les tuiles sont mises en cache et invalidées à chaque création / import de sites."
+    ),
+    responses={
+        200: OpenApiResponse(
+            response=inline_serializer(
+                name="SitesTile",
+                fields={
+                    "z": serializers.IntegerField(),
+                    "x": serializers.IntegerField(),
+                    "y": serializers.IntegerField(),
+                    "clustered": serializers.BooleanField(),
+                    "clusters": inline_serializer(
+                        name="SitesTileCluster",
+                        many=True,
+                        required=False,
+                        fields={
+                            "count": serializers.IntegerField(),
+                            "latitude": serializers.FloatField(),
+                            "longitude": serializers.FloatField(),
+                            "vendor": serializers.UUIDField(allow_null=True),
+                            "vendor_name": serializers.CharField(allow_null=True),
+                            "security_type": serializers.CharField(allow_null=True),
+                        },
+                    ),
+                    "sites": inline_serializer(
+                        name="SitesTileSite",
+                        many=True,
+                        required=False,
+                        fields={
+                            "id": serializers.UUIDField(),
+                            "site_id": serializers.CharField(),
+                            "name": serializers.CharField(),
+                            "latitude": serializers.FloatField(),
+                            "longitude": serializers.FloatField(),
+                            "vendor": serializers.UUIDField(allow_null=True),
+                            "security_type": serializers.CharField(allow_null=True),
+                        },
+                    ),
+                },
+            ),
+            description="Contenu de la tuile"
+        ),
+        400: OpenApiResponse(
+            response=inline_serializer(name="SitesTileBadRequest", fields={"message": serializers.CharField()}),
+            description="Coordonnées de tuile invalides"
+        ),
+    },
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def get_sites_tile(request, z, x, y):
+    """
+    Tuile de carte : clusters aux petits zooms, sites individuels aux grands zooms.
+    """
+    if z > MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        return Response({"message": "Tuile invalide."}, status=400)
+    return Response(get_tile(z, x, y))
+
+
+@extend_schema(
+    tags=["sites"],
+    summary="Autocomplétion de sites",
+    description=(
+        "Recherche partielle (insensible à la casse) sur `site_id` et `name`, servie par l'index "
+        "de recherche (SQLite FTS5 / PostgreSQL pg_trgm). Classement : `site_id` exact, puis "
+        "préfixe de `site_id`, préfixe de `name` (ordre alphabétique), puis correspondance partielle."
+    ),
+    parameters=[
+        OpenApiParameter(name="q", description="Texte recherché (2 caractères minimum)", required=True, type=str, location=OpenApiParameter.QUERY),
+        OpenApiParameter(name="limit", description=f"Nombre de résultats (défaut {TYPEAHEAD_DEFAULT_LIMIT}, max {TYPEAHEAD_MAX_LIMIT})", required=False, type=int, location=OpenApiParameter.QUERY),
+    ],
+    responses={
+        200: OpenApiResponse(
+            response=inline_serializer(
+                name="SiteSearchResult",
+                many=True,
+                fields={
+                    "id": serializers.UUIDField(),
+                    "site_id": serializers.CharField(),
+                    "name": serializers.CharField(),
+                },
+            ),
+            description="Meilleurs résultats"
+        ),
+    },
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def search_sites(request):
+    """
+    Autocomplétion sur site_id / name.
+    """
+    term = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit') or TYPEAHEAD_DEFAULT_LIMIT), 1), TYPEAHEAD_MAX_LIMIT)
+    except ValueError:
+        limit = TYPEAHEAD_DEFAULT_LIMIT
+    if len(term) < 2:
+        return Response([])
+    return Response(typeahead(term, limit))
+
+
+@extend_schema(
+    tags=["sites"],
+    summary="Exporter les sites (NDJSON / CSV / Excel en flux)",
+    description=(
+        "Exporte l'inventaire des sites en flux continu : les sites sont lus et sérialisés par "
+        "blocs, la mémoire du serveur reste constante quelle que soit la taille de la table.\n\n"
+        "- `output=ndjson` (défaut) : un objet JSON par ligne, même représentation que `/api/sites/all/`\n"
+        "- `output=csv` : colonnes à plat (ids et noms des relations)\n"
+        "- `output=xlsx` : classeur au format de l'import Excel (réimportable tel quel)\n"
+        "- `gzip=1` : fichier compressé (`.gz`, NDJSON / CSV)\n\n"
+        "Accepte les mêmes filtres que la liste (`vendor`, `risk_assessment`, `security_type`, `filter`, `bbox`)."
+    ),
+    parameters=[
+        OpenApiParameter(name="output", description="`ndjson`, `csv` ou `xlsx`", required=False, type=str, location=OpenApiParameter.QUERY),
+        OpenApiParameter(name="gzip", description="`1` pour compresser", required=False, type=bool, location=OpenApiParameter.QUERY),
+        OpenApiParameter(name="vendor", description="UUID du Vendor", required=False, type=OpenApiTypes.UUID, location=OpenApiParameter.QUERY),
+        OpenApiParameter(name="risk_assessment", description="UUID du RiskAssessment", required=False, type=OpenApiTypes.UUID, location=OpenApiParameter.QUERY),
+        OpenApiParameter(name="security_type", description="Valeur exacte de `security_type`", required=False, type=str, location=OpenApiParameter.QUERY),
+        OpenApiParameter(name="filter", description="Recherche partielle sur `name` et `site_id`", required=False, type=str, location=OpenApiParameter.QUERY),
+        OpenApiParameter(name="bbox", description="Zone `minLon,minLat,maxLon,maxLat`", required=False, type=str, location=OpenApiParameter.QUERY),
+    ],
+    responses={
+        (200, "application/x-ndjson"): OpenApiTypes.STR,
+        (200, "text/csv"): OpenApiTypes.STR,
+        (200, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"): OpenApiTypes.BINARY,
+        400: OpenApiResponse(
+            response=inline_serializer(name="SitesExportBadRequest", fields={"message": serializers.CharField()}),
+            description="Paramètres invalides"
+        ),
+    },
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def export_sites(request):
+    """
+    Export en flux de l'inventaire des sites.
+    """
+    output = request.GET.get('output', 'ndjson')
+    if output not in EXPORT_FORMATS:
+        return Response({"message": f"output invalide (attendu: {', '.join(EXPORT_FORMATS)})."}, status=400)
+    try:
+        filters = _sites_filters(request)
+    except ValueError as e:
+        return Response({"message": str(e)}, status=400)
+
+    sites = Sites.objects.with_relations().filter(filters).order_by('-created_at', '-id')
+    content_type, extension = EXPORT_FORMATS[output]
+    if output == 'xlsx':
+        # Le .xlsx (zip) ne peut être finalisé qu'en fin d'écriture : fichier temporaire puis envoi en flux
+        tmp = tempfile.TemporaryFile()
+        write_xlsx(sites, tmp)
+        tmp.seek(0)
+        return FileResponse(tmp, as_attachment=True, filename=f"sites.{extension}", content_type=content_type)
+
+    lines = ndjson_lines(sites) if output == 'ndjson' else csv_lines(sites)
+    body = encode(lines)
+    filename = f"sites.{extension}"
+    if request.GET.get('gzip') in ('1', 'true'):
+        body, content_type, filename = gzip_stream(body), 'application/gzip', filename + '.gz'
+
+    response = StreamingHttpResponse(body, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,6 +1,31 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+
+def _ensure_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from django.db.migrations.recorder import MigrationRecorder
+
+    from .search import ensure_search_index
+
+    connection = connections[using]
+    # Index dans sa version courante (table id -> rowid de 0016) ; en deçà, celui des migrations
+    if ("sites", "0016_sites_search_rowid") in MigrationRecorder(connection).applied_migrations():
+        ensure_search_index(connection)
 
 
 class SitesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "sites"
+
+    def ready(self):
+        # Recrée les triggers de l'index de recherche si une migration a reconstruit sites_sites
+        post_migrate.connect(_ensure_search_index, sender=self)
+
+        from .models import Sites
+        from .signals import count_created_site, record_tombstone, uncount_deleted_site
+
+        post_delete.connect(record_tombstone, sender=Sites)
+        # Résumé des statistiques du tableau de bord
+        post_save.connect(count_created_site, sender=Sites)
+        post_delete.connect(uncount_deleted_site, sender=Sites)
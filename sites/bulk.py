@@ -0,0 +1,141 @@
+import uuid
+
+from django.db import transaction
+
+from smdb.cache import bump_generation
+from vendor.models import Vendor
+from account.models import User
+from risk_assessment.models import RiskAssessment
+from .geo import LATITUDE_RANGE, LONGITUDE_RANGE, parse_coordinate
+from .importer import BATCH_SIZE
+from .models import Sites
+from .stats import record_sites
+
+# Nombre maximal de sites par requête de création groupée : insérés dans une
+# seule transaction, qui doit être validée dans le délai de sync.SETTLE_SECONDS
+BULK_MAX_ITEMS = 10_000
+
+# Champ du payload -> (modèle référencé, attribut du site)
+RELATIONS = {
+    'vendor': (Vendor, 'vendor_id'),
+    'risk_assessment': (RiskAssessment, 'risk_assessment_id'),
+    'zm': (User, 'zm_id'),
+}
+# Message d'une relation introuvable (mêmes textes que `create_site`)
+NOT_FOUND = {
+    'vendor': "Fournisseur introuvable.",
+    'risk_assessment': "RiskAssessment introuvable.",
+    'zm': "Utilisateur (ZM) introuvable.",
+}
+
+
+def _existing(model, field, values):
+    """Valeurs de `values` présentes en base (`field`), par paquets de BATCH_SIZE paramètres."""
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), BATCH_SIZE):
+        found.update(
+            model.objects.filter(**{f"{field}__in": values[start:start + BATCH_SIZE]}).values_list(field, flat=True)
+        )
+    return found
+
+
+def _text(data, field, errors):
+    value = data.get(field)
+    if value is None:
+        return None
+    value = str(value).strip()
+    max_length = Sites._meta.get_field(field).max_length
+    if len(value) > max_length:
+        errors.append(f"'{field}' dépasse {max_length} caractères.")
+    return value or None
+
+
+def _validate(data):
+    """(valeurs du site, ids des relations, erreurs) d'un élément du payload, sans requête."""
+    if not isinstance(data, dict):
+        return None, None, ["Objet JSON attendu."]
+    errors = []
+    values = {field: _text(data, field, errors) for field in ('name', 'site_id', 'security_type')}
+    # Après `_text` : une valeur faite d'espaces est manquante
+    missing = [field for field in ('name', 'site_id') if values[field] is None]
+    if missing:
+        errors.insert(0, f"Les champs suivants sont requis : {', '.join(missing)}")
+    try:
+        values['latitude'] = parse_coordinate(data.get('latitude'), LATITUDE_RANGE)
+        values['longitude'] = parse_coordinate(data.get('longitude'), LONGITUDE_RANGE)
+    except (TypeError, ValueError):
+        errors.append("Coordonnées invalides (latitude/longitude).")
+
+    relations = {}
+    for field in RELATIONS:
+        raw = data.get(field)
+        if raw in (None, ""):
+            continue
+        try:
+            relations[field] = uuid.UUID(str(raw))
+        except ValueError:
+            errors.append(NOT_FOUND[field])
+    return values, relations, errors
+
+
+def create_sites(items, atomic=True):
+    """
+    Crée les sites décrits par `items` (payloads de `create_site`, plus
+    `security_type`) et retourne le résultat de chaque élément, dans
+    l'ordre : `{"index", "site_id", "id", "errors"}` (`id` : None si le site
+    n'est pas créé).
+
+    Les vendors, risk assessments, ZM référencés et les `site_id` déjà en
+    base sont vérifiés en une requête par modèle pour tout le lot (au lieu
+    de trois `get()` par site), puis les sites valides sont insérés par
+    `bulk_create` dans une seule transaction. Un `site_id` répété dans le
+    lot est refusé après sa première occurrence valide.
+
+    Avec `atomic=True` (tout ou rien), une seule erreur empêche toute
+    création ; sinon les éléments valides sont créés malgré les autres.
+    """
+    validated = [_validate(data) for data in items]
+
+    referenced = {field: set() for field in RELATIONS}
+    site_ids = set()
+    for values, relations, _ in validated:
+        if values is None:
+            continue
+        for field, pk in relations.items():
+            referenced[field].add(pk)
+        if values['site_id']:
+            site_ids.add(values['site_id'])
+    found = {field: _existing(model, 'id', referenced[field]) for field, (model, _) in RELATIONS.items()}
+    taken = _existing(Sites, 'site_id', site_ids)
+
+    results, sites, seen = [], [], set()
+    for index, (values, relations, errors) in enumerate(validated):
+        if values is not None:
+            for field, pk in relations.items():
+                if pk not in found[field]:
+                    errors.append(NOT_FOUND[field])
+            site_id = values['site_id']
+            if site_id in taken:
+                errors.append(f"site_id '{site_id}' déjà présent en base.")
+            elif site_id in seen:
+                errors.append(f"site_id '{site_id}' en double dans la requête.")
+            elif site_id and not errors:
+                # Seul un élément créé réserve son site_id
+                seen.add(site_id)
+        result = {"index": index, "site_id": values and values['site_id'], "id": None, "errors": errors}
+        results.append(result)
+        if not errors:
+            site = Sites(**values, **{RELATIONS[field][1]: pk for field, pk in relations.items()})
+            sites.append((result, site))
+
+    if atomic and len(sites) < len(results):
+        return results
+    if sites:
+        with transaction.atomic():
+            Sites.objects.bulk_create([site for _, site in sites], batch_size=BATCH_SIZE)
+            record_sites([site for _, site in sites])
+            transaction.on_commit(lambda: bump_generation('sites'))
+        for result, site in sites:
+            result["id"] = site.id
+    return results
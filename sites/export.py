@@ -0,0 +1,104 @@
+import csv
+import re
+import zlib
+from itertools import islice
+
+from openpyxl import Workbook
+from rest_framework.utils.encoders import JSONEncoder
+
+from .importer import HEADERS
+from .projection import iter_site_rows
+
+# Sites lus et sérialisés à la fois : la mémoire reste bornée quelle que soit la taille de la table
+CHUNK_SIZE = 2000
+
+CSV_COLUMNS = [
+    'id', 'site_id', 'name', 'latitude', 'longitude', 'security_type',
+    'vendor_id', 'vendor_name', 'risk_assessment_id', 'risk_assessment_name',
+    'zm_id', 'zm_email', 'created_at',
+]
+
+
+# Erreur d'import : "[feuille] L12: message" (feuille absente pour un classeur d'une seule feuille)
+ERROR_LINE = re.compile(r"^(?:\[(?P<sheet>[^\]]*)\] )?(?:L(?P<line>\d+): )?(?P<message>.*)$", re.S)
+
+
+def iter_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """Parcourt le queryset par blocs via un curseur (`iterator`), sans le charger entièrement."""
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ndjson_lines(queryset):
+    """Une ligne JSON par site, même représentation que la liste (`SitesSerializer`)."""
+    encoder = JSONEncoder(ensure_ascii=False)
+    for rows in iter_site_rows(queryset, CHUNK_SIZE):
+        yield ''.join(encoder.encode(row) + '\n' for row in rows)
+
+
+class _Echo:
+    # Pseudo-fichier pour csv.writer : writerow() retourne directement la ligne formatée
+    def write(self, value):
+        return value
+
+
+def csv_lines(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for chunk in iter_chunks(queryset):
+        yield ''.join(writer.writerow(_csv_row(site)) for site in chunk)
+
+
+def error_report_lines(errors):
+    """Rapport CSV (feuille, ligne, erreur) des erreurs d'un import ("[feuille] L<n>: message")."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['feuille', 'ligne', 'erreur'])
+    for error in errors:
+        yield writer.writerow(ERROR_LINE.match(error).group('sheet', 'line', 'message'))
+
+
+def _csv_row(site):
+    return [
+        site.id, site.site_id, site.name, site.latitude, site.longitude, site.security_type,
+        site.vendor_id, site.vendor.name if site.vendor else None,
+        site.risk_assessment_id, site.risk_assessment.name if site.risk_assessment else None,
+        site.zm_id, site.zm.email if site.zm else None,
+        site.created_at.isoformat(),
+    ]
+
+
+def encode(lines):
+    for line in lines:
+        yield line.encode('utf-8')
+
+
+def gzip_stream(chunks):
+    """Compresse à la volée un flux d'octets au format gzip."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def write_xlsx(queryset, fileobj):
+    """
+    Écrit les sites dans `fileobj` au format .xlsx, avec les colonnes de
+    l'import (Vendor / risk_assessment par nom, zm par id) : le fichier
+    produit se réimporte tel quel. Le classeur en mode `write_only` écrit
+    les lignes au fil de l'eau, la mémoire reste bornée.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sites")
+    ws.append(HEADERS)
+    rows = queryset.values_list(
+        'site_id', 'name', 'latitude', 'longitude', 'vendor__name', 'risk_assessment__name', 'zm_id', 'security_type'
+    ).iterator(chunk_size=CHUNK_SIZE)
+    for site_id, name, latitude, longitude, vendor, risk_assessment, zm_id, security_type in rows:
+        ws.append([site_id, name, latitude, longitude, vendor, risk_assessment, str(zm_id) if zm_id else None, security_type])
+    wb.save(fileobj)
@@ -0,0 +1,107 @@
+import math
+
+from django.db.models import Q
+
+LATITUDE_RANGE = (-90.0, 90.0)
+LONGITUDE_RANGE = (-180.0, 180.0)
+
+
+def parse_coordinate(value, bounds):
+    """
+    Convertit une coordonnée (nombre ou texte, virgule décimale acceptée) en float.
+    Retourne None si la valeur est vide ; lève ValueError si elle est invalide
+    ou hors de `bounds`.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip().replace(',', '.')
+        if not value:
+            return None
+    number = float(value)
+    if not math.isfinite(number) or not bounds[0] <= number <= bounds[1]:
+        raise ValueError(f"{value} hors de [{bounds[0]}, {bounds[1]}]")
+    return number
+
+
+def parse_bbox(raw):
+    """'minLon,minLat,maxLon,maxLat' -> tuple de 4 floats (ValueError si invalide)."""
+    parts = raw.split(',')
+    if len(parts) != 4:
+        raise ValueError(raw)
+    min_lon, max_lon = (parse_coordinate(parts[i], LONGITUDE_RANGE) for i in (0, 2))
+    min_lat, max_lat = (parse_coordinate(parts[i], LATITUDE_RANGE) for i in (1, 3))
+    if None in (min_lon, min_lat, max_lon, max_lat) or min_lat > max_lat:
+        raise ValueError(raw)
+    return min_lon, min_lat, max_lon, max_lat
+
+
+EARTH_RADIUS_KM = 6371.0088
+INITIAL_RADIUS_KM = 2.0
+# Demi-circonférence terrestre : au-delà, le cercle couvre toute la planète
+MAX_SEARCH_RADIUS_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bbox_q(min_lon, min_lat, max_lon, max_lat):
+    """
+    Filtre sur l'index (latitude, longitude). Si min_lon > max_lon, la zone
+    traverse l'antiméridien (ex: 170,-10,-170,10).
+    """
+    q = Q(latitude__gte=min_lat, latitude__lte=max_lat)
+    if min_lon <= max_lon:
+        return q & Q(longitude__gte=min_lon, longitude__lte=max_lon)
+    return q & (Q(longitude__gte=min_lon) | Q(longitude__lte=max_lon))
+
+
+def bbox_around(lat, lon, radius_km):
+    """Plus petite bbox (minLon, minLat, maxLon, maxLat) contenant le cercle `radius_km` autour du point."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        # Le cercle contient un pôle : toutes les longitudes
+        return -180.0, max(min_lat, -90.0), 180.0, min(max_lat, 90.0)
+    dlon = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat)))))
+    if dlon >= 180:
+        return -180.0, min_lat, 180.0, max_lat
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def nearest_sites(queryset, lat, lon, k, radius_km=None):
+    """
+    Les `k` sites les plus proches de (lat, lon), limités à `radius_km` si fourni.
+    Retourne une liste de (distance_km, pk) triée par distance.
+
+    Seuls les sites de la bbox englobant le cercle sont lus (via l'index
+    (latitude, longitude)) ; sans rayon, la recherche part de INITIAL_RADIUS_KM
+    et double le rayon jusqu'à trouver k sites dans le cercle.
+    """
+    radius = radius_km if radius_km is not None else INITIAL_RADIUS_KM
+    while True:
+        candidates = queryset.filter(bbox_q(*bbox_around(lat, lon, radius))).values_list('pk', 'latitude', 'longitude')
+        distances = ((haversine_km(lat, lon, site_lat, site_lon), pk) for pk, site_lat, site_lon in candidates)
+        within = sorted(item for item in distances if item[0] <= radius)
+        # Les k premiers du cercle sont exacts : tout site hors du cercle est plus loin que `radius`
+        if len(within) >= k or radius_km is not None or radius >= MAX_SEARCH_RADIUS_KM:
+            return within[:k]
+        radius *= 2
+
+
+def tile_bbox(z, x, y):
+    """Emprise (minLon, minLat, maxLon, maxLat) de la tuile XYZ (Web Mercator) z/x/y."""
+    n = 2 ** z
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
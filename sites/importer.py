@@ -0,0 +1,481 @@
+import csv
+import gzip
+import io
+import os
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, nullcontext
+from copy import copy
+from itertools import chain
+from multiprocessing import get_context
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from smdb.cache import bump_generation
+from vendor.models import Vendor
+from account.models import User
+from risk_assessment.models import RiskAssessment
+from .geo import LATITUDE_RANGE, LONGITUDE_RANGE, parse_coordinate
+from .models import ImportJob, Sites
+from .stats import record_changes, record_sites
+from .workbook import ReadOnlyWorkbook, resolve_rows, shared_strings, sheet_rows
+
+# Nombre de sites insérés par INSERT groupé
+BATCH_SIZE = 1000
+
+# Entêtes normalisées du fichier -> champs Django (EI Site ID -> site_id, Site Name -> name)
+REQUIRED_COLUMNS = {"ei_site_id": "site_id", "site_name": "name"}
+
+# Extensions acceptées par l'import
+IMPORT_FORMATS = (".xlsx", ".csv", ".csv.gz")
+# Séparateurs de colonnes reconnus dans les fichiers CSV (détectés sur l'entête)
+CSV_DELIMITERS = (",", ";", "\t")
+
+# Champs remplacés lors d'une mise à jour (`on_conflict="update"`) -> colonne normalisée du fichier
+UPDATE_FIELDS = {
+    "name": "site_name",
+    "latitude": "latitude",
+    "longitude": "longitude",
+    "vendor_id": "vendor",
+    "risk_assessment_id": "risk_assessment",
+    "zm_id": "zm",
+    "security_type": "security_type",
+}
+
+# Entêtes du modèle de fichier (reprises telles quelles par l'export .xlsx)
+HEADERS = ["EI Site ID", "Site Name", "Latitude", "Longitude", "Vendor", "risk_assessment", "zm", "security_type"]
+
+
+class SitesImportError(Exception):
+    """Fichier inexploitable (ex: colonne requise manquante) -> HTTP 400."""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def _norm(s: str) -> str:
+    """Normalise un en-tête: 'EI Site ID' -> 'ei_site_id'."""
+    return slugify(str(s).strip().lower()).replace('-', '_') if s is not None else ''
+
+
+def _max_length(field_name):
+    return Sites._meta.get_field(field_name).max_length
+
+
+class ImportReferences:
+    """
+    Tables de correspondance chargées une seule fois pour tout l'import
+    (une requête par modèle), au lieu de ~5 requêtes par ligne.
+    """
+
+    def __init__(self):
+        # site_id déjà en base
+        self.site_ids = set(
+            Sites.objects.exclude(site_id=None).values_list('site_id', flat=True)
+        )
+        self.vendors = self._names_to_ids(Vendor)
+        self.risk_assessments = self._names_to_ids(RiskAssessment)
+        self.users = set(User.objects.values_list('id', flat=True))
+        # site_id retenus plus haut dans le fichier
+        self.seen = set()
+        # site_id -> ligne du fichier qui l'a retenu (signalement des doublons en simulation)
+        self.file_lines = {}
+
+    @staticmethod
+    def _names_to_ids(model):
+        # Équivalent de name__iexact(...).first() : le plus ancien l'emporte
+        mapping = {}
+        for pk, name in model.objects.exclude(name=None).order_by('created_at').values_list('id', 'name'):
+            mapping.setdefault(name.strip().lower(), pk)
+        return mapping
+
+
+def _local_path(f):
+    """Chemin du fichier sur disque (lisible par d'autres processus), ou None."""
+    if isinstance(f, (str, os.PathLike)):
+        return f
+    if hasattr(f, 'temporary_file_path'):
+        return f.temporary_file_path()
+    return None
+
+
+def read_workbook(f, workers=1):
+    """
+    Ouvre un classeur .xlsx (chemin ou fichier) et retourne un itérateur de
+    (feuille, entête, lignes) pour chacune de ses feuilles non vides, dans
+    l'ordre du classeur ; `feuille` vaut None si le classeur n'en a qu'une.
+
+    Avec `workers > 1` (worker `process_import_jobs` seulement : le pool est
+    créé à chaque appel), un classeur de plusieurs feuilles présent sur
+    disque est lu par un pool de processus (une feuille par tâche, au plus
+    `workers` feuilles lues d'avance et gardées en mémoire) : les feuilles
+    déjà lues sont importées pendant que les suivantes sont analysées.
+    Sinon les lignes sont lues au fil de l'eau. Une feuille ne peut pas être
+    découpée : openpyxl doit analyser toutes les lignes qui précèdent une plage.
+    """
+    path = _local_path(f)
+    parallel = workers > 1 and path is not None
+    try:
+        # En parallèle, la table des chaînes partagées est lue pendant l'analyse des feuilles
+        wb = ReadOnlyWorkbook(f, shared_strings=not parallel)
+        if parallel:
+            wb.close()
+            if len(wb.sheet_names) > 1:
+                return _read_parallel(path, wb.sheet_names, workers)
+            wb = ReadOnlyWorkbook(f)
+    except Exception as e:
+        raise SitesImportError(f"Lecture Excel impossible: {e}")
+    return _read_sequential(wb)
+
+
+def _labelled(name, names):
+    return name if len(names) > 1 else None
+
+
+def _read_sequential(wb):
+    names = wb.sheet_names
+    found = False
+    try:
+        for name in names:
+            rows = wb.rows(name)
+            header = next(rows, None)
+            if header is not None:
+                found = True
+                yield _labelled(name, names), header, rows
+    finally:
+        wb.close()
+    if not found:
+        raise SitesImportError("Fichier vide.")
+
+
+def _read_parallel(path, names, workers):
+    # `spawn` : processus neufs, sans les connexions à la base héritées d'un fork
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(names)), mp_context=get_context('spawn'))
+    try:
+        # Au plus `workers` feuilles lues d'avance : la mémoire ne croît pas avec le classeur
+        pending = deque((name, executor.submit(sheet_rows, path, name)) for name in names[:workers])
+        queued = iter(names[workers:])
+        strings = _read_step(shared_strings, path)
+        found = False
+        while pending:
+            name, future = pending.popleft()
+            rows = _read_step(future.result)
+            following = next(queued, None)
+            if following is not None:
+                pending.append((following, executor.submit(sheet_rows, path, following)))
+            if rows:
+                found = True
+                rows = resolve_rows(rows, strings)
+                yield _labelled(name, names), next(rows), rows
+            # Feuille importée : libérée avant d'attendre la suivante
+            del rows
+        if not found:
+            raise SitesImportError("Fichier vide.")
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _read_step(function, *args):
+    # Erreur d'un processus de lecture (feuille corrompue, pool interrompu) -> 400 / job en échec
+    try:
+        return function(*args)
+    except Exception as e:
+        raise SitesImportError(f"Lecture Excel impossible: {e}")
+
+
+def read_import(f, file_name, workers=1):
+    """
+    (feuille, entête, lignes) du fichier importé `f` (chemin ou fichier),
+    selon l'extension de `file_name` : classeur .xlsx (`read_workbook`) ou
+    CSV, éventuellement compressé en gzip (`read_csv`).
+    """
+    name = file_name.lower()
+    if name.endswith(".csv.gz"):
+        return read_csv(f, compressed=True)
+    if name.endswith(".csv"):
+        return read_csv(f)
+    return read_workbook(f, workers=workers)
+
+
+def read_csv(f, compressed=False):
+    """
+    Lit un fichier CSV (chemin ou fichier binaire, gzip si `compressed`) en
+    flux : une seule « feuille » dont les lignes sont décodées au fur et à
+    mesure de l'import, sans charger le fichier en mémoire. Encodage UTF-8
+    (BOM accepté) ; séparateur `,`, `;` ou tabulation, déduit de l'entête.
+    """
+    with ExitStack() as stack:
+        if isinstance(f, (str, os.PathLike)):
+            f = stack.enter_context(open(f, 'rb'))
+        if compressed:
+            f = stack.enter_context(gzip.GzipFile(fileobj=f))
+        text = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+        # Le fichier sous-jacent reste ouvert (fermé par l'appelant)
+        stack.callback(text.detach)
+        try:
+            first = text.readline()
+        except (UnicodeDecodeError, OSError, EOFError) as e:
+            raise SitesImportError(f"Lecture CSV impossible: {e}")
+        if not first.strip():
+            raise SitesImportError("Fichier vide.")
+        delimiter = max(CSV_DELIMITERS, key=first.count)
+        reader = csv.reader(chain([first], text), delimiter=delimiter)
+        yield None, next(reader), _csv_rows(reader)
+
+
+def _csv_rows(reader):
+    try:
+        yield from reader
+    except (csv.Error, UnicodeDecodeError, OSError, EOFError) as e:
+        raise SitesImportError(f"Lecture CSV impossible: {e}")
+
+
+def _column_index(header):
+    idx = {h: i for i, h in enumerate(_norm(h) for h in header)}
+    for needed in REQUIRED_COLUMNS.keys():
+        if needed not in idx:
+            raise SitesImportError(f"Colonne requise manquante: {needed}.")
+    return idx
+
+
+def import_sites(header, rows, progress=None, atomic=True, dry_run=False, on_conflict=ImportJob.SKIP):
+    """
+    Importe les lignes `rows` (tuples alignés sur `header`, données à partir
+    de la ligne 2) et retourne le résumé `{"processed", "created", "updated",
+    "unchanged", "skipped", "errors"}`. Voir `import_sheets`.
+    """
+    return import_sheets(
+        [(None, header, rows)], progress=progress, atomic=atomic, dry_run=dry_run, on_conflict=on_conflict
+    )
+
+
+def import_sheets(sheets, progress=None, atomic=True, dry_run=False, on_conflict=ImportJob.SKIP, max_rows=None):
+    """
+    Importe les feuilles `sheets` (itérable de (feuille, entête, lignes), cf.
+    `read_workbook`) et retourne le résumé `{"processed", "created",
+    "updated", "unchanged", "skipped", "errors"}`. Les erreurs d'un classeur
+    de plusieurs feuilles sont préfixées par `[feuille]` ; une feuille sans
+    les colonnes requises est ignorée (erreur 400 si c'est la seule).
+
+    Les lignes sont résolues en mémoire puis écrites par lots (`bulk_create`).
+    Avec `atomic=True` tout l'import est une seule transaction ; sinon chaque
+    lot est validé séparément, ce qui rend la progression visible aux autres
+    connexions (jobs en arrière-plan). `progress(summary)` est appelé après
+    chaque lot. Au-delà de `max_rows` lignes, l'import échoue (SitesImportError,
+    rien n'est écrit avec `atomic=True`) : la synchronisation incrémentale
+    suppose qu'une transaction est validée moins de `sync.SETTLE_SECONDS`
+    après l'horodatage de ses sites, ce qui borne la taille d'un import atomique.
+
+    Une ligne dont le `site_id` existe déjà en base est ignorée (`skipped`),
+    ou met à jour ce site avec `on_conflict="update"` (cf. `_update_sites`).
+    Les doublons plus bas dans le fichier sont toujours ignorés.
+
+    Avec `dry_run=True`, chaque ligne est validée de la même façon mais rien
+    n'est écrit : `created` / `updated` comptent les sites qui seraient créés
+    ou modifiés, et les doublons ignorés sont aussi signalés dans `errors`.
+    """
+    update = on_conflict == ImportJob.UPDATE
+    refs = ImportReferences()
+    summary = {"processed": 0, "created": 0, "updated": 0, "unchanged": 0, "skipped": 0, "errors": []}
+    errors = summary["errors"]
+    pending, pending_updates = [], []
+
+    def flush():
+        if pending_updates:
+            updated, unchanged, deleted = _update_sites(pending_updates, dry_run)
+            summary["updated"] += updated
+            summary["unchanged"] += unchanged
+            # Supprimés depuis le début de l'import : recréés
+            pending.extend(deleted)
+            pending_updates.clear()
+        if pending:
+            if not dry_run:
+                # Sans savepoint quand l'import entier est déjà une transaction
+                with transaction.atomic(savepoint=False):
+                    Sites.objects.bulk_create(pending, batch_size=BATCH_SIZE)
+                    record_sites(pending)
+                    transaction.on_commit(lambda: bump_generation('sites'))
+            summary["created"] += len(pending)
+            pending.clear()
+        if progress is not None:
+            progress(summary)
+
+    with transaction.atomic() if atomic and not dry_run else nullcontext():
+        for sheet, header, rows in sheets:
+            prefix = f"[{sheet}] " if sheet is not None else ""
+            try:
+                idx = _column_index(header)
+            except SitesImportError as e:
+                if sheet is None:
+                    raise
+                errors.append(f"{prefix}{e.message} Feuille ignorée.")
+                continue
+            # Colonnes absentes de la feuille : champs conservés lors d'une mise à jour
+            absent = {field for field, column in UPDATE_FIELDS.items() if column not in idx}
+            for rnum, row in enumerate(rows, start=2):
+                summary["processed"] += 1
+                if max_rows is not None and summary["processed"] > max_rows:
+                    raise SitesImportError(
+                        f"Plus de {max_rows} lignes : importer ce fichier en arrière-plan (sans sync=1)."
+                    )
+                line = f"{prefix}L{rnum}"
+                try:
+                    built = _build_site(line, row, idx, refs, errors, report_duplicates=dry_run, update=update)
+                except Exception as e:
+                    errors.append(f"{line}: {e}")
+                else:
+                    if built is None:
+                        summary["skipped"] += 1
+                    else:
+                        site, unresolved = built
+                        refs.seen.add(site.site_id)
+                        if dry_run:
+                            refs.file_lines[site.site_id] = (
+                                f"feuille {sheet}, ligne {rnum}" if sheet is not None else f"ligne {rnum}"
+                            )
+                        if site.site_id in refs.site_ids:
+                            pending_updates.append((site, absent | unresolved))
+                        else:
+                            pending.append(site)
+                if summary["processed"] % BATCH_SIZE == 0:
+                    flush()
+        flush()
+
+    return summary
+
+
+def _update_sites(rows, dry_run=False):
+    """
+    Met à jour les sites existants d'un lot : `rows` liste les (site construit
+    depuis le fichier, champs à conserver). Les sites sont relus en une
+    requête (par leur site_id) et seuls ceux dont une valeur change sont
+    écrits, par un `bulk_update` des champs modifiés qui renseigne aussi
+    `updated_at` (non géré par `auto_now` hors `save()`), dont dépendent la
+    synchronisation et le `Last-Modified` de la liste ; le résumé des
+    statistiques suit les changements de vendor, risk_assessment,
+    security_type ou zm.
+
+    Retourne (modifiés, inchangés, sites à créer : supprimés entre-temps).
+    """
+    current = Sites.objects.in_bulk([site.site_id for site, _ in rows], field_name='site_id')
+    now = timezone.now()
+    before, changed, deleted = [], [], []
+    # Champs modifiés dans le lot : les seuls écrits (chaque champ coûte un CASE par site)
+    fields = set()
+    for site, keep in rows:
+        existing = current.get(site.site_id)
+        if existing is None:
+            deleted.append(site)
+            continue
+        values = {
+            field: getattr(site, field)
+            for field in UPDATE_FIELDS
+            if field not in keep and getattr(existing, field) != getattr(site, field)
+        }
+        if not values:
+            continue
+        before.append(copy(existing))
+        for field, value in values.items():
+            setattr(existing, field, value)
+        existing.updated_at = now
+        fields.update(values)
+        changed.append(existing)
+
+    if changed and not dry_run:
+        with transaction.atomic(savepoint=False):
+            Sites.objects.bulk_update(changed, [*sorted(fields), 'updated_at'], batch_size=BATCH_SIZE)
+            record_changes(before, changed)
+            transaction.on_commit(lambda: bump_generation('sites'))
+    return len(changed), len(rows) - len(changed) - len(deleted), deleted
+
+
+def _build_site(line, row, idx, refs, errors, report_duplicates=False, update=False):
+    """
+    Construit le `Sites` (non sauvegardé) d'une ligne et retourne (site,
+    champs des liens introuvables), ou None si la ligne est ignorée.
+    """
+
+    def get_col(key_norm):
+        i = idx.get(key_norm)
+        if i is None or i >= len(row):
+            return None
+        val = row[i]
+        return None if val in (None, "") else val
+
+    def get_str(key_norm):
+        val = get_col(key_norm)
+        return str(val).strip() if val is not None else None
+
+    site_id = str(get_col("ei_site_id") or "").strip()
+    name = str(get_col("site_name") or "").strip()
+    if not site_id or not name:
+        errors.append(f"{line}: 'site_id' ou 'name' manquant.")
+        return None
+
+    # Doublon (plus haut dans le fichier, ou en base hors mise à jour) → on ignore
+    if site_id in refs.seen or (site_id in refs.site_ids and not update):
+        if report_duplicates:
+            first = refs.file_lines.get(site_id)
+            where = f"en double ({first})" if first else "déjà présent en base"
+            errors.append(f"{line}: site_id '{site_id}' {where}, ligne ignorée.")
+        return None
+
+    values = {
+        'name': name,
+        'site_id': site_id,
+        'security_type': get_str("security_type"),
+    }
+    # Vérifié ici plutôt que par la base : une erreur ne doit pas faire échouer tout un lot
+    for field, value in values.items():
+        if value is not None and len(value) > _max_length(field):
+            raise ValueError(f"'{field}' dépasse {_max_length(field)} caractères.")
+
+    for field, bounds in (("latitude", LATITUDE_RANGE), ("longitude", LONGITUDE_RANGE)):
+        raw = get_col(field)
+        try:
+            values[field] = parse_coordinate(raw, bounds)
+        except ValueError:
+            raise ValueError(f"{field.capitalize()} invalide ('{raw}').")
+
+    # Liens introuvables : la ligne est gardée sans le lien (un site mis à jour conserve le sien)
+    unresolved = set()
+
+    # Vendor par NOM
+    vendor_id = None
+    vendor_name = get_col("vendor")
+    if vendor_name:
+        vendor_id = refs.vendors.get(str(vendor_name).strip().lower())
+        if not vendor_id:
+            unresolved.add('vendor_id')
+            errors.append(f"{line}: Vendor introuvable (name='{vendor_name}').")
+
+    # RiskAssessment par NOM
+    ra_id = None
+    ra_name = get_col("risk_assessment")
+    if ra_name:
+        ra_id = refs.risk_assessments.get(str(ra_name).strip().lower())
+        if not ra_id:
+            unresolved.add('risk_assessment_id')
+            errors.append(f"{line}: RiskAssessment introuvable (name='{ra_name}').")
+
+    # ZM par ID (UUID)
+    zm_id = None
+    zm_raw = get_col("zm")
+    if zm_raw:
+        try:
+            zm_uuid = uuid.UUID(str(zm_raw).strip())
+        except ValueError as e:
+            unresolved.add('zm_id')
+            errors.append(f"{line}: ID ZM invalide ({zm_raw}): {e}")
+        else:
+            if zm_uuid in refs.users:
+                zm_id = zm_uuid
+            else:
+                unresolved.add('zm_id')
+                errors.append(f"{line}: User (ZM) introuvable (id='{zm_raw}').")
+
+    return Sites(vendor_id=vendor_id, risk_assessment_id=ra_id, zm_id=zm_id, **values), unresolved
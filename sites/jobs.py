@@ -0,0 +1,143 @@
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .importer import SitesImportError, import_sheets, read_import
+from .models import ImportJob
+from .uploads import READ_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Nombre d'erreurs conservées sur le job pendant l'import et renvoyées par son suivi
+# (la liste complète, écrite à la fin, n'est servie que par le rapport CSV)
+ERRORS_PREVIEW = 100
+
+
+class JobAbandoned(Exception):
+    """Le job n'est plus en cours pour ce worker (marqué en échec par `fail_stale_jobs`)."""
+
+
+def fail_stale_jobs():
+    """
+    Marque en échec les jobs en cours sans progression (`updated_at`) depuis
+    plus de IMPORT_JOB_TIMEOUT_MINUTES : leur worker s'est arrêté (plantage,
+    redémarrage) sans les terminer. Ils ne sont pas relancés : un fichier qui
+    fait tomber le worker le referait.
+    """
+    now = timezone.now()
+    return ImportJob.objects.filter(
+        status=ImportJob.RUNNING, updated_at__lt=now - timedelta(minutes=settings.IMPORT_JOB_TIMEOUT_MINUTES)
+    ).update(
+        status=ImportJob.FAILED, finished_at=now, updated_at=now,
+        message="Import interrompu (worker arrêté) : relancer l'import.",
+    )
+
+
+def claim_next_job():
+    """
+    Réserve le plus ancien job en attente, après avoir marqué en échec les jobs
+    abandonnés (`fail_stale_jobs`). L'UPDATE conditionnel sur le statut
+    garantit qu'un job n'est pris que par un seul worker.
+    """
+    fail_stale_jobs()
+    for job_id in ImportJob.objects.filter(status=ImportJob.PENDING).order_by('created_at').values_list('id', flat=True)[:5]:
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(id=job_id, status=ImportJob.PENDING).update(
+            status=ImportJob.RUNNING, started_at=now, updated_at=now
+        )
+        if claimed:
+            return ImportJob.objects.get(id=job_id)
+    return None
+
+
+def run_import_job(job):
+    """
+    Exécute l'import d'un job réservé et enregistre sa progression après chaque
+    lot. L'import s'arrête (après le lot en cours) si le job a été marqué en
+    échec entre-temps : il n'est plus terminé par ce worker.
+    """
+
+    def progress(summary):
+        if not _running(job).update(
+            **_counters(summary), errors=summary['errors'][:ERRORS_PREVIEW], updated_at=timezone.now()
+        ):
+            raise JobAbandoned
+
+    try:
+        with job.file.open('rb') as f:
+            if job.sha256 and _sha256(f) != job.sha256:
+                _finish(job, ImportJob.FAILED, message="Somme de contrôle SHA-256 invalide : fichier à renvoyer.")
+                return
+            # Chemin du fichier si le stockage en a un : les feuilles peuvent être lues en parallèle
+            try:
+                source = job.file.path
+            except NotImplementedError:
+                source = f
+            # Format d'après le nom d'origine (le stockage peut renommer le fichier)
+            sheets = read_import(source, job.file_name, workers=settings.IMPORT_PARSE_WORKERS)
+            # Chaque lot est validé séparément pour que la progression soit visible
+            summary = import_sheets(
+                sheets, progress=progress, atomic=False, dry_run=job.dry_run, on_conflict=job.on_conflict
+            )
+    except JobAbandoned:
+        logger.warning("Import job %s abandoned: no longer running", job.id)
+        return
+    except SitesImportError as e:
+        _finish(job, ImportJob.FAILED, message=e.message)
+        return
+    except Exception as e:
+        logger.exception("Import job %s failed", job.id)
+        _finish(job, ImportJob.FAILED, message=str(e))
+        return
+    finally:
+        # Fichier supprimé quel que soit le résultat : un import échoué se relance par un nouvel envoi
+        job.file.delete(save=False)
+
+    _finish(job, ImportJob.DONE, **_counters(summary), errors=summary['errors'])
+
+
+def _sha256(f):
+    digest = hashlib.sha256()
+    for block in iter(lambda: f.read(READ_SIZE), b''):
+        digest.update(block)
+    f.seek(0)
+    return digest.hexdigest()
+
+
+def _counters(summary):
+    return {
+        'rows_processed': summary['processed'],
+        'created': summary['created'],
+        'updated': summary['updated'],
+        'unchanged': summary['unchanged'],
+        'skipped': summary['skipped'],
+        'error_count': len(summary['errors']),
+    }
+
+
+def _running(job):
+    # Job toujours en cours pour ce worker : `started_at` est fixé par sa réservation
+    return ImportJob.objects.filter(id=job.id, status=ImportJob.RUNNING, started_at=job.started_at)
+
+
+def _finish(job, status, **fields):
+    now = timezone.now()
+    _running(job).update(status=status, finished_at=now, updated_at=now, **fields)
+
+
+def record_dry_run(file_name, summary, started_at, on_conflict=ImportJob.SKIP):
+    """Enregistre une simulation faite dans la requête (`sync=1`) : son rapport d'erreurs reste téléchargeable."""
+    return ImportJob.objects.create(
+        file_name=file_name,
+        dry_run=True,
+        on_conflict=on_conflict,
+        status=ImportJob.DONE,
+        **_counters(summary),
+        errors=summary['errors'],
+        started_at=started_at,
+        finished_at=timezone.now(),
+    )
+
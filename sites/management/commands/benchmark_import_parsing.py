@@ -0,0 +1,68 @@
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from risk_assessment.models import RiskAssessment
+from sites.importer import import_sheets, read_workbook
+from sites.synthetic import Dataset, import_workbook
+from vendor.models import Vendor
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la lecture d'un classeur de plusieurs feuilles (une par province) selon le nombre "
+        "de processus de lecture (IMPORT_PARSE_WORKERS) : lecture seule, puis import complet dans "
+        "une transaction annulée à la fin. La CPU du processus principal (ouverture, chaînes partagées, "
+        "écriture en base) borne le gain : sur N cœurs, la durée tend vers le maximum de cette CPU et "
+        "de la lecture des feuilles divisée par N."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--sheets', type=int, default=8)
+        parser.add_argument('--workers', default="1,2,4", help="Nombres de processus à comparer")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        workers = [int(value) for value in options['workers'].split(",")]
+        dataset = Dataset(list(Vendor.objects.all()[:20]), list(RiskAssessment.objects.all()[:5]), [])
+        self.stdout.write(f"Génération d'un classeur de {options['rows']} lignes sur {options['sheets']} feuilles ...")
+        data = import_workbook(options['rows'], dataset, seed=options['seed'], prefix="PARSE", sheets=options['sheets'])
+        self.stdout.write(f"cœurs disponibles : {len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}")
+
+        with tempfile.NamedTemporaryFile(suffix=".xlsx") as f:
+            f.write(data)
+            f.flush()
+            baseline = {}
+            for label, run in (("lecture", self._parse), ("import", self._import)):
+                for count in workers:
+                    seconds, cpu = run(f.name, count)
+                    baseline.setdefault(label, seconds)
+                    self.stdout.write(
+                        f"{label:>8} workers={count}: {seconds:.2f} s  {options['rows'] / seconds:.0f} lignes/s  "
+                        f"x{baseline[label] / seconds:.2f}  (CPU du processus principal : {cpu:.2f} s)"
+                    )
+
+    def _parse(self, path, workers):
+        start, cpu = time.perf_counter(), time.process_time()
+        for _, _, rows in read_workbook(path, workers=workers):
+            for _ in rows:
+                pass
+        return time.perf_counter() - start, time.process_time() - cpu
+
+    def _import(self, path, workers):
+        start, cpu = time.perf_counter(), time.process_time()
+        try:
+            with transaction.atomic():
+                import_sheets(read_workbook(path, workers=workers))
+                raise _Rollback
+        except _Rollback:
+            pass
+        return time.perf_counter() - start, time.process_time() - cpu
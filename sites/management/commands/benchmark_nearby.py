@@ -0,0 +1,69 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from sites.geo import nearest_sites
+from sites.models import Sites
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la latence de la recherche de proximité (k plus proches / rayon) sur des "
+        "sites synthétiques. Les données sont créées dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sites', type=int, default=200_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--k', type=int, default=20)
+        parser.add_argument('--radius-km', type=float, default=5.0)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        # Emprise approximative de la RDC
+        lat_range, lon_range = (-13.5, 5.4), (12.2, 31.3)
+
+        self.stdout.write(f"Création de {options['sites']} sites synthétiques ...")
+        Sites.objects.bulk_create(
+            (
+                Sites(
+                    name=f"Bench {i}", site_id=f"BENCH{i:07d}",
+                    latitude=rng.uniform(*lat_range), longitude=rng.uniform(*lon_range),
+                )
+                for i in range(options['sites'])
+            ),
+            batch_size=5000,
+        )
+
+        points = [(rng.uniform(*lat_range), rng.uniform(*lon_range)) for _ in range(options['queries'])]
+        queryset = Sites.objects.all()
+        for label, kwargs in (
+            (f"k={options['k']}", {'k': options['k']}),
+            (f"radius={options['radius_km']}km", {'k': 1000, 'radius_km': options['radius_km']}),
+        ):
+            timings = []
+            for lat, lon in points:
+                start = time.perf_counter()
+                nearest_sites(queryset, lat, lon, **kwargs)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f"{label:>16}: p50={statistics.median(timings):.2f} ms  p95={p95:.2f} ms  max={timings[-1]:.2f} ms"
+            )
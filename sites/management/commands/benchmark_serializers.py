@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from sites.models import Sites
+from sites.projection import site_rows
+from sites.serializers import SitesSerializer
+from sites.synthetic import create_dataset
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare la sérialisation de la liste des sites par SitesSerializer (DRF) et par "
+        "la projection `values_list` (sites.projection) : durée et octets identiques. "
+        "Les données synthétiques sont créées dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sites', type=int, default=100_000)
+        parser.add_argument('--vendors', type=int, default=20)
+        parser.add_argument('--zms', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        self.stdout.write(f"Création de {options['sites']} sites synthétiques ...")
+        create_dataset(options['sites'], vendors=options['vendors'], zms=options['zms'], seed=options['seed'])
+        queryset = Sites.objects.filter(site_id__startswith="BENCH").order_by('-created_at')
+
+        timings = {}
+        start = time.perf_counter()
+        drf = JSONRenderer().render(SitesSerializer(queryset.with_relations(), many=True).data)
+        timings["SitesSerializer"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fast = JSONRenderer().render(site_rows(queryset))
+        timings["projection"] = time.perf_counter() - start
+
+        for label, seconds in timings.items():
+            self.stdout.write(f"{label:>16}: {seconds:.2f} s (lecture, sérialisation et rendu JSON)")
+        self.stdout.write(f"{'accélération':>16}: x{timings['SitesSerializer'] / timings['projection']:.1f}")
+        self.stdout.write(f"{'octets identiques':>16}: {'oui' if drf == fast else 'NON'} ({len(fast)} octets)")
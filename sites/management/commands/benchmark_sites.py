@@ -0,0 +1,246 @@
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+
+from sites.models import Sites
+from sites.synthetic import LATITUDE_SPAN, LONGITUDE_SPAN, PLACES, create_dataset, import_csv, import_workbook
+
+SCENARIO_GROUPS = ("list", "filter", "search", "import", "export")
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(values, fraction):
+    # Rang le plus proche : sur peu de mesures, une valeur réellement observée
+    ordered = sorted(values)
+    return ordered[max(int(round(fraction * len(ordered))) - 1, 0)]
+
+
+def _server_timing(response):
+    """(durée SQL en ms, nombre de requêtes) lus dans l'en-tête Server-Timing."""
+    header = response.get("Server-Timing", "")
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        if name == "db":
+            params = dict(param.split("=", 1) for param in params)
+            return float(params["dur"]), int(params["desc"].strip('"').split()[0])
+    return None, None
+
+
+class Command(BaseCommand):
+    help = (
+        "Suite de performance des sites : génère des vendors / risk assessments / zone managers / "
+        "sites synthétiques (de 1k à 1M sites), puis mesure latence et débit de la liste, des "
+        "filtres, de la recherche, de l'import (Excel, CSV, CSV gzip) et des exports via la pile HTTP complète. "
+        "Résultats en JSON (--output) comparables entre deux exécutions (--compare). "
+        "Les sites déjà présents en base s'ajoutent aux sites synthétiques ; les données "
+        "sont créées dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sites', type=int, default=10_000)
+        parser.add_argument('--vendors', type=int, default=20)
+        parser.add_argument('--risk-assessments', type=int, default=3)
+        parser.add_argument('--zms', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=5, help="Mesures par scénario")
+        parser.add_argument('--import-rows', type=int, default=1000, help="Lignes du fichier importé")
+        parser.add_argument(
+            '--scenarios', default=",".join(SCENARIO_GROUPS),
+            help=f"Groupes à exécuter, séparés par des virgules ({', '.join(SCENARIO_GROUPS)})",
+        )
+        parser.add_argument('--output', help="Fichier JSON des résultats")
+        parser.add_argument('--compare', help="Résultats JSON d'une exécution précédente")
+        parser.add_argument(
+            '--threshold', type=float, default=1.25,
+            help="Régression si la médiane dépasse THRESHOLD x celle de --compare (erreur en sortie)",
+        )
+
+    def handle(self, *args, **options):
+        groups = [group.strip() for group in options['scenarios'].split(",") if group.strip()]
+        unknown = set(groups) - set(SCENARIO_GROUPS)
+        if unknown:
+            raise CommandError(f"Scénarios inconnus: {', '.join(sorted(unknown))}")
+        if options['repeat'] < 1:
+            raise CommandError("--repeat doit être au moins 1.")
+        if "import" in groups and options['import_rows'] > settings.IMPORT_SYNC_MAX_ROWS:
+            raise CommandError(f"--import-rows : {settings.IMPORT_SYNC_MAX_ROWS} au plus (import sync=1, IMPORT_SYNC_MAX_ROWS).")
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding="utf-8") as f:
+                baseline = json.load(f)
+
+        try:
+            with transaction.atomic():
+                results = self._run(options, groups)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                **{name: options[name] for name in ('sites', 'vendors', 'risk_assessments', 'zms', 'seed', 'repeat', 'import_rows')},
+            },
+            "results": results,
+        }
+        if options['output']:
+            with open(options['output'], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Résultats écrits dans {options['output']}")
+        if baseline is not None:
+            self._compare(baseline, report, options['threshold'])
+
+    def _run(self, options, groups):
+        self.stdout.write(f"Création de {options['sites']} sites synthétiques ...")
+        start = time.perf_counter()
+        dataset = create_dataset(
+            options['sites'], vendors=options['vendors'], risk_assessments=options['risk_assessments'],
+            zms=options['zms'], seed=options['seed'],
+        )
+        self.stdout.write(f"Données créées en {time.perf_counter() - start:.1f} s")
+
+        rng = random.Random(options['seed'])
+        results = {}
+        for group in groups:
+            for name, run in getattr(self, f"_{group}_scenarios")(options, dataset, rng):
+                results[name] = self._measure(name, run, options['repeat'])
+        return results
+
+    def _get(self, client, path, params=None, rows=None):
+        def run(index):
+            response = client.get(path, params or {})
+            if response.status_code != 200:
+                raise CommandError(f"GET {path} {params or ''}: HTTP {response.status_code}")
+            if response.streaming:
+                body = b"".join(response.streaming_content)
+            else:
+                body = response.content
+            return response, len(body), rows
+        return run
+
+    def _list_scenarios(self, options, dataset, rng):
+        client = Client()
+        yield "list_all", self._get(client, "/api/sites/all/")
+        yield "list_page", self._get(client, "/api/sites/all/", {"page_size": 100})
+        yield "list_fields", self._get(client, "/api/sites/all/", {"fields": "id,site_id,name,latitude,longitude"})
+        yield "stats", self._get(client, "/api/sites/stats/")
+
+    def _filter_scenarios(self, options, dataset, rng):
+        client = Client()
+        if dataset.vendors:
+            vendor = rng.choice(dataset.vendors)
+            yield "filter_vendor", self._get(client, "/api/sites/all/", {"vendor": vendor.id})
+            yield "filter_vendor_page", self._get(client, "/api/sites/all/", {"vendor": vendor.id, "page_size": 100})
+        if dataset.risk_assessments:
+            yield "filter_risk_assessment", self._get(
+                client, "/api/sites/all/", {"risk_assessment": rng.choice(dataset.risk_assessments).id}
+            )
+        yield "filter_security_type", self._get(client, "/api/sites/all/", {"security_type": "Guard"})
+        lat, lon = rng.uniform(*LATITUDE_SPAN), rng.uniform(*LONGITUDE_SPAN)
+        yield "filter_bbox", self._get(client, "/api/sites/all/", {"bbox": f"{lon - 1},{lat - 1},{lon + 1},{lat + 1}"})
+
+    def _search_scenarios(self, options, dataset, rng):
+        client = Client()
+        place = rng.choice(PLACES)
+        yield "search_filter", self._get(client, "/api/sites/all/", {"filter": place[:5], "page_size": 100})
+        yield "search_typeahead", self._get(client, "/api/sites/search/", {"q": place[:3]})
+        yield "search_site_id", self._get(client, "/api/sites/search/", {"q": "BENCH00012"})
+
+    def _import_scenarios(self, options, dataset, rng):
+        client = Client()
+        formats = (
+            ("import_xlsx", "sites.xlsx", import_workbook),
+            ("import_csv", "sites.csv", import_csv),
+            ("import_csv_gzip", "sites.csv.gz", lambda *args, **kwargs: import_csv(*args, compressed=True, **kwargs)),
+        )
+        for name, file_name, generate in formats:
+            # Un fichier par mesure (site_id distincts), généré avant la mesure
+            files = [
+                generate(options['import_rows'], dataset, seed=options['seed'] + run, prefix=f"{name.upper()}{run}-")
+                for run in range(options['repeat'])
+            ]
+            yield name, self._post_import(client, file_name, files, options['import_rows'])
+
+    def _post_import(self, client, file_name, files, rows):
+        def run(index):
+            upload = SimpleUploadedFile(file_name, files[index])
+            response = client.post("/api/sites/import-excel/?sync=1", {"file": upload})
+            if response.status_code != 200 or response.json()["created"] != rows:
+                raise CommandError(f"Import {file_name}: HTTP {response.status_code} {response.content[:200]!r}")
+            return response, len(files[index]), rows
+        return run
+
+    def _export_scenarios(self, options, dataset, rng):
+        client = Client()
+        # Export de tout l'inventaire (y compris les sites importés par le groupe `import`)
+        rows = Sites.objects.count()
+        yield "export_ndjson", self._get(client, "/api/sites/export/", {"output": "ndjson"}, rows)
+        yield "export_csv", self._get(client, "/api/sites/export/", {"output": "csv"}, rows)
+        yield "export_csv_gzip", self._get(client, "/api/sites/export/", {"output": "csv", "gzip": 1}, rows)
+
+    def _measure(self, name, run, repeat):
+        timings, db_timings = [], []
+        for index in range(repeat):
+            start = time.perf_counter()
+            response, size, rows = run(index)
+            timings.append((time.perf_counter() - start) * 1000)
+            db_ms, queries = _server_timing(response)
+            if db_ms is not None:
+                db_timings.append(db_ms)
+
+        if rows is None and response.get("Content-Type", "").startswith("application/json"):
+            # Listes (paginées ou non) : nombre de sites renvoyés
+            body = response.json()
+            if isinstance(body, dict):
+                body = body.get("results")
+            rows = len(body) if isinstance(body, list) else None
+        p50 = statistics.median(timings)
+        result = {
+            "runs": repeat,
+            "p50_ms": round(p50, 3),
+            "p95_ms": round(_percentile(timings, 0.95), 3),
+            "min_ms": round(min(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "bytes": size,
+            "rows": rows,
+            "rows_per_s": round(rows / (p50 / 1000), 1) if rows else None,
+            "mb_per_s": round(size / 1_000_000 / (p50 / 1000), 2),
+            "db_p50_ms": round(statistics.median(db_timings), 3) if db_timings else None,
+            "queries": queries,
+        }
+        self.stdout.write(
+            f"{name:>24}: p50={result['p50_ms']:.1f} ms  p95={result['p95_ms']:.1f} ms  "
+            f"{size / 1000:.0f} ko" + (f"  {result['rows_per_s']:.0f} lignes/s" if rows else "")
+        )
+        return result
+
+    def _compare(self, baseline, report, threshold):
+        regressions = []
+        self.stdout.write(f"Comparaison (médianes, seuil x{threshold}) :")
+        for name, result in report["results"].items():
+            previous = baseline.get("results", {}).get(name)
+            if previous is None:
+                continue
+            ratio = result["p50_ms"] / previous["p50_ms"] if previous["p50_ms"] else float("inf")
+            flag = "RÉGRESSION" if ratio > threshold else ""
+            self.stdout.write(f"{name:>24}: {previous['p50_ms']:.1f} -> {result['p50_ms']:.1f} ms  x{ratio:.2f} {flag}")
+            if ratio > threshold:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f"Régressions: {', '.join(regressions)}")
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sites.jobs import claim_next_job, run_import_job
+from sites.uploads import purge_uploads
+
+# Délai (s) entre deux purges des uploads, que des jobs soient en attente ou non
+PURGE_INTERVAL = 300
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker local qui traite les imports de sites en attente (table ImportJob) et supprime "
+        "régulièrement les uploads par morceaux expirés ou dont l'import est terminé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Traite les jobs en attente puis s'arrête.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Délai (s) entre deux scrutations.")
+
+    def handle(self, *args, **options):
+        next_purge = 0
+        while True:
+            if time.monotonic() >= next_purge:
+                expired, finished = purge_uploads()
+                if expired or finished:
+                    self.stdout.write(f"Uploads supprimés : {expired} expiré(s), {finished} importé(s)")
+                next_purge = time.monotonic() + PURGE_INTERVAL
+
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+
+            self.stdout.write(f"Import {job.id} ({job.file_name}) ...")
+            run_import_job(job)
+            job.refresh_from_db()
+            self.stdout.write(
+                f"Import {job.id}: {job.status} "
+                f"(created={job.created}, skipped={job.skipped}, errors={job.error_count})"
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from sites.stats import rebuild_summary, sites_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule le résumé des statistiques de sites (table SitesStat) à partir de la table "
+        "des sites, après des modifications faites hors API (admin, shell, SQL)."
+    )
+
+    def handle(self, *args, **options):
+        rebuild_summary()
+        self.stdout.write(f"Résumé recalculé : {sites_stats()['total']} sites.")
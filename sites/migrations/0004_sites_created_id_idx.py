@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("risk_assessment", "0001_initial"),
+        ("sites", "0003_sites_security_type"),
+        ("vendor", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sites",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="sites_created_id_idx"
+            ),
+        ),
+    ]
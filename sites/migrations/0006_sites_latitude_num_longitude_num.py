@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sites", "0005_importjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sites",
+            name="latitude_num",
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name="sites",
+            name="longitude_num",
+            field=models.FloatField(null=True),
+        ),
+    ]
@@ -0,0 +1,58 @@
+import logging
+import math
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def _parse(value, limit):
+    if value is None:
+        return None
+    try:
+        number = float(str(value).strip().replace(",", "."))
+    except ValueError:
+        return None
+    if not math.isfinite(number) or abs(number) > limit:
+        return None
+    return number
+
+
+def parse_coordinates(apps, schema_editor):
+    """Copie latitude/longitude (texte) vers les colonnes numériques, par lots de BATCH_SIZE."""
+    Sites = apps.get_model("sites", "Sites")
+    invalid = 0
+    last_pk = None
+    while True:
+        qs = Sites.objects.order_by("pk")
+        if last_pk is not None:
+            qs = qs.filter(pk__gt=last_pk)
+        batch = list(qs.only("pk", "latitude", "longitude")[:BATCH_SIZE])
+        if not batch:
+            break
+        for site in batch:
+            site.latitude_num = _parse(site.latitude, 90)
+            site.longitude_num = _parse(site.longitude, 180)
+            # Valeur non vide mais inexploitable : le site perd la coordonnée
+            invalid += (site.latitude not in (None, "") and site.latitude_num is None)
+            invalid += (site.longitude not in (None, "") and site.longitude_num is None)
+        with transaction.atomic():
+            Sites.objects.bulk_update(batch, ["latitude_num", "longitude_num"])
+        last_pk = batch[-1].pk
+    if invalid:
+        logger.warning("%d coordonnée(s) invalide(s) remplacée(s) par NULL.", invalid)
+
+
+class Migration(migrations.Migration):
+    # Un lot = une transaction, pour ne pas verrouiller toute la table d'un coup
+    atomic = False
+
+    dependencies = [
+        ("sites", "0006_sites_latitude_num_longitude_num"),
+    ]
+
+    operations = [
+        migrations.RunPython(parse_coordinates, migrations.RunPython.noop),
+    ]
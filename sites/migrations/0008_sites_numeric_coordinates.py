@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sites", "0007_parse_site_coordinates"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="sites",
+            name="latitude",
+        ),
+        migrations.RemoveField(
+            model_name="sites",
+            name="longitude",
+        ),
+        migrations.RenameField(
+            model_name="sites",
+            old_name="latitude_num",
+            new_name="latitude",
+        ),
+        migrations.RenameField(
+            model_name="sites",
+            old_name="longitude_num",
+            new_name="longitude",
+        ),
+        migrations.AddIndex(
+            model_name="sites",
+            index=models.Index(
+                fields=["latitude", "longitude"], name="sites_lat_lon_idx"
+            ),
+        ),
+    ]
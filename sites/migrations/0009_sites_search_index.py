@@ -0,0 +1,68 @@
+from django.db import migrations
+
+# SQL de l'index de recherche dans sa version initiale, figé ici : `sites.search`
+# décrit la version courante (cf. 0016_sites_search_rowid)
+FTS_TABLE = "CREATE VIRTUAL TABLE IF NOT EXISTS sites_search USING fts5(id UNINDEXED, site_id, name, tokenize='trigram')"
+TRIGGERS = {
+    "sites_search_ai": """
+        CREATE TRIGGER sites_search_ai AFTER INSERT ON sites_sites BEGIN
+            INSERT INTO sites_search(id, site_id, name) VALUES (new.id, new.site_id, new.name);
+        END""",
+    "sites_search_ad": """
+        CREATE TRIGGER sites_search_ad AFTER DELETE ON sites_sites BEGIN
+            DELETE FROM sites_search WHERE id = old.id;
+        END""",
+    "sites_search_au": """
+        CREATE TRIGGER sites_search_au AFTER UPDATE OF site_id, name ON sites_sites BEGIN
+            UPDATE sites_search SET site_id = new.site_id, name = new.name WHERE id = old.id;
+        END""",
+}
+NOCASE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS sites_name_nocase_idx ON sites_sites(name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS sites_site_id_nocase_idx ON sites_sites(site_id COLLATE NOCASE)",
+]
+POSTGRES_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS sites_name_trgm_idx ON sites_sites USING gin (UPPER(name::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS sites_site_id_trgm_idx ON sites_sites USING gin (UPPER(site_id::text) gin_trgm_ops)",
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(FTS_TABLE)
+        for sql in NOCASE_INDEXES:
+            schema_editor.execute(sql)
+        for name, sql in TRIGGERS.items():
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            schema_editor.execute(sql)
+        schema_editor.execute("DELETE FROM sites_search")
+        schema_editor.execute(
+            "INSERT INTO sites_search(id, site_id, name) SELECT id, site_id, name FROM sites_sites"
+        )
+    elif schema_editor.connection.vendor == "postgresql":
+        for sql in POSTGRES_STATEMENTS:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for name in TRIGGERS:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        schema_editor.execute("DROP INDEX IF EXISTS sites_name_nocase_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS sites_site_id_nocase_idx")
+        schema_editor.execute("DROP TABLE IF EXISTS sites_search")
+    elif schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS sites_name_trgm_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS sites_site_id_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sites", "0008_sites_numeric_coordinates"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("risk_assessment", "0001_initial"),
+        ("sites", "0009_sites_search_index"),
+        ("vendor", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SiteTombstone",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                ("site_id", models.CharField(max_length=100, null=True)),
+                ("deleted_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="sites",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        # Les sites existants sont considérés comme modifiés à leur création
+        migrations.RunSQL(
+            "UPDATE sites_sites SET updated_at = created_at",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name="sites",
+            index=models.Index(
+                fields=["updated_at", "id"], name="sites_updated_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sitetombstone",
+            index=models.Index(
+                fields=["deleted_at", "id"], name="sites_tombstone_deleted_idx"
+            ),
+        ),
+    ]
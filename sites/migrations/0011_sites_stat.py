@@ -0,0 +1,65 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:12
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+DIMENSIONS = {
+    "vendor": "vendor_id",
+    "risk_assessment": "risk_assessment_id",
+    "security_type": "security_type",
+    "zm": "zm_id",
+}
+
+
+def build_summary(apps, schema_editor):
+    """Compteurs initiaux du résumé, à partir des sites existants."""
+    Sites = apps.get_model("sites", "Sites")
+    SitesStat = apps.get_model("sites", "SitesStat")
+    counts = Counter({("total", ""): Sites.objects.count()})
+    for dimension, column in DIMENSIONS.items():
+        rows = Sites.objects.order_by().values_list(column).annotate(n=Count("id"))
+        for value, count in rows:
+            # NULL et '' : même compteur « non renseigné »
+            counts[(dimension, "" if value is None else str(value))] += count
+    SitesStat.objects.bulk_create(
+        SitesStat(dimension=dimension, key=key, count=count)
+        for (dimension, key), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sites", "0010_sites_sync"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SitesStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dimension", models.CharField(max_length=20)),
+                ("key", models.CharField(blank=True, max_length=100)),
+                ("count", models.IntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dimension", "key"),
+                        name="sites_stat_dimension_key_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("risk_assessment", "0002_risk_name_upper_idx"),
+        ("sites", "0011_sites_stat"),
+        ("vendor", "0002_vendor_name_upper_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Index composites d'abord : les index des clés étrangères n'en sont que le préfixe
+        migrations.AddIndex(
+            model_name="sites",
+            index=models.Index(
+                fields=["vendor", "-created_at", "-id"], name="sites_vendor_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sites",
+            index=models.Index(
+                fields=["risk_assessment", "-created_at", "-id"],
+                name="sites_risk_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sites",
+            index=models.Index(
+                fields=["security_type", "-created_at", "-id"],
+                name="sites_security_created_idx",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="sites",
+            name="risk_assessment",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="risk_assessment.riskassessment",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="sites",
+            name="vendor",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="vendor.vendor",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sites", "0012_sites_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="dry_run",
+            field=models.BooleanField(default=False),
+        ),
+    ]
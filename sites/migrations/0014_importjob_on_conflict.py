@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sites", "0013_importjob_dry_run"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="on_conflict",
+            field=models.CharField(
+                choices=[
+                    ("skip", "Ignorer la ligne"),
+                    ("update", "Mettre à jour le site"),
+                ],
+                default="skip",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="unchanged",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="updated",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# Triggers de 0009 (version figée) : la ligne FTS est retrouvée par sa colonne `id`
+LEGACY_TRIGGERS = {
+    "sites_search_ai": """
+        CREATE TRIGGER sites_search_ai AFTER INSERT ON sites_sites BEGIN
+            INSERT INTO sites_search(id, site_id, name) VALUES (new.id, new.site_id, new.name);
+        END""",
+    "sites_search_ad": """
+        CREATE TRIGGER sites_search_ad AFTER DELETE ON sites_sites BEGIN
+            DELETE FROM sites_search WHERE id = old.id;
+        END""",
+    "sites_search_au": """
+        CREATE TRIGGER sites_search_au AFTER UPDATE OF site_id, name ON sites_sites BEGIN
+            UPDATE sites_search SET site_id = new.site_id, name = new.name WHERE id = old.id;
+        END""",
+}
+
+
+def create_search_rowids(apps, schema_editor):
+    from sites.search import ensure_search_index
+
+    # Table id -> rowid FTS et triggers qui l'utilisent, index FTS reconstruit
+    ensure_search_index(schema_editor.connection)
+
+
+def drop_search_rowids(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for name, sql in LEGACY_TRIGGERS.items():
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            schema_editor.execute(sql)
+        schema_editor.execute("DROP TABLE IF EXISTS sites_search_rowid")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sites", "0015_importupload"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_rowids, drop_search_rowids),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sites", "0016_sites_search_rowid"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="sha256",
+            field=models.CharField(max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sites", "0017_importjob_sha256"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
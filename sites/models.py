@@ -7,21 +7,146 @@ from vendor.models import Vendor
 # Create your models here.
 
 
+class SitesQuerySet(models.QuerySet):
+  def with_relations(self):
+    """Charge en une seule requête (JOIN) tout ce que SitesSerializer imbrique."""
+    return self.select_related('vendor', 'risk_assessment', 'zm__role', 'zm__function')
+
+
 class Sites(models.Model):
   id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
   name = models.CharField(max_length=100, null=True)
   security_type = models.CharField(max_length=100, null=True)
   site_id = models.CharField(max_length=100, unique=True, null=True)
-  latitude = models.CharField(max_length=100, null=True)
-  longitude = models.CharField(max_length=100, null=True)
+  latitude = models.FloatField(null=True)
+  longitude = models.FloatField(null=True)
+  # Pas d'index propre : préfixe de sites_vendor_created_idx
   vendor = models.ForeignKey(
-        Vendor, on_delete=models.CASCADE, null=True
+        Vendor, on_delete=models.CASCADE, null=True, db_index=False
     )
   zm = models.ForeignKey(
         User, on_delete=models.CASCADE, null=True
     )
+  # Pas d'index propre : préfixe de sites_risk_created_idx
   risk_assessment = models.ForeignKey(
-        RiskAssessment, on_delete=models.CASCADE, null=True
+        RiskAssessment, on_delete=models.CASCADE, null=True, db_index=False
     )
   
   created_at = models.DateTimeField(auto_now_add=True)
+  # Mis à jour à chaque save() / bulk_create ; les update() doivent le renseigner eux-mêmes
+  updated_at = models.DateTimeField(auto_now=True)
+
+  objects = SitesQuerySet.as_manager()
+
+  class Meta:
+    indexes = [
+      # Pagination keyset sur (created_at, id) décroissant
+      models.Index(fields=['-created_at', '-id'], name='sites_created_id_idx'),
+      # Filtre bbox (carte) : plage sur latitude puis longitude
+      models.Index(fields=['latitude', 'longitude'], name='sites_lat_lon_idx'),
+      # Synchronisation incrémentale : modifications depuis (updated_at, id)
+      models.Index(fields=['updated_at', 'id'], name='sites_updated_id_idx'),
+      # Filtres de la liste suivis du tri (et de la pagination) par date décroissante
+      models.Index(fields=['vendor', '-created_at', '-id'], name='sites_vendor_created_idx'),
+      models.Index(fields=['risk_assessment', '-created_at', '-id'], name='sites_risk_created_idx'),
+      models.Index(fields=['security_type', '-created_at', '-id'], name='sites_security_created_idx'),
+    ]
+
+
+class SiteTombstone(models.Model):
+  """Trace d'un site supprimé, transmise aux clients par la synchronisation incrémentale."""
+
+  # Même id que le site supprimé
+  id = models.UUIDField(primary_key=True, editable=False)
+  site_id = models.CharField(max_length=100, null=True)
+  deleted_at = models.DateTimeField(auto_now=True)
+
+  class Meta:
+    indexes = [
+      models.Index(fields=['deleted_at', 'id'], name='sites_tombstone_deleted_idx'),
+    ]
+
+
+
+class SitesStat(models.Model):
+  """
+  Résumé matérialisé du tableau de bord : nombre de sites par dimension
+  (vendor, risk_assessment, security_type, zm ; 'total' pour l'ensemble),
+  tenu à jour à chaque création / import / suppression (sites.stats).
+  """
+
+  dimension = models.CharField(max_length=20)
+  # id de la relation ou valeur de security_type ; '' : non renseigné
+  key = models.CharField(max_length=100, blank=True)
+  count = models.IntegerField(default=0)
+
+  class Meta:
+    constraints = [
+      models.UniqueConstraint(fields=['dimension', 'key'], name='sites_stat_dimension_key_uniq'),
+    ]
+
+
+class ImportJob(models.Model):
+  """Import de sites traité en arrière-plan (commande `process_import_jobs`)."""
+
+  PENDING = 'pending'
+  RUNNING = 'running'
+  DONE = 'done'
+  FAILED = 'failed'
+  STATUS_CHOICES = [
+    (PENDING, 'En attente'),
+    (RUNNING, 'En cours'),
+    (DONE, 'Terminé'),
+    (FAILED, 'Échoué'),
+  ]
+  # Ligne dont le site_id existe déjà en base
+  SKIP = 'skip'
+  UPDATE = 'update'
+  ON_CONFLICT_CHOICES = [
+    (SKIP, 'Ignorer la ligne'),
+    (UPDATE, 'Mettre à jour le site'),
+  ]
+
+  id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+  file = models.FileField(upload_to='imports/')
+  file_name = models.CharField(max_length=255, null=True)
+  status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+  message = models.TextField(null=True)
+  # Simulation : validation de toutes les lignes sans rien écrire dans Sites
+  dry_run = models.BooleanField(default=False)
+  on_conflict = models.CharField(max_length=10, choices=ON_CONFLICT_CHOICES, default=SKIP)
+  # SHA-256 attendu du fichier (upload par morceaux), vérifié par le worker avant l'import
+  sha256 = models.CharField(max_length=64, null=True)
+
+  rows_processed = models.PositiveIntegerField(default=0)
+  created = models.PositiveIntegerField(default=0)
+  updated = models.PositiveIntegerField(default=0)
+  unchanged = models.PositiveIntegerField(default=0)
+  skipped = models.PositiveIntegerField(default=0)
+  error_count = models.PositiveIntegerField(default=0)
+  errors = models.JSONField(default=list)
+
+  created_at = models.DateTimeField(auto_now_add=True)
+  started_at = models.DateTimeField(null=True)
+  # Dernière progression enregistrée par le worker (un job en cours sans progression est abandonné)
+  updated_at = models.DateTimeField(auto_now=True)
+  finished_at = models.DateTimeField(null=True)
+
+
+class ImportUpload(models.Model):
+  """
+  Fichier d'import envoyé par morceaux (upload reprenable) : les morceaux sont
+  écrits directement dans `uploads/<id>.part` (MEDIA_ROOT), puis le fichier
+  assemblé est confié à un ImportJob.
+  """
+
+  id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+  file_name = models.CharField(max_length=255)
+  # Taille totale annoncée et octets reçus (prochain offset attendu)
+  size = models.PositiveBigIntegerField()
+  offset = models.PositiveBigIntegerField(default=0)
+  # Job créé par la finalisation
+  job = models.OneToOneField(ImportJob, on_delete=models.SET_NULL, null=True, related_name='upload')
+
+  created_at = models.DateTimeField(auto_now_add=True)
+  updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,77 @@
+import base64
+import binascii
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.utils.urls import replace_query_param
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk) -> str:
+    """Curseur opaque: base64 urlsafe de 'created_at|id'."""
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at_raw, pk_raw = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        created_at = parse_datetime(created_at_raw)
+        pk = uuid.UUID(pk_raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if created_at is None:
+        raise InvalidCursor(cursor)
+    return created_at, pk
+
+
+def get_page_size(request) -> int:
+    raw = request.GET.get("page_size")
+    if not raw:
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(raw)
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def is_paginated(request) -> bool:
+    return "cursor" in request.GET or "page_size" in request.GET
+
+
+def paginate_keyset(queryset, request):
+    """
+    Pagination par clé (keyset) sur (created_at, id), ordre décroissant.
+
+    Chaque page est un simple `WHERE (created_at, id) < (curseur)` suivi d'un
+    `LIMIT`, donc la page N coûte autant que la page 1.
+    Retourne (lignes de la page, URL de la page suivante ou None).
+    """
+    page_size = get_page_size(request)
+    queryset = queryset.order_by("-created_at", "-id")
+
+    cursor = request.GET.get("cursor")
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+
+    rows = list(queryset[:page_size + 1])
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_url = replace_query_param(
+            request.build_absolute_uri(), "cursor", encode_cursor(last.created_at, last.id)
+        )
+    return rows, next_url
@@ -0,0 +1,155 @@
+import uuid
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .serializers import SitesSerializer
+
+# Nombre de pk par requête `IN (...)` pour charger les objets imbriqués
+IN_BATCH_SIZE = 500
+
+
+def _identity_if(type_, field):
+    # Valeur déjà du type produit par le champ DRF : inutile de la convertir
+    def convert(value):
+        return value if type(value) is type_ else field.to_representation(value)
+    return convert
+
+
+def _pk(value):
+    # PrimaryKeyRelatedField renvoie la pk ; le JSONEncoder de DRF écrit les UUID avec str()
+    return str(value) if isinstance(value, uuid.UUID) else value
+
+
+def _datetime(field):
+    """
+    DateTimeField.to_representation au format ISO 8601 : le fuseau du champ est
+    résolu une fois (et non à chaque valeur) pour les datetimes avec fuseau.
+    """
+    if getattr(field, 'format', api_settings.DATETIME_FORMAT) != ISO_8601:
+        return field.to_representation
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if type(value) is not datetime or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _converter(field):
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime(field)
+    if isinstance(field, serializers.CharField):
+        return _identity_if(str, field)
+    if isinstance(field, serializers.FloatField):
+        return _identity_if(float, field)
+    if isinstance(field, serializers.BooleanField):
+        return _identity_if(bool, field)
+    if isinstance(field, serializers.UUIDField) and field.uuid_format == 'hex_verbose':
+        return str
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        return _pk
+    if isinstance(field, serializers.ReadOnlyField):
+        return lambda value: value
+    return field.to_representation
+
+
+class _Plan:
+    """
+    Représentation d'un ModelSerializer lue par `values_list` : pour chaque
+    champ, l'index de sa colonne et sa conversion. Un serializer imbriqué
+    (vendor, zm, rôle...) n'est lu que par sa clé étrangère ; ses objets sont
+    chargés par une requête séparée, une fois par pk, puis partagés.
+    """
+
+    def __init__(self, serializer, nested=False):
+        self.model = serializer.Meta.model
+        self.columns = []
+        self.annotations = {}
+        # (clé, index de la colonne, conversion, plan imbriqué)
+        self.steps = []
+        # pk -> objet déjà construit (plans imbriqués)
+        self.cache = {}
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or '.' in field.source or isinstance(
+                field, (serializers.ListSerializer, serializers.SerializerMethodField, serializers.ManyRelatedField)
+            ):
+                raise TypeError(f"Champ non projetable: {name}")
+            if isinstance(field, serializers.ModelSerializer):
+                self.steps.append((name, self._key(field.source), None, _Plan(field, nested=True)))
+            else:
+                self.steps.append((name, self._column(field.source), _converter(field), None))
+        if nested:
+            self.key_position = self._key(self.model._meta.pk.name)
+
+    def _column(self, path):
+        if path not in self.columns:
+            self.columns.append(path)
+        return self.columns.index(path)
+
+    def _key(self, path):
+        # Clé (étrangère) lue en texte : elle ne sert qu'à retrouver l'objet
+        # imbriqué, inutile de construire un UUID par ligne
+        alias = f"{path}_projection_key"
+        self.annotations[alias] = Cast(path, output_field=TextField())
+        return self._column(alias)
+
+    def values(self, queryset):
+        return queryset.annotate(**self.annotations).values_list(*self.columns)
+
+    def build(self, rows):
+        """Représentations des lignes `rows` (tuples de `values_list(*self.columns)`)."""
+        steps = []
+        for name, position, convert, nested in self.steps:
+            if nested is not None:
+                convert = nested.lookup({row[position] for row in rows} - {None}).__getitem__
+            steps.append((name, position, convert))
+
+        items = []
+        for row in rows:
+            item = {}
+            for name, position, convert in steps:
+                value = row[position]
+                item[name] = None if value is None else convert(value)
+            items.append(item)
+        return items
+
+    def lookup(self, pks):
+        """pk -> représentation, pour au moins `pks` ; seuls les pk pas encore lus sont chargés."""
+        missing = list(pks - self.cache.keys())
+        for start in range(0, len(missing), IN_BATCH_SIZE):
+            rows = list(self.values(self.model._default_manager.filter(pk__in=missing[start:start + IN_BATCH_SIZE])))
+            self.cache.update(zip((row[self.key_position] for row in rows), self.build(rows)))
+        return self.cache
+
+
+def site_rows(queryset, fields=None, expand=None):
+    """
+    Même contenu que `SitesSerializer(queryset, many=True, fields=..., expand=...).data`,
+    dans l'ordre du queryset, sans instancier de modèles ni de champs DRF par
+    ligne : une requête `values_list` sans jointure pour les sites, plus une
+    par relation imbriquée.
+    """
+    plan = _Plan(SitesSerializer(fields=fields, expand=expand))
+    return plan.build(list(plan.values(queryset)))
+
+
+def iter_site_rows(queryset, chunk_size, fields=None, expand=None):
+    """Comme `site_rows`, par blocs de `chunk_size` sites lus via un curseur (mémoire bornée)."""
+    plan = _Plan(SitesSerializer(fields=fields, expand=expand))
+    rows = plan.values(queryset).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield plan.build(chunk)
@@ -0,0 +1,152 @@
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Collate, Upper
+
+from .models import Sites
+
+# Les index trigrammes (FTS5 / pg_trgm) ne servent qu'à partir de 3 caractères
+MIN_INDEXED_LENGTH = 3
+
+SQLITE_FTS_TABLE = "sites_search"
+# id du site -> rowid de sa ligne FTS : la colonne `id` de la table FTS n'est
+# pas indexée (WHERE id = ... lirait tout l'index à chaque modification), et le
+# rowid de sites_sites ne peut pas servir de clé (VACUUM peut le renuméroter)
+SQLITE_FTS_ROWIDS = "sites_search_rowid"
+SQLITE_TRIGGERS = {
+    "sites_search_ai": f"""
+        CREATE TRIGGER sites_search_ai AFTER INSERT ON sites_sites BEGIN
+            INSERT INTO {SQLITE_FTS_TABLE}(id, site_id, name) VALUES (new.id, new.site_id, new.name);
+            INSERT INTO {SQLITE_FTS_ROWIDS}(id, fts_rowid) VALUES (new.id, last_insert_rowid());
+        END""",
+    "sites_search_ad": f"""
+        CREATE TRIGGER sites_search_ad AFTER DELETE ON sites_sites BEGIN
+            DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = (SELECT fts_rowid FROM {SQLITE_FTS_ROWIDS} WHERE id = old.id);
+            DELETE FROM {SQLITE_FTS_ROWIDS} WHERE id = old.id;
+        END""",
+    "sites_search_au": f"""
+        CREATE TRIGGER sites_search_au AFTER UPDATE OF site_id, name ON sites_sites
+        WHEN new.site_id IS NOT old.site_id OR new.name IS NOT old.name BEGIN
+            UPDATE {SQLITE_FTS_TABLE} SET site_id = new.site_id, name = new.name
+            WHERE rowid = (SELECT fts_rowid FROM {SQLITE_FTS_ROWIDS} WHERE id = old.id);
+        END""",
+}
+
+# Préfixes insensibles à la casse (LIKE 'x%' / istartswith) servis par index
+SQLITE_NOCASE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS sites_name_nocase_idx ON sites_sites(name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS sites_site_id_nocase_idx ON sites_sites(site_id COLLATE NOCASE)",
+]
+
+POSTGRES_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # Expressions identiques à celles générées par Django pour `icontains`
+    "CREATE INDEX IF NOT EXISTS sites_name_trgm_idx ON sites_sites USING gin (UPPER(name::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS sites_site_id_trgm_idx ON sites_sites USING gin (UPPER(site_id::text) gin_trgm_ops)",
+]
+
+
+def ensure_search_index(conn=connection):
+    """
+    Crée l'index de recherche s'il manque (idempotent).
+
+    SQLite : table FTS5 (tokenizer trigram) tenue à jour par triggers, ce qui
+    couvre aussi les `bulk_create` / `bulk_update` de l'import, et index
+    COLLATE NOCASE pour les préfixes. Les migrations qui recréent
+    `sites_sites` suppriment triggers et index : ils sont alors recréés (de
+    même s'ils diffèrent de `SQLITE_TRIGGERS`) et l'index FTS reconstruit
+    (appelé aussi après chaque `migrate`).
+    PostgreSQL : index GIN pg_trgm sur `name` et `site_id`.
+    """
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} "
+                "USING fts5(id UNINDEXED, site_id, name, tokenize='trigram')"
+            )
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SQLITE_FTS_ROWIDS} "
+                "(id char(32) PRIMARY KEY, fts_rowid integer NOT NULL) WITHOUT ROWID"
+            )
+            for sql in SQLITE_NOCASE_INDEXES:
+                cursor.execute(sql)
+            cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'sites_sites'")
+            existing = dict(cursor.fetchall())
+            # Triggers absents ou d'une version précédente
+            if all(existing.get(name) == sql.strip() for name, sql in SQLITE_TRIGGERS.items()):
+                return
+            for name, sql in SQLITE_TRIGGERS.items():
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+                cursor.execute(sql)
+            cursor.execute(f"DELETE FROM {SQLITE_FTS_TABLE}")
+            cursor.execute(f"DELETE FROM {SQLITE_FTS_ROWIDS}")
+            cursor.execute(f"INSERT INTO {SQLITE_FTS_TABLE}(id, site_id, name) SELECT id, site_id, name FROM sites_sites")
+            cursor.execute(f"INSERT INTO {SQLITE_FTS_ROWIDS}(id, fts_rowid) SELECT id, rowid FROM {SQLITE_FTS_TABLE}")
+        elif conn.vendor == "postgresql":
+            for sql in POSTGRES_STATEMENTS:
+                cursor.execute(sql)
+
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _uses_fts(term):
+    return connection.vendor == "sqlite" and len(term) >= MIN_INDEXED_LENGTH
+
+
+def search_q(term):
+    """
+    Filtre texte partiel (insensible à la casse) sur `name` et `site_id`, même
+    sémantique que `icontains`. Sur SQLite il passe par l'index FTS5 ; sur
+    PostgreSQL `icontains` est servi par les index GIN trigrammes.
+    """
+    if _uses_fts(term):
+        return Q(pk__in=RawSQL(
+            f"SELECT id FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s", (_fts_phrase(term),)
+        ))
+    return Q(name__icontains=term) | Q(site_id__icontains=term)
+
+
+def typeahead(term, limit):
+    """
+    Les `limit` meilleurs sites pour l'autocomplétion, sous forme de dicts
+    (id, site_id, name). Classement : site_id exact, préfixe de site_id,
+    préfixe de name (ordre alphabétique), puis correspondance partielle.
+
+    Chaque étape est une lecture d'index bornée par `limit` : le coût ne
+    dépend pas du nombre de sites qui correspondent.
+    """
+    base = Sites.objects.values('id', 'site_id', 'name')
+    steps = [
+        lambda n: base.filter(site_id__iexact=term)[:n],
+        lambda n: base.filter(site_id__istartswith=term).order_by(_nocase('site_id'))[:n],
+        lambda n: base.filter(name__istartswith=term).order_by(_nocase('name'))[:n],
+        lambda n: base.filter(pk__in=_substring_match_ids(term, n)),
+    ]
+    results, seen = [], set()
+    for step in steps:
+        for row in step(limit + len(results)):
+            if row['id'] not in seen:
+                seen.add(row['id'])
+                results.append(row)
+        if len(results) >= limit:
+            break
+    return results[:limit]
+
+
+def _substring_match_ids(term, n):
+    if _uses_fts(term):
+        # LIMIT appliqué dans l'index FTS, sans matérialiser toutes les correspondances
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s LIMIT %s",
+                (_fts_phrase(term), n),
+            )
+            return [row[0] for row in cursor.fetchall()]
+    return Sites.objects.filter(search_q(term)).values_list('pk', flat=True)[:n]
+
+
+def _nocase(field):
+    # Sur SQLite, COLLATE NOCASE correspond aux index *_nocase_idx (tri sans lecture de toute la table)
+    return Collate(field, 'nocase') if connection.vendor == 'sqlite' else Upper(field)
@@ -1,14 +1,37 @@
+from typing import List, Optional
+
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Sites
+from .jobs import ERRORS_PREVIEW
+from .models import ImportJob, ImportUpload, Sites
 from vendor.serializers import VendorSerializer
 from account.serializers import UserSerializer
 from risk_assessment.serializers import RiskAssementSerializer
 
+# Relations que SitesSerializer peut imbriquer (paramètre `expand`)
+EXPANDABLE_RELATIONS = ('vendor', 'risk_assessment', 'zm')
+
 class SitesSerializer(serializers.ModelSerializer):
+    """
+    `fields` : sous-ensemble des champs à produire (défaut : tous).
+    `expand` : relations produites en objets imbriqués, les autres le sont par
+    leur id (défaut : toutes imbriquées).
+    """
     risk_assessment = RiskAssementSerializer()
     vendor = VendorSerializer()
     zm = UserSerializer() 
 
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        if expand is not None:
+            for name in set(EXPANDABLE_RELATIONS) - set(expand):
+                if name in self.fields:
+                    self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+
     class Meta:
         model = Sites
         fields = [
@@ -22,4 +45,66 @@ class SitesSerializer(serializers.ModelSerializer):
             'security_type',
             'risk_assessment',
             'created_at'
-        ]
\ No newline at end of file
+        ]
+
+class SitesSyncSerializer(SitesSerializer):
+    class Meta(SitesSerializer.Meta):
+        fields = SitesSerializer.Meta.fields + ['updated_at']
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    errors = serializers.SerializerMethodField()
+    rows_per_second = serializers.SerializerMethodField()
+    error_report = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id',
+            'file_name',
+            'status',
+            'dry_run',
+            'on_conflict',
+            'message',
+            'rows_processed',
+            'created',
+            'updated',
+            'unchanged',
+            'skipped',
+            'error_count',
+            'errors',
+            'error_report',
+            'rows_per_second',
+            'created_at',
+            'started_at',
+            'finished_at'
+        ]
+
+    def get_errors(self, job) -> List[str]:
+        # Aperçu seulement (réponse relue à chaque suivi) : la liste complète est dans `error_report`
+        return job.errors[:ERRORS_PREVIEW]
+
+    def get_rows_per_second(self, job) -> Optional[float]:
+        if not job.started_at:
+            return None
+        elapsed = ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+        return round(job.rows_processed / elapsed, 1) if elapsed > 0 else None
+
+    def get_error_report(self, job) -> Optional[str]:
+        # Rapport CSV complet, une fois l'import terminé
+        if job.status != ImportJob.DONE or not job.error_count:
+            return None
+        return reverse('get_import_job_errors', args=[job.id])
+
+
+class ImportUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportUpload
+        fields = [
+            'id',
+            'file_name',
+            'size',
+            'offset',
+            'job',
+            'created_at',
+            'updated_at'
+        ]
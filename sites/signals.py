@@ -0,0 +1,24 @@
+from django.db import transaction
+
+from smdb.cache import bump_generation
+from .models import SiteTombstone
+from .stats import record_sites
+
+
+def record_tombstone(sender, instance, **kwargs):
+    """
+    Conserve l'id de chaque site supprimé (API, admin, suppression en cascade
+    d'un vendor...) pour que la synchronisation le transmette aux clients.
+    """
+    SiteTombstone.objects.update_or_create(id=instance.id, defaults={'site_id': instance.site_id})
+    transaction.on_commit(lambda: bump_generation('sites'))
+
+
+def count_created_site(sender, instance, created, raw=False, **kwargs):
+    # Les imports (bulk_create, sans signal) appellent record_sites eux-mêmes
+    if created and not raw:
+        record_sites([instance])
+
+
+def uncount_deleted_site(sender, instance, **kwargs):
+    record_sites([instance], sign=-1)
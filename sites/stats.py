@@ -0,0 +1,140 @@
+import operator
+from collections import Counter
+from functools import reduce
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+
+from account.models import User
+from risk_assessment.models import RiskAssessment
+from vendor.models import Vendor
+from .models import Sites, SitesStat
+
+TOTAL = 'total'
+# Dimension -> colonne de Sites comptée
+DIMENSIONS = {
+    'vendor': 'vendor_id',
+    'risk_assessment': 'risk_assessment_id',
+    'security_type': 'security_type',
+    'zm': 'zm_id',
+}
+# Libellés des dimensions qui sont des relations
+LABELS = {
+    'vendor': (Vendor, 'name'),
+    'risk_assessment': (RiskAssessment, 'name'),
+    'zm': (User, 'name'),
+}
+
+
+def summary_enabled():
+    return settings.SITES_STATS_SUMMARY
+
+
+def _key(value):
+    return '' if value is None else str(value)
+
+
+def _count(deltas, sites, sign):
+    for site in sites:
+        deltas[(TOTAL, '')] += sign
+        for dimension, column in DIMENSIONS.items():
+            deltas[(dimension, _key(getattr(site, column)))] += sign
+
+
+def record_sites(sites, sign=1):
+    """
+    Répercute sur le résumé la création (`sign=1`) ou la suppression
+    (`sign=-1`) de `sites`, en deux requêtes quel que soit leur nombre :
+    création des compteurs manquants (INSERT ... ON CONFLICT IGNORE), puis un
+    seul UPDATE count = count + CASE ... sur les compteurs touchés. À appeler
+    dans la transaction qui écrit les sites.
+    """
+    if not summary_enabled():
+        return
+    deltas = Counter()
+    _count(deltas, sites, sign)
+    _apply(deltas)
+
+
+def record_changes(before, after):
+    """
+    Répercute la modification de sites : `before` (valeurs d'origine) sont
+    remplacés par `after`. Seuls les compteurs dont la valeur change sont
+    écrits (mêmes deux requêtes que `record_sites`).
+    """
+    if not summary_enabled():
+        return
+    deltas = Counter()
+    _count(deltas, before, -1)
+    _count(deltas, after, 1)
+    _apply(deltas)
+
+
+def _apply(deltas):
+    deltas = {counter: delta for counter, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    SitesStat.objects.bulk_create(
+        [SitesStat(dimension=dimension, key=key, count=0) for dimension, key in deltas], ignore_conflicts=True
+    )
+    matches = {counter: Q(dimension=counter[0], key=counter[1]) for counter in deltas}
+    SitesStat.objects.filter(reduce(operator.or_, matches.values())).update(
+        count=F('count') + Case(*(When(matches[counter], then=Value(delta)) for counter, delta in deltas.items()))
+    )
+
+
+def live_counts():
+    """Compteurs calculés sur la table des sites (un GROUP BY par dimension)."""
+    counts = Counter({(TOTAL, ''): Sites.objects.count()})
+    for dimension, column in DIMENSIONS.items():
+        for value, count in Sites.objects.order_by().values_list(column).annotate(n=Count('id')):
+            # NULL et '' : même compteur « non renseigné »
+            counts[(dimension, _key(value))] += count
+    return counts
+
+
+def rebuild_summary():
+    """Recalcule tout le résumé (après des modifications hors API : admin, shell...)."""
+    with transaction.atomic():
+        SitesStat.objects.all().delete()
+        SitesStat.objects.bulk_create(
+            SitesStat(dimension=dimension, key=key, count=count) for (dimension, key), count in live_counts().items()
+        )
+
+
+def sites_stats(live=False):
+    """
+    Statistiques du tableau de bord : total et nombre de sites par vendor,
+    risk_assessment, security_type et zm (ordre décroissant). Lues dans le
+    résumé matérialisé (une requête, plus une par relation pour les libellés),
+    ou calculées sur la table des sites si `live` ou si le résumé est désactivé.
+    """
+    if live or not summary_enabled():
+        counts = live_counts()
+    else:
+        counts = {
+            (dimension, key): count
+            for dimension, key, count in SitesStat.objects.filter(count__gt=0).values_list('dimension', 'key', 'count')
+        }
+
+    stats = {"total": counts.get((TOTAL, ''), 0)}
+    for dimension in DIMENSIONS:
+        rows = sorted(
+            ((key, count) for (row_dimension, key), count in counts.items() if row_dimension == dimension and count > 0),
+            # À égalité, « non renseigné » en dernier
+            key=lambda row: (-row[1], not row[0], row[0]),
+        )
+        if dimension in LABELS:
+            model, label = LABELS[dimension]
+            names = {
+                str(pk): name
+                for pk, name in model.objects.filter(pk__in=[key for key, _ in rows if key]).values_list('pk', label)
+            }
+            stats[f"by_{dimension}"] = [
+                {"id": key or None, "name": names.get(key), "count": count} for key, count in rows
+            ]
+        else:
+            stats[f"by_{dimension}"] = [{dimension: key or None, "count": count} for key, count in rows]
+    return stats
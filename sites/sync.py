@@ -0,0 +1,63 @@
+import heapq
+from datetime import timedelta
+from itertools import islice
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Sites, SiteTombstone
+from .pagination import decode_cursor, encode_cursor
+
+# Les modifications plus récentes que ce délai attendent la synchronisation
+# suivante : un lot d'import horodaté avant d'être validé ne peut pas passer
+# derrière un curseur déjà remis au client. Suppose que toute transaction qui
+# écrit des sites est validée moins de SETTLE_SECONDS après leur horodatage
+# (fait par bulk_create / bulk_update, pas à la validation) : les imports en
+# arrière-plan valident chaque lot de importer.BATCH_SIZE lignes, l'import
+# `sync=1` est limité à IMPORT_SYNC_MAX_ROWS lignes et la création groupée à
+# bulk.BULK_MAX_ITEMS sites.
+SETTLE_SECONDS = 5
+
+
+def _after(queryset, field, cursor):
+    changed_at, pk = cursor
+    # La borne `>=` seule permet à SQLite de démarrer la lecture de l'index au curseur
+    return queryset.filter(**{f"{field}__gte": changed_at}).filter(
+        Q(**{f"{field}__gt": changed_at}) | Q(**{field: changed_at, "id__gt": pk})
+    )
+
+
+def changes_since(cursor, limit):
+    """
+    Modifications de la table des sites postérieures à `cursor` (None : tout
+    l'inventaire), dans l'ordre (horodatage, id), au plus `limit`.
+
+    Retourne (sites créés ou modifiés, ids supprimés, curseur suivant, reste-t-il
+    des modifications). Sites et suppressions sont lus par deux requêtes keyset
+    bornées par `limit` (index (updated_at, id) et (deleted_at, id)) puis
+    fusionnés. Lève InvalidCursor si `cursor` est invalide.
+    """
+    settled = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    sites = Sites.objects.with_relations().filter(updated_at__lte=settled).order_by('updated_at', 'id')
+    tombstones = SiteTombstone.objects.filter(deleted_at__lte=settled).order_by('deleted_at', 'id')
+    if cursor:
+        position = decode_cursor(cursor)
+        sites = _after(sites, 'updated_at', position)
+        tombstones = _after(tombstones, 'deleted_at', position)
+    else:
+        # Synchronisation initiale : le client n'a encore aucun site à supprimer
+        tombstones = tombstones.none()
+
+    changes = list(islice(heapq.merge(
+        ((site.updated_at, site.id, site) for site in sites[:limit + 1]),
+        ((tombstone.deleted_at, tombstone.id, None) for tombstone in tombstones[:limit + 1]),
+        key=lambda change: change[:2],
+    ), limit + 1))
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    upserted = [site for _, _, site in changes if site is not None]
+    deleted = [pk for _, pk, site in changes if site is None]
+    if changes:
+        cursor = encode_cursor(*changes[-1][:2])
+    return upserted, deleted, cursor, has_more
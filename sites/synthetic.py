@@ -0,0 +1,114 @@
+import csv
+import gzip
+import random
+from io import BytesIO, StringIO
+
+from openpyxl import Workbook
+
+from account.models import Function, Role, User
+from risk_assessment.models import RiskAssessment
+from vendor.models import Vendor
+from .importer import HEADERS
+from .models import Sites
+from .stats import rebuild_summary
+
+# Emprise approximative de la RDC
+LATITUDE_SPAN = (-13.5, 5.4)
+LONGITUDE_SPAN = (12.2, 31.3)
+
+SECURITY_TYPES = ("Guard", "Fence", "Camera", None)
+RISK_LEVELS = ("Low", "Medium", "High", "Critical")
+PLACES = (
+    "Kinshasa", "Lubumbashi", "Mbuji-Mayi", "Kisangani", "Kananga", "Bukavu", "Goma", "Kolwezi",
+    "Likasi", "Tshikapa", "Matadi", "Mbandaka", "Uvira", "Bunia", "Kikwit", "Boma",
+)
+
+
+class Dataset:
+    """Références créées par `create_dataset` (vendors, risk_assessments, zms)."""
+
+    def __init__(self, vendors, risk_assessments, zms):
+        self.vendors = vendors
+        self.risk_assessments = risk_assessments
+        self.zms = zms
+
+
+def create_dataset(sites, vendors=20, risk_assessments=3, zms=50, seed=42, prefix="BENCH", batch_size=5000):
+    """
+    Crée des vendors, risk assessments, zone managers et `sites` sites
+    synthétiques (noms de villes, coordonnées dans l'emprise de la RDC,
+    relations tirées au hasard), reproductibles pour une même graine.
+    Le résumé des statistiques est recalculé (bulk_create sans signaux).
+    """
+    rng = random.Random(seed)
+    vendor_objects = [
+        Vendor.objects.create(vendor_id=f"{prefix}-V{i}", name=f"Vendor {i}") for i in range(vendors)
+    ]
+    risk_objects = [
+        RiskAssessment.objects.create(name=RISK_LEVELS[i % len(RISK_LEVELS)]) for i in range(risk_assessments)
+    ]
+    role = Role.objects.create(name="ZM", slug="zm")
+    function = Function.objects.create(name="Zone manager", slug="zone-manager")
+    zm_objects = [
+        User.objects.create_user(
+            email=f"{prefix.lower()}-zm{i}@example.com", name=f"ZM {i}", role=role, function=function
+        )
+        for i in range(zms)
+    ]
+
+    # Par lots : bulk_create matérialise tout son itérable (1M sites en mémoire sinon)
+    for start in range(0, sites, batch_size):
+        Sites.objects.bulk_create([
+            Sites(
+                name=f"{rng.choice(PLACES)} {i}", site_id=f"{prefix}{i:07d}",
+                security_type=rng.choice(SECURITY_TYPES),
+                latitude=rng.uniform(*LATITUDE_SPAN), longitude=rng.uniform(*LONGITUDE_SPAN),
+                vendor=rng.choice(vendor_objects) if vendor_objects else None,
+                risk_assessment=rng.choice(risk_objects + [None]),
+                zm=rng.choice(zm_objects) if zm_objects else None,
+            )
+            for i in range(start, min(start + batch_size, sites))
+        ])
+    rebuild_summary()
+    return Dataset(vendor_objects, risk_objects, zm_objects)
+
+
+def _import_rows(rng, dataset, prefix, numbers):
+    for i in numbers:
+        vendor = rng.choice(dataset.vendors) if dataset.vendors else None
+        risk = rng.choice(dataset.risk_assessments) if dataset.risk_assessments else None
+        zm = rng.choice(dataset.zms) if dataset.zms else None
+        yield [
+            f"{prefix}{i:07d}", f"{rng.choice(PLACES)} {i}",
+            round(rng.uniform(*LATITUDE_SPAN), 6), round(rng.uniform(*LONGITUDE_SPAN), 6),
+            vendor.name if vendor else None, risk.name if risk else None, str(zm.id) if zm else None,
+            rng.choice(SECURITY_TYPES),
+        ]
+
+
+def import_workbook(rows, dataset, seed=42, prefix="IMPORT", sheets=1):
+    """
+    Classeur .xlsx (en-têtes de l'import Excel) de `rows` sites synthétiques,
+    en octets, répartis sur `sheets` feuilles (une par province).
+    """
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    per_sheet = -(-rows // sheets)
+    for number in range(sheets):
+        ws = wb.create_sheet(PLACES[number % len(PLACES)] + (f" {number // len(PLACES) + 1}" if number >= len(PLACES) else ""))
+        ws.append(HEADERS)
+        for row in _import_rows(rng, dataset, prefix, range(number * per_sheet, min((number + 1) * per_sheet, rows))):
+            ws.append(row)
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def import_csv(rows, dataset, seed=42, prefix="IMPORT", compressed=False):
+    """Fichier CSV (UTF-8, gzip si `compressed`) des mêmes sites que `import_workbook`, en octets."""
+    buf = StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(HEADERS)
+    writer.writerows(_import_rows(random.Random(seed), dataset, prefix, range(rows)))
+    data = buf.getvalue().encode("utf-8")
+    return gzip.compress(data) if compressed else data
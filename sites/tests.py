@@ -1,3 +1,1407 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import inspect
+import json
+import os
+import random
+import re
+import tempfile
+import uuid
+import zipfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import openpyxl
+from openpyxl import Workbook
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+from rest_framework.renderers import JSONRenderer
+
+from account.models import Function, Role, User
+from smdb.metrics import reset_metrics, timed
+from risk_assessment.models import RiskAssessment
+from vendor.models import Vendor
+from .geo import haversine_km
+from .importer import SitesImportError, read_workbook
+from .jobs import claim_next_job, run_import_job
+from .models import ImportJob, ImportUpload, Sites, SitesStat
+from .projection import iter_site_rows, site_rows
+from .search import search_q
+from .serializers import SitesSerializer
+from .uploads import part_name, purge_uploads
+from .workbook import OPENPYXL_VERSION, ReadOnlyWorkbook
+
+
+class SitesKeysetPaginationTests(TestCase):
+    url = "/api/sites/all/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Vendor.objects.create(vendor_id="V1", name="Global-Tech")
+        now = timezone.now()
+        for i in range(7):
+            site = Sites.objects.create(
+                name=f"Site {i}", site_id=f"CD{i:05d}", vendor=cls.vendor if i % 2 else None
+            )
+            # Deux sites partagent le même created_at pour vérifier le départage par id
+            Sites.objects.filter(pk=site.pk).update(created_at=now - timedelta(minutes=i // 2))
+
+    def _walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row["site_id"] for row in response.json()["results"]]
+            url = response.json()["next"]
+        return ids
+
+    def test_unpaginated_response_is_unchanged(self):
+        response = self.client.get(self.url)
+        self.assertIsInstance(response.json(), list)
+        self.assertEqual(len(response.json()), 7)
+
+    def test_pages_cover_every_site_once_in_order(self):
+        ids = self._walk(f"{self.url}?page_size=2")
+        expected = list(Sites.objects.order_by("-created_at", "-id").values_list("site_id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_filters_apply_inside_paginated_mode(self):
+        ids = self._walk(f"{self.url}?page_size=2&vendor={self.vendor.id}")
+        self.assertEqual(sorted(ids), ["CD00001", "CD00003", "CD00005"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f"{self.url}?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 400)
+
+
+class SitesBboxFilterTests(TestCase):
+    url = "/api/sites/all/"
+
+    @classmethod
+    def setUpTestData(cls):
+        for site_id, lat, lon in [("KIN", -4.32, 15.31), ("LUB", -11.66, 27.48), ("FJI", -17.7, 178.0), ("SAM", -13.8, -172.1), ("NOC", None, None)]:
+            Sites.objects.create(name=site_id, site_id=site_id, latitude=lat, longitude=lon)
+
+    def _site_ids(self, bbox):
+        response = self.client.get(self.url, {"bbox": bbox})
+        self.assertEqual(response.status_code, 200)
+        return sorted(row["site_id"] for row in response.json())
+
+    def test_bbox(self):
+        self.assertEqual(self._site_ids("15,-5,16,-4"), ["KIN"])
+        self.assertEqual(self._site_ids("10,-20,30,0"), ["KIN", "LUB"])
+
+    def test_bbox_across_antimeridian(self):
+        self.assertEqual(self._site_ids("170,-20,-170,0"), ["FJI", "SAM"])
+
+    def test_invalid_bbox(self):
+        for bbox in ("1,2,3", "a,b,c,d", "0,10,1,-10", "0,0,200,1"):
+            with self.subTest(bbox=bbox):
+                self.assertEqual(self.client.get(self.url, {"bbox": bbox}).status_code, 400)
+
+
+class SitesFieldsExpandTests(TestCase):
+    url = "/api/sites/all/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Vendor.objects.create(vendor_id="V1", name="Global-Tech")
+        cls.zm = User.objects.create_user(email="zm@example.com", password="x", name="ZM")
+        for i in range(3):
+            Sites.objects.create(name=f"S{i}", site_id=f"S{i}", latitude=-4.3, longitude=15.3, vendor=cls.vendor, zm=cls.zm)
+
+    def _get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), "\n".join(query["sql"] for query in queries.captured_queries)
+
+    def test_fields_trim_payload_and_columns(self):
+        rows, sql = self._get(fields="site_id,name,latitude,longitude")
+        self.assertEqual(set(rows[0]), {"site_id", "name", "latitude", "longitude"})
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn('"security_type"', sql)
+
+    def test_empty_expand_returns_ids_without_joins(self):
+        rows, sql = self._get(expand="")
+        self.assertEqual(rows[0]["vendor"], str(self.vendor.id))
+        self.assertEqual(rows[0]["zm"], str(self.zm.id))
+        self.assertIsNone(rows[0]["risk_assessment"])
+        self.assertNotIn("JOIN", sql)
+
+    def test_expand_selected_relations(self):
+        rows, sql = self._get(expand="vendor", fields="site_id,vendor,zm")
+        self.assertEqual(rows[0]["vendor"]["name"], "Global-Tech")
+        self.assertEqual(rows[0]["zm"], str(self.zm.id))
+        self.assertIn('"vendor_vendor"', sql)
+        self.assertNotIn('"account_user"', sql)
+
+    def test_default_is_unchanged(self):
+        rows, _ = self._get()
+        self.assertEqual(rows[0]["zm"]["email"], "zm@example.com")
+        self.assertEqual(rows[0]["vendor"]["name"], "Global-Tech")
+
+    def test_paginated_with_fields(self):
+        data, _ = self._get(fields="site_id", page_size=2)
+        self.assertEqual(data["results"], [{"site_id": "S2"}, {"site_id": "S1"}])
+        self.assertEqual(self.client.get(data["next"]).json()["results"], [{"site_id": "S0"}])
+
+    def test_unknown_names(self):
+        for params in ({"fields": "site_id,password"}, {"expand": "role"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class SitesConditionalGetTests(TestCase):
+    url = "/api/sites/all/"
+
+    def setUp(self):
+        cache.clear()
+        Sites.objects.create(name="A", site_id="A")
+
+    def test_unchanged_list_answers_304_without_listing(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        # Seulement les agrégats de l'ETag : ni liste, ni sérialisation
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_etag_changes_with_query_and_table(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertNotEqual(self.client.get(self.url, {"page_size": 1})["ETag"], etag)
+
+        self.client.post("/api/sites/create/", {"name": "B", "site_id": "B"})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+        # Suppression hors API : le nombre de lignes change l'ETag
+        etag = response["ETag"]
+        Sites.objects.filter(site_id="A").delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def _last_modified(self):
+        # Écritures précédentes datées d'il y a une minute : If-Modified-Since est précis à la seconde
+        Sites.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+        response = self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code, 304)
+        return response["Last-Modified"]
+
+    def test_if_modified_since_sees_updates_and_deletions(self):
+        last_modified = self._last_modified()
+        site = Sites.objects.get(site_id="A")
+        site.name = "A renommé"
+        site.save()
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["name"], "A renommé")
+
+        Sites.objects.create(name="B", site_id="B")
+        last_modified = self._last_modified()
+        site.delete()
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["site_id"] for row in response.json()], ["B"])
+
+
+@mock.patch("sites.sync.SETTLE_SECONDS", 0)
+class SitesSyncTests(TestCase):
+    url = "/api/sites/sync/"
+
+    def setUp(self):
+        Sites.objects.bulk_create(Sites(name=f"S{i}", site_id=f"S{i}") for i in range(5))
+
+    def _sync(self, cursor=None, page_size=2):
+        upserted, deleted = [], []
+        while True:
+            params = {"page_size": page_size, **({"cursor": cursor} if cursor else {})}
+            data = self.client.get(self.url, params).json()
+            upserted += [site["site_id"] for site in data["upserted"]]
+            deleted += data["deleted"]
+            cursor = data["cursor"]
+            if not data["has_more"]:
+                return upserted, deleted, cursor
+
+    def test_initial_sync_returns_every_site_once(self):
+        upserted, deleted, cursor = self._sync()
+        self.assertEqual(sorted(upserted), ["S0", "S1", "S2", "S3", "S4"])
+        self.assertEqual(deleted, [])
+        self.assertEqual(self._sync(cursor), ([], [], cursor))
+
+    def test_delta_contains_only_changes(self):
+        _, _, cursor = self._sync()
+
+        Sites.objects.create(name="New", site_id="NEW")
+        site = Sites.objects.get(site_id="S1")
+        site.name = "Renamed"
+        site.save()
+        removed = Sites.objects.get(site_id="S3").id
+        Sites.objects.filter(id=removed).delete()
+
+        upserted, deleted, _ = self._sync(cursor, page_size=1)
+        self.assertEqual(sorted(upserted), ["NEW", "S1"])
+        self.assertEqual(deleted, [str(removed)])
+
+    def test_recent_changes_wait_for_next_sync(self):
+        with mock.patch("sites.sync.SETTLE_SECONDS", 60):
+            self.assertEqual(self.client.get(self.url).json()["upserted"], [])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {"cursor": "nope"}).status_code, 400)
+
+
+class SitesNearbyTests(TestCase):
+    url = "/api/sites/nearby/"
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(1)
+        Sites.objects.bulk_create(
+            Sites(name=f"S{i}", site_id=f"S{i:04d}", latitude=rng.uniform(-6, -2), longitude=rng.uniform(13, 17))
+            for i in range(500)
+        )
+        Sites.objects.create(name="Sans coordonnées", site_id="NOC")
+
+    def _brute_force(self, lat, lon):
+        return sorted(
+            (haversine_km(lat, lon, site.latitude, site.longitude), site.site_id)
+            for site in Sites.objects.exclude(latitude=None)
+        )
+
+    def test_k_nearest_matches_brute_force(self):
+        response = self.client.get(self.url, {"lat": -4.3, "lon": 15.3, "k": 15})
+        self.assertEqual(response.status_code, 200)
+        expected = self._brute_force(-4.3, 15.3)[:15]
+        self.assertEqual([row["site_id"] for row in response.json()], [site_id for _, site_id in expected])
+        self.assertAlmostEqual(response.json()[0]["distance_km"], expected[0][0], places=3)
+
+    def test_radius(self):
+        response = self.client.get(self.url, {"lat": -4.3, "lon": 15.3, "radius_km": 25})
+        expected = [site_id for d, site_id in self._brute_force(-4.3, 15.3) if d <= 25]
+        self.assertEqual([row["site_id"] for row in response.json()], expected)
+        self.assertTrue(expected)
+
+    def test_search_wraps_across_antimeridian(self):
+        Sites.objects.create(name="Fidji", site_id="FJI", latitude=-17.7, longitude=179.95)
+        response = self.client.get(self.url, {"lat": -17.7, "lon": -179.95, "k": 1})
+        self.assertEqual(response.json()[0]["site_id"], "FJI")
+        self.assertLess(response.json()[0]["distance_km"], 11)
+
+    def test_invalid_parameters(self):
+        for params in ({"lat": -4.3}, {"lat": 95, "lon": 0}, {"lat": 0, "lon": 0, "k": 0}, {"lat": 0, "lon": 0, "radius_km": -1}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class SitesSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for site_id, name in [("CDKN00001", "KASALA"), ("CDKN00012", "Kinshasa Gombe"), ("CDLU00001", "Lubumbashi"), ("KIN01", "Masina")]:
+            Sites.objects.create(site_id=site_id, name=name)
+
+    def _list(self, term):
+        return sorted(row["site_id"] for row in self.client.get("/api/sites/all/", {"filter": term}).json())
+
+    def test_filter_keeps_icontains_semantics(self):
+        for term in ("kin", "00001", "sala", "ka", "CDKN0001", 'a"b'):
+            with self.subTest(term=term):
+                expected = sorted(
+                    Sites.objects.filter(Q(name__icontains=term) | Q(site_id__icontains=term)).values_list("site_id", flat=True)
+                )
+                self.assertEqual(self._list(term), expected)
+
+    def test_index_follows_imports_updates_and_deletes(self):
+        self.client.post("/api/sites/import-excel/?sync=1", {"file": make_xlsx([("CDKN00099", "Kintambo", None, None, None, None, None, None)])})
+        self.assertIn("CDKN00099", self._list("ntamb"))
+        Sites.objects.filter(site_id="CDKN00099").update(name="Ngaliema")
+        self.assertEqual(self._list("ntamb"), [])
+        Sites.objects.filter(site_id="CDKN00099").delete()
+        self.assertEqual(self._list("galiem"), [])
+
+    def test_typeahead_ranking(self):
+        results = self.client.get("/api/sites/search/", {"q": "kin"}).json()
+        # Préfixe de site_id d'abord, puis préfixe de name, puis le reste
+        self.assertEqual([r["site_id"] for r in results], ["KIN01", "CDKN00012"])
+        self.assertEqual(self.client.get("/api/sites/search/", {"q": "CDKN00001"}).json()[0]["name"], "KASALA")
+        self.assertEqual(len(self.client.get("/api/sites/search/", {"q": "cdkn", "limit": 1}).json()), 1)
+        self.assertEqual(self.client.get("/api/sites/search/", {"q": "k"}).json(), [])
+
+
+class SitesExportTests(TestCase):
+    url = "/api/sites/export/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Vendor.objects.create(vendor_id="V1", name="Global-Tech")
+        Sites.objects.bulk_create(
+            Sites(name=f"Site {i}", site_id=f"CD{i:05d}", latitude=-4.3, longitude=15.3, vendor=cls.vendor if i % 2 else None)
+            for i in range(2500)
+        )
+
+    def _body(self, response):
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_ndjson_matches_list_endpoint(self):
+        lines = self._body(self.client.get(self.url, {"vendor": self.vendor.id})).decode().splitlines()
+        listed = self.client.get("/api/sites/all/", {"vendor": self.vendor.id}).json()
+        self.assertEqual(len(lines), 1250)
+        self.assertEqual([json.loads(line) for line in lines], listed)
+
+    def test_csv_gzip(self):
+        response = self.client.get(self.url, {"output": "csv", "gzip": "1", "filter": "CD0000"})
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="sites.csv.gz"')
+        rows = list(csv.DictReader(gzip.decompress(self._body(response)).decode().splitlines()))
+        self.assertEqual(sorted(r["site_id"] for r in rows), [f"CD{i:05d}" for i in range(10)])
+        self.assertEqual(rows[0]["vendor_name"], "Global-Tech")
+
+    def test_queries_are_chunked(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self._body(self.client.get(self.url))
+        # Un seul SELECT lu par blocs via le curseur, aucune requête par site
+        self.assertLessEqual(len(ctx.captured_queries), 2)
+
+    def test_invalid_output(self):
+        self.assertEqual(self.client.get(self.url, {"output": "xml"}).status_code, 400)
+
+    def test_xlsx_round_trips_through_importer(self):
+        risk = RiskAssessment.objects.create(name="Red")
+        zm = User.objects.create_user(name="ZM", email="zm@example.com", password="x")
+        Sites.objects.filter(site_id="CD00001").update(risk_assessment=risk, zm=zm, security_type="Guard", latitude=-4.325)
+        fields = ("site_id", "name", "latitude", "longitude", "vendor_id", "risk_assessment_id", "zm_id", "security_type")
+        before = sorted(Sites.objects.values_list(*fields))
+
+        response = self.client.get(self.url, {"output": "xlsx"})
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="sites.xlsx"')
+        upload = SimpleUploadedFile("sites.xlsx", b"".join(response.streaming_content))
+
+        Sites.objects.all().delete()
+        summary = self.client.post("/api/sites/import-excel/?sync=1", {"file": upload}).json()
+        self.assertEqual((summary["created"], summary["skipped"], summary["errors"]), (2500, 0, []))
+        self.assertEqual(sorted(Sites.objects.values_list(*fields)), before)
+
+
+class SitesProjectionTests(TestCase):
+    """La projection `values_list` doit produire exactement les octets de SitesSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        vendors = [Vendor.objects.create(vendor_id="V1", name="Société Générale"), Vendor.objects.create(name=None)]
+        risk = RiskAssessment.objects.create(name="Élevé")
+        zms = [
+            User.objects.create_user(
+                name="Zone Manager", email="zm@example.com", password="x",
+                role=Role.objects.create(name="ZM", slug="zm"), function=Function.objects.create(name="Field"),
+            ),
+            User.objects.create_user(name="Sans rôle", email="norole@example.com", password="x"),
+        ]
+        rng = random.Random(3)
+        names = ["Kinshasa 🇨🇩", "ligne\u2028séparée", 'guillemets "x" \\', "", None]
+        Sites.objects.bulk_create(
+            Sites(
+                name=names[i % len(names)], site_id=f"P{i:03d}", security_type=rng.choice(["Guard", None]),
+                latitude=rng.choice([None, 1e-05, -4.325, 90.0, rng.uniform(-90, 90)]),
+                longitude=rng.choice([None, -180.0, 15.3, rng.uniform(-180, 180)]),
+                vendor=rng.choice(vendors + [None]), risk_assessment=rng.choice([risk, None]), zm=rng.choice(zms + [None]),
+            )
+            for i in range(60)
+        )
+        # created_at sans microsecondes : isoformat() les omet
+        Sites.objects.filter(site_id="P000").update(created_at=timezone.now().replace(microsecond=0))
+
+    def test_output_is_byte_identical(self):
+        queryset = Sites.objects.order_by("-created_at", "-id")
+        render = JSONRenderer().render
+        for fields, expand in [
+            (None, None), (None, []), (None, ["zm"]),
+            (["site_id", "name", "latitude", "longitude"], None), (["id", "vendor", "created_at"], ["vendor"]),
+        ]:
+            with self.subTest(fields=fields, expand=expand):
+                expected = render(SitesSerializer(queryset.with_relations(), many=True, fields=fields, expand=expand).data)
+                self.assertEqual(render(site_rows(queryset, fields, expand)), expected)
+                chunks = [row for rows in iter_site_rows(queryset, 7, fields, expand) for row in rows]
+                self.assertEqual(render(chunks), expected)
+
+
+class SitesQueryCountTests(TestCase):
+    url = "/api/sites/all/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Vendor.objects.create(vendor_id="V1", name="Global-Tech")
+        cls.risk = RiskAssessment.objects.create(name="Red")
+        cls.zm = User.objects.create_user(
+            name="Zone Manager",
+            email="zm@example.com",
+            password="x",
+            role=Role.objects.create(name="ZM"),
+            function=Function.objects.create(name="Field"),
+        )
+
+    def _create_sites(self, count):
+        Sites.objects.bulk_create(
+            Sites(
+                name=f"Site {i}", site_id=f"CD{i:05d}",
+                vendor=self.vendor, risk_assessment=self.risk, zm=self.zm,
+            )
+            for i in range(count)
+        )
+
+    def test_list_query_count_is_constant(self):
+        for count in (1, 100, 10_000):
+            with self.subTest(count=count):
+                Sites.objects.all().delete()
+                self._create_sites(count)
+                # Agrégats de l'ETag (3), sites, puis une requête par modèle imbriqué
+                # (vendor, risk_assessment, zm, role, function)
+                with self.assertNumQueries(9):
+                    response = self.client.get(self.url)
+                self.assertEqual(len(response.json()), count)
+                self.assertEqual(response.json()[0]["zm"]["role"]["name"], "ZM")
+
+    def test_paginated_list_query_count_is_constant(self):
+        self._create_sites(100)
+        # + la requête de la page (id, created_at)
+        with self.assertNumQueries(10):
+            self.client.get(f"{self.url}?page_size=50")
+
+    def test_create_query_count(self):
+        payload = {
+            "name": "KASALA", "site_id": "CDKN00001",
+            "vendor": str(self.vendor.id), "risk_assessment": str(self.risk.id), "zm": str(self.zm.id),
+        }
+        # 3 lookups FK + 1 INSERT + 2 pour les compteurs de statistiques, sans requête
+        # supplémentaire à la sérialisation (+ SAVEPOINT / RELEASE : transaction du test)
+        with self.assertNumQueries(8):
+            response = self.client.post("/api/sites/create/", payload, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["zm"]["function"]["name"], "Field")
+
+
+class RequestMetricsTests(TestCase):
+    url = "/api/sites/all/"
+
+    def setUp(self):
+        reset_metrics()
+        Sites.objects.create(name="KASALA", site_id="CD00001")
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        db, serialize, total = response["Server-Timing"].split(", ")
+        self.assertRegex(db, rf'^db;dur=\d+\.\d;desc="{len(ctx.captured_queries)} queries"$')
+        self.assertRegex(serialize, r"^serialize;dur=\d+\.\d$")
+        self.assertRegex(total, r"^total;dur=\d+\.\d$")
+
+    def test_prometheus_histograms_per_route(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.client.get("/api/does-not-exist/")
+        response = self.client.get("/api/metrics/")
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        body = response.content.decode()
+        labels = 'route="api/sites/all/",method="GET"'
+        self.assertIn(f'smdb_http_requests_total{{{labels},status="200"}} 2', body)
+        self.assertIn('smdb_http_requests_total{route="unmatched",method="GET",status="404"} 1', body)
+        # Agrégats de l'ETag (3) et sites : aucune relation à charger
+        self.assertIn(f'smdb_http_request_queries_bucket{{{labels},le="2"}} 0', body)
+        self.assertIn(f'smdb_http_request_queries_bucket{{{labels},le="5"}} 2', body)
+        self.assertIn(f"smdb_http_request_queries_sum{{{labels}}} 8", body)
+        self.assertIn(f'smdb_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', body)
+        self.assertIn(f"smdb_http_request_serialize_seconds_count{{{labels}}} 2", body)
+        self.assertIn("# TYPE smdb_http_request_sql_seconds histogram", body)
+
+    def test_timed_outside_request_is_noop(self):
+        with timed("serialize"):
+            pass
+
+
+class SitesBenchmarkCommandTests(TestCase):
+    def _benchmark(self, **options):
+        stdout = StringIO()
+        call_command(
+            "benchmark_sites", sites=40, vendors=3, zms=2, repeat=2, import_rows=5, stdout=stdout, **options
+        )
+        return stdout.getvalue()
+
+    def test_writes_results_and_rolls_back(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            self._benchmark(output=output.name)
+            report = json.load(output)
+        self.assertEqual(report["meta"]["sites"], 40)
+        results = report["results"]
+        self.assertEqual(results["list_all"]["rows"], 40)
+        self.assertEqual(results["import_xlsx"]["rows"], 5)
+        self.assertEqual(results["import_csv_gzip"]["rows"], 5)
+        # Inventaire exporté après 2 imports de 5 lignes par format
+        self.assertEqual(results["export_ndjson"]["rows"], 70)
+        self.assertIsNotNone(results["list_all"]["queries"])
+        self.assertGreater(results["search_filter"]["rows"], 0)
+        self.assertFalse(Sites.objects.exists())
+
+    def test_compare_flags_regressions(self):
+        with tempfile.NamedTemporaryFile("w+", suffix=".json") as baseline:
+            json.dump({"results": {"stats": {"p50_ms": 0.001}}}, baseline)
+            baseline.flush()
+            with self.assertRaisesMessage(CommandError, "Régressions: stats"):
+                self._benchmark(scenarios="list", compare=baseline.name)
+
+
+class SitesBulkCreateTests(TestCase):
+    url = "/api/sites/bulk-create/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Vendor.objects.create(vendor_id="V1", name="Global-Tech")
+        cls.risk = RiskAssessment.objects.create(name="Low")
+        Sites.objects.create(name="Existing", site_id="CD00000")
+
+    def _post(self, items, query=""):
+        return self.client.post(self.url + query, items, content_type="application/json")
+
+    def _payload(self):
+        return [
+            {"name": "KASALA", "site_id": "CD00001", "latitude": -4.325, "longitude": "15,322", "vendor": str(self.vendor.id)},
+            {"name": "GOMBE", "site_id": "CD00002", "risk_assessment": str(self.risk.id), "security_type": "Guard"},
+            {"name": "Doublon", "site_id": "CD00000"},
+            {"name": "Inconnu", "site_id": "CD00003", "zm": str(uuid.uuid4()), "latitude": 95},
+            {"name": "Répété", "site_id": "CD00001"},
+            "CD00004",
+        ]
+
+    def test_all_or_nothing(self):
+        response = self._post(self._payload())
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertEqual((body["created"], body["failed"]), (0, 4))
+        self.assertEqual([result["errors"] for result in body["results"]], [
+            [], [],
+            ["site_id 'CD00000' déjà présent en base."],
+            ["Coordonnées invalides (latitude/longitude).", "Utilisateur (ZM) introuvable."],
+            ["site_id 'CD00001' en double dans la requête."],
+            ["Objet JSON attendu."],
+        ])
+        self.assertEqual(Sites.objects.count(), 1)
+
+    def test_best_effort_resolves_relations_in_one_query_per_model(self):
+        payload = self._payload()
+        with CaptureQueriesContext(connection) as queries:
+            response = self._post(payload, "?partial=1")
+        self.assertEqual(response.status_code, 207)
+        body = response.json()
+        self.assertEqual((body["created"], body["failed"]), (2, 4))
+        self.assertEqual([result["id"] is not None for result in body["results"]], [True, True, False, False, False, False])
+        site = Sites.objects.get(id=body["results"][0]["id"])
+        self.assertEqual((site.longitude, site.vendor_id), (15.322, self.vendor.id))
+        self.assertEqual(Sites.objects.get(site_id="CD00002").security_type, "Guard")
+        self.assertEqual(SitesStat.objects.get(dimension="total").count, 3)
+        # Une lecture par modèle pour tout le lot : vendor, risk_assessment, zm, site_id existants
+        selects = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("SELECT")]
+        self.assertEqual(len(selects), 4)
+
+        response = self._post([{"name": "Nouveau", "site_id": "CD00010"}])
+        self.assertEqual((response.status_code, response.json()["created"]), (201, 1))
+
+    def test_invalid_duplicate_does_not_block_valid_one(self):
+        items = [{"name": "Inconnu", "site_id": "CD00001", "vendor": str(uuid.uuid4())}, {"name": "KASALA", "site_id": "CD00001"}]
+        response = self._post(items, "?partial=1")
+        self.assertEqual(response.status_code, 207)
+        results = response.json()["results"]
+        self.assertEqual([result["errors"] for result in results], [["Fournisseur introuvable."], []])
+        self.assertEqual(Sites.objects.get(site_id="CD00001").id, uuid.UUID(results[1]["id"]))
+
+    def test_blank_required_fields(self):
+        response = self._post([{"name": "  ", "site_id": "   "}, {"name": "A", "site_id": "\t"}], "?partial=1")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result["errors"] for result in response.json()["results"]], [
+            ["Les champs suivants sont requis : name, site_id"],
+            ["Les champs suivants sont requis : site_id"],
+        ])
+        self.assertEqual(Sites.objects.count(), 1)
+
+    def test_invalid_payloads(self):
+        self.assertEqual(self._post({"name": "KASALA", "site_id": "CD00001"}).status_code, 400)
+        self.assertEqual(self._post([]).status_code, 400)
+        with mock.patch("sites.api.BULK_MAX_ITEMS", 1):
+            response = self._post([{"name": "A", "site_id": "A"}, {"name": "B", "site_id": "B"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Sites.objects.count(), 1)
+
+
+def make_xlsx(rows, header=("EI Site ID", "Site Name", "Latitude", "Longitude", "Vendor", "risk_assessment", "zm", "security_type")):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(list(header))
+    for row in rows:
+        ws.append(list(row))
+    buf = BytesIO()
+    wb.save(buf)
+    return SimpleUploadedFile("sites.xlsx", buf.getvalue())
+
+
+class SitesExcelImportTests(TestCase):
+    url = "/api/sites/import-excel/?sync=1"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Vendor.objects.create(vendor_id="V1", name="Global-Tech")
+        cls.risk = RiskAssessment.objects.create(name="Red")
+        cls.zm = User.objects.create_user(name="ZM", email="zm@example.com", password="x")
+        Sites.objects.create(name="Existing", site_id="CD00000")
+
+    def test_import_summary_and_relations(self):
+        upload = make_xlsx([
+            ("CD00001", "KASALA", -4.325, 15.322, "global-tech ", "RED", str(self.zm.id), "Guard"),
+            ("CD00000", "Doublon base", None, None, None, None, None, None),
+            ("CD00001", "Doublon fichier", None, None, None, None, None, None),
+            ("CD00002", None, None, None, None, None, None, None),
+            ("CD00003", "Sans liens", None, None, "Unknown", "Blue", "not-a-uuid", None),
+            ("CD00004", "Hors limites", "-95", "15", None, None, None, None),
+        ])
+        # dont 2 pour les compteurs de statistiques
+        with self.assertNumQueries(9):
+            response = self.client.post(self.url, {"file": upload})
+        body = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((body["created"], body["skipped"]), (2, 3))
+        self.assertEqual(body["errors"][-1], "L7: Latitude invalide ('-95').")
+        self.assertEqual(len(body["errors"]), 5)
+        self.assertTrue(body["errors"][0].startswith("L5:"))
+
+        site = Sites.objects.get(site_id="CD00001")
+        self.assertEqual((site.vendor, site.risk_assessment, site.zm), (self.vendor, self.risk, self.zm))
+        self.assertEqual((site.latitude, site.longitude, site.security_type), (-4.325, 15.322, "Guard"))
+        self.assertIsNone(Sites.objects.get(site_id="CD00003").vendor)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        upload = make_xlsx((f"CX{i:05d}", f"Site {i}", None, None, "Global-Tech", None, None, None) for i in range(2500))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {"file": upload})
+        self.assertEqual(response.json()["created"], 2500)
+        # 4 préchargements + INSERT groupés (SQLite borne chaque INSERT à ~100 lignes),
+        # contre ~5 requêtes par ligne auparavant
+        self.assertEqual(sum(q["sql"].startswith("SELECT") for q in ctx.captured_queries), 4)
+        self.assertLess(len(ctx.captured_queries), 2500 // 50)
+
+    def test_missing_required_column(self):
+        response = self.client.post(self.url, {"file": make_xlsx([], header=("Site Name",))})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["message"], "Colonne requise manquante: ei_site_id.")
+
+
+class SitesImportUpsertTests(TestCase):
+    url = "/api/sites/import-excel/?sync=1&on_conflict=update"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Vendor.objects.create(vendor_id="V1", name="Global-Tech")
+        cls.other = Vendor.objects.create(vendor_id="V2", name="Other")
+        Sites.objects.create(site_id="CD00001", name="KASALA", latitude=-4.3, longitude=15.3, vendor=cls.vendor)
+        Sites.objects.create(site_id="CD00002", name="GOMBE", latitude=-4.31, longitude=15.31, vendor=cls.vendor)
+        Sites.objects.create(site_id="CD00003", name="BIRERE", vendor=cls.vendor, security_type="Guard")
+
+    def _upload(self):
+        return make_xlsx([
+            ("CD00001", "KASALA", -4.5, 15.3, "other", None, None, None),
+            ("CD00002", "GOMBE", -4.31, 15.31, "Global-Tech", None, None, None),
+            ("CD00003", "BIRERE NORD", None, None, "Unknown", None, None, "Guard"),
+            ("CD00004", "NOUVEAU", None, None, None, None, None, None),
+            ("CD00001", "Doublon fichier", None, None, None, None, None, None),
+        ])
+
+    def test_updates_only_changed_sites(self):
+        before = {site.site_id: site for site in Sites.objects.all()}
+        with CaptureQueriesContext(connection) as ctx:
+            body = self.client.post(self.url, {"file": self._upload()}).json()
+        self.assertEqual(
+            {key: body[key] for key in ("processed", "created", "updated", "unchanged", "skipped")},
+            {"processed": 5, "created": 1, "updated": 2, "unchanged": 1, "skipped": 1},
+        )
+        self.assertEqual(body["errors"], ["L4: Vendor introuvable (name='Unknown')."])
+        # Une lecture et une écriture groupées pour les sites existants
+        self.assertEqual(sum(q["sql"].startswith('UPDATE "sites_sites"') for q in ctx.captured_queries), 1)
+
+        site = Sites.objects.get(site_id="CD00001")
+        self.assertEqual((site.latitude, site.vendor), (-4.5, self.other))
+        self.assertEqual(site.created_at, before["CD00001"].created_at)
+        self.assertGreater(site.updated_at, before["CD00001"].updated_at)
+        self.assertEqual(Sites.objects.get(site_id="CD00002").updated_at, before["CD00002"].updated_at)
+        # Vendor introuvable : lien conservé ; cellules vides : valeurs effacées
+        site = Sites.objects.get(site_id="CD00003")
+        self.assertEqual((site.name, site.vendor, site.security_type), ("BIRERE NORD", self.vendor, "Guard"))
+        self.assertEqual(Sites.objects.count(), 4)
+        # Index de recherche tenu à jour (renommage puis suppression)
+        self.assertEqual(list(Sites.objects.filter(search_q("birere n"))), [site])
+        site.delete()
+        self.assertFalse(Sites.objects.filter(search_q("birere")).exists())
+        self.assertEqual(self.client.get("/api/sites/stats/").json(), self.client.get("/api/sites/stats/?live=1").json())
+
+    def test_conditional_get_sees_updated_sites(self):
+        # Sites datés d'il y a une minute : If-Modified-Since est précis à la seconde
+        Sites.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+        last_modified = self.client.get("/api/sites/all/")["Last-Modified"]
+        upload = make_xlsx([("CD00001", "KASALA", -4.5, 15.4, None, None, None, None)])
+        self.assertEqual(self.client.post(self.url, {"file": upload}).json()["updated"], 1)
+
+        # Aucune création : seul updated_at signale la modification
+        response = self.client.get("/api/sites/all/", HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        site = next(row for row in response.json() if row["site_id"] == "CD00001")
+        self.assertEqual((site["latitude"], site["longitude"]), (-4.5, 15.4))
+
+    def test_absent_columns_are_kept(self):
+        upload = make_xlsx([("CD00001", "KASALA", 0.5)], header=("EI Site ID", "Site Name", "Latitude"))
+        body = self.client.post(self.url, {"file": upload}).json()
+        self.assertEqual(body["updated"], 1)
+        site = Sites.objects.get(site_id="CD00001")
+        self.assertEqual((site.latitude, site.longitude, site.vendor), (0.5, 15.3, self.vendor))
+
+    def test_dry_run_counts_without_writing(self):
+        response = self.client.post(self.url + "&dry_run=1", {"file": self._upload()})
+        job = response.json()
+        self.assertEqual((job["on_conflict"], job["created"], job["updated"], job["unchanged"]), ("update", 1, 2, 1))
+        self.assertEqual(Sites.objects.get(site_id="CD00001").latitude, -4.3)
+
+    def test_background_job(self):
+        job_id = self.client.post("/api/sites/import-excel/?on_conflict=update", {"file": self._upload()}).json()["id"]
+        call_command("process_import_jobs", "--once", stdout=StringIO())
+        job = self.client.get(f"/api/sites/import-jobs/{job_id}/").json()
+        self.assertEqual((job["status"], job["created"], job["updated"], job["unchanged"]), ("done", 1, 2, 1))
+
+    def test_invalid_mode(self):
+        response = self.client.post("/api/sites/import-excel/?sync=1&on_conflict=replace", {"file": self._upload()})
+        self.assertEqual(response.status_code, 400)
+
+
+class SitesCsvImportTests(TestCase):
+    url = "/api/sites/import-excel/?sync=1"
+
+    @classmethod
+    def setUpTestData(cls):
+        Vendor.objects.create(vendor_id="V1", name="Global-Tech")
+        Sites.objects.create(name="Existing", site_id="CD00000")
+
+    def _upload(self, name, text, compressed=False):
+        data = text.encode("utf-8")
+        return SimpleUploadedFile(name, gzip.compress(data) if compressed else data)
+
+    def test_semicolon_csv_with_bom(self):
+        upload = self._upload("sites.csv", (
+            "\ufeffei site id ; SITE NAME;Latitude;Longitude;Vendor\n"
+            "CD00001;KASALA;-4.325;15.322;global-tech\n"
+            "CD00000;Doublon base;;;\n"
+            "CD00002;\"Gombe; centre\";;;Unknown\n"
+            "CD00003;Hors limites;-95;15;\n"
+        ))
+        body = self.client.post(self.url, {"file": upload}).json()
+        self.assertEqual((body["processed"], body["created"], body["skipped"]), (4, 2, 1))
+        self.assertEqual(body["errors"], ["L4: Vendor introuvable (name='Unknown').", "L5: Latitude invalide ('-95')."])
+        site = Sites.objects.get(site_id="CD00001")
+        self.assertEqual((site.latitude, site.vendor.name), (-4.325, "Global-Tech"))
+        self.assertEqual(Sites.objects.get(site_id="CD00002").name, "Gombe; centre")
+
+    def test_gzip_csv_in_background_job(self):
+        upload = self._upload("feed.csv.gz", "EI Site ID,Site Name\nCD00001,KASALA\nCD00002,GOMBE\n", compressed=True)
+        job_id = self.client.post("/api/sites/import-excel/", {"file": upload}).json()["id"]
+        call_command("process_import_jobs", "--once", stdout=StringIO())
+        job = self.client.get(f"/api/sites/import-jobs/{job_id}/").json()
+        self.assertEqual((job["status"], job["created"]), ("done", 2))
+
+    def test_unreadable_files(self):
+        cases = [
+            (SimpleUploadedFile("sites.csv", "EI Site ID,Site Name\nCD1,Évêché\n".encode("latin-1")), "Lecture CSV impossible"),
+            (self._upload("sites.csv.gz", "EI Site ID,Site Name\n"), "Lecture CSV impossible"),
+            (self._upload("sites.csv", "\n"), "Fichier vide."),
+            (self._upload("sites.csv", "Site Name\nKASALA\n"), "Colonne requise manquante: ei_site_id."),
+            (self._upload("sites.txt", "EI Site ID,Site Name\n"), "Format non supporté."),
+        ]
+        for upload, message in cases:
+            with self.subTest(upload.name):
+                response = self.client.post(self.url, {"file": upload})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, response.json()["message"])
+        self.assertEqual(Sites.objects.count(), 1)
+
+    @override_settings(IMPORT_SYNC_MAX_ROWS=2)
+    def test_sync_import_is_bounded(self):
+        text = "EI Site ID,Site Name\nCD00001,A\nCD00002,B\nCD00003,C\n"
+        response = self.client.post(self.url, {"file": self._upload("sites.csv", text)})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Plus de 2 lignes", response.json()["message"])
+        self.assertEqual(Sites.objects.count(), 1)
+        # Simulation : rien n'est écrit, pas de limite
+        response = self.client.post(self.url + "&dry_run=1", {"file": self._upload("sites.csv", text)})
+        self.assertEqual(response.json()["created"], 3)
+
+
+class SitesQueryPlanTests(TestCase):
+    """
+    Plans d'exécution des requêtes de la liste et de l'import : aucune ne doit
+    parcourir toute la table des sites (ni trier la liste filtrée hors index)
+    si un index vient à manquer.
+    """
+
+    url = "/api/sites/all/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Vendor.objects.create(vendor_id="V1", name="Global-Tech")
+        cls.risk = RiskAssessment.objects.create(name="Red")
+        Sites.objects.bulk_create(
+            Sites(name=f"Site {i}", site_id=f"CD{i:05d}", vendor=cls.vendor, risk_assessment=cls.risk, security_type="Guard")
+            for i in range(5)
+        )
+
+    def _plans(self, queries, table="sites_sites"):
+        """Plan (lignes d'EXPLAIN) de chaque requête de `queries` qui lit `table`."""
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                if f'"{table}"' in query["sql"] and not query["sql"].startswith(("INSERT", "SAVEPOINT", "RELEASE")):
+                    if connection.vendor == "postgresql":
+                        cursor.execute("SET LOCAL enable_seqscan = off")
+                        cursor.execute("EXPLAIN " + query["sql"])
+                    else:
+                        cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                    plans.append((query["sql"], [row[-1] for row in cursor.fetchall()]))
+        self.assertTrue(plans)
+        return plans
+
+    def assertNoFullScan(self, queries, table="sites_sites"):
+        for sql, plan in self._plans(queries, table):
+            # Un parcours complet n'est admis que sans WHERE (COUNT, liste non filtrée)
+            # ou sur un index couvrant (préchargement des site_id de l'import)
+            full_scans = [
+                step for step in plan
+                if f"Seq Scan on {table}" in step or step.startswith(f"SCAN {table}") and (
+                    " USING " not in step or " WHERE " in sql and " USING COVERING INDEX " not in step
+                )
+            ]
+            self.assertEqual(full_scans, [], sql)
+
+    @skipUnless(connection.vendor == "sqlite", "Plans SQLite (EXPLAIN QUERY PLAN)")
+    def test_filtered_list_reads_index_in_order(self):
+        filters = [{}, {"vendor": self.vendor.id}, {"risk_assessment": self.risk.id}, {"security_type": "Guard"}]
+        for params in filters:
+            for paginated in (False, True):
+                with self.subTest(params=params, paginated=paginated), CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(self.url, {**params, **({"page_size": 2} if paginated else {})})
+                    if paginated:
+                        self.client.get(response.json()["next"])
+                self.assertEqual(response.status_code, 200)
+                self.assertNoFullScan(ctx.captured_queries)
+                for sql, plan in self._plans(ctx.captured_queries):
+                    # La page (au plus page_size sites lus par pk) peut être triée en mémoire
+                    if '"sites_sites"."id" IN (' not in sql:
+                        self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan, sql)
+
+    def test_import_queries_use_indexes(self):
+        upload = make_xlsx((f"CX{i:05d}", f"Site {i}", None, None, "Global-Tech", "Red", None, "Guard") for i in range(20))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/api/sites/import-excel/?sync=1", {"file": upload})
+        self.assertEqual(response.json()["created"], 20)
+        self.assertNoFullScan(ctx.captured_queries)
+        self.assertNoFullScan(ctx.captured_queries, table="sites_sitesstat")
+
+    @skipUnless(connection.vendor == "postgresql", "name__iexact n'utilise UPPER(name) que sur PostgreSQL")
+    def test_name_iexact_uses_functional_index(self):
+        with CaptureQueriesContext(connection) as ctx:
+            Vendor.objects.filter(name__iexact="global-tech").first()
+            RiskAssessment.objects.filter(name__iexact="red").first()
+        self.assertNoFullScan(ctx.captured_queries, table="vendor_vendor")
+        self.assertNoFullScan(ctx.captured_queries, table="risk_assessment_riskassessment")
+
+
+class SitesStatsTests(TestCase):
+    url = "/api/sites/stats/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Vendor.objects.create(vendor_id="V1", name="Global-Tech")
+        cls.zm = User.objects.create_user(name="Zone Manager", email="zm@example.com", password="x")
+
+    def _populate(self):
+        for i, security_type in enumerate(["Guard", "Guard", None]):
+            self.client.post("/api/sites/create/", {"name": f"S{i}", "site_id": f"S{i}", "vendor": str(self.vendor.id)})
+            Sites.objects.filter(site_id=f"S{i}").update(security_type=security_type)
+        upload = make_xlsx([
+            ("I1", "Import 1", None, None, "Global-Tech", None, str(self.zm.id), "Fence"),
+            ("I2", "Import 2", None, None, None, None, None, "Fence"),
+        ])
+        self.client.post("/api/sites/import-excel/?sync=1", {"file": upload})
+        Sites.objects.filter(site_id="S1").delete()
+        # Modification hors API : security_type n'est pas envoyé par /create/
+        call_command("refresh_sites_stats", stdout=StringIO())
+
+    def test_summary_matches_live_counts(self):
+        self._populate()
+        Sites.objects.create(name="Après", site_id="A1", security_type="Fence")
+        Sites.objects.filter(site_id="I2").delete()
+
+        stats = self.client.get(self.url).json()
+        self.assertEqual(stats, self.client.get(self.url, {"live": 1}).json())
+        self.assertEqual(stats["total"], 4)
+        self.assertEqual(stats["by_vendor"], [
+            {"id": str(self.vendor.id), "name": "Global-Tech", "count": 3},
+            {"id": None, "name": None, "count": 1},
+        ])
+        self.assertEqual(stats["by_security_type"], [
+            {"security_type": "Fence", "count": 2},
+            {"security_type": "Guard", "count": 1},
+            {"security_type": None, "count": 1},
+        ])
+        self.assertEqual(stats["by_zm"][1], {"id": str(self.zm.id), "name": "Zone Manager", "count": 1})
+
+    def test_summary_read_is_cheap(self):
+        self._populate()
+        # Résumé + libellés vendor, risk_assessment, zm (aucun sans clé : requête évitée)
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+    def test_refresh_repairs_drift(self):
+        self._populate()
+        Sites.objects.filter(site_id="S0").update(vendor=None)
+        self.assertNotEqual(self.client.get(self.url).json(), self.client.get(self.url, {"live": 1}).json())
+        call_command("refresh_sites_stats", stdout=StringIO())
+        self.assertEqual(self.client.get(self.url).json(), self.client.get(self.url, {"live": 1}).json())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SitesImportJobTests(TestCase):
+    def test_job_is_queued_then_processed_by_worker(self):
+        upload = make_xlsx([("CD00001", "KASALA", None, None, None, None, None, None), ("CD00002", None, None, None, None, None, None, None)])
+        response = self.client.post("/api/sites/import-excel/", {"file": upload})
+        self.assertEqual(response.status_code, 202)
+        job_url = f"/api/sites/import-jobs/{response.json()['id']}/"
+        self.assertEqual(response.json()["status"], "pending")
+        self.assertFalse(Sites.objects.exists())
+
+        call_command("process_import_jobs", "--once", stdout=StringIO())
+
+        job = self.client.get(job_url).json()
+        self.assertEqual(job["status"], "done")
+        self.assertEqual((job["rows_processed"], job["created"], job["skipped"], job["error_count"]), (2, 1, 1, 1))
+        self.assertIsNotNone(job["rows_per_second"])
+        self.assertTrue(Sites.objects.filter(site_id="CD00001").exists())
+
+    def test_invalid_file_marks_job_failed(self):
+        upload = SimpleUploadedFile("sites.xlsx", b"not a workbook")
+        job_id = self.client.post("/api/sites/import-excel/", {"file": upload}).json()["id"]
+        call_command("process_import_jobs", "--once", stdout=StringIO())
+        job = self.client.get(f"/api/sites/import-jobs/{job_id}/").json()
+        self.assertEqual(job["status"], "failed")
+        self.assertTrue(job["message"].startswith("Lecture Excel impossible"))
+        self.assertFalse(os.path.exists(default_storage.path(ImportJob.objects.get(id=job_id).file.name)))
+
+    def test_stale_running_job_is_failed_before_claiming(self):
+        started_at = timezone.now() - timedelta(hours=3)
+        stale = ImportJob.objects.create(file_name="a.csv", status=ImportJob.RUNNING, started_at=started_at)
+        ImportJob.objects.filter(id=stale.id).update(updated_at=started_at)
+        # Import long mais qui progresse : pas abandonné
+        running = ImportJob.objects.create(file_name="b.csv", status=ImportJob.RUNNING, started_at=started_at)
+        self.assertIsNone(claim_next_job())
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ImportJob.FAILED)
+        self.assertIn("worker arrêté", stale.message)
+        self.assertEqual(ImportJob.objects.get(id=running.id).status, ImportJob.RUNNING)
+
+    def test_job_failed_by_another_worker_is_not_finished(self):
+        upload = SimpleUploadedFile("sites.csv", b"EI Site ID;Site Name\nCD00001;KASALA\n")
+        self.client.post("/api/sites/import-excel/", {"file": upload})
+        job = claim_next_job()
+        # Jugé abandonné pendant l'import : le worker ne doit pas le terminer
+        ImportJob.objects.filter(id=job.id).update(status=ImportJob.FAILED, message="Import interrompu.")
+        run_import_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.message, job.created), (ImportJob.FAILED, "Import interrompu.", 0))
+        self.assertFalse(os.path.exists(default_storage.path(job.file.name)))
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get(f"/api/sites/import-jobs/{uuid.uuid4()}/").status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SitesChunkedUploadTests(TestCase):
+    data = "EI Site ID;Site Name\n" + "".join(f"CD{i:05d};Site {i}\n" for i in range(200))
+
+    def _create(self, name="sites.csv.gz", data=None):
+        data = gzip.compress(self.data.encode("utf-8")) if data is None else data
+        response = self.client.post(
+            "/api/sites/uploads/create/", {"file_name": name, "size": len(data)}, content_type="application/json"
+        )
+        return response, data
+
+    def _put(self, upload_id, offset, chunk):
+        return self.client.put(
+            f"/api/sites/uploads/{upload_id}/chunk/?offset={offset}", chunk, content_type="application/octet-stream"
+        )
+
+    def test_resumable_upload_then_background_import(self):
+        response, data = self._create()
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()["id"]
+        self.assertEqual(self._put(upload_id, 0, data[:500]).json()["offset"], 500)
+
+        # Morceau renvoyé après une coupure : refusé avec l'offset à reprendre
+        response = self._put(upload_id, 0, data[:500])
+        self.assertEqual((response.status_code, response.json()["offset"]), (409, 500))
+        self.assertEqual(self.client.get(f"/api/sites/uploads/{upload_id}/").json()["offset"], 500)
+
+        complete_url = f"/api/sites/uploads/{upload_id}/complete/"
+        response = self.client.post(complete_url, {"sha256": hashlib.sha256(data).hexdigest()}, content_type="application/json")
+        self.assertEqual((response.status_code, response.json()["offset"]), (409, 500))
+        self.assertEqual(self._put(upload_id, 500, data[500:]).json()["offset"], len(data))
+
+        response = self.client.post(complete_url, {"sha256": "abc"}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            complete_url + "?on_conflict=update", {"sha256": hashlib.sha256(data).hexdigest()}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertEqual((job["file_name"], job["on_conflict"], job["status"]), ("sites.csv.gz", "update", "pending"))
+        response = self.client.post(complete_url, {"sha256": hashlib.sha256(data).hexdigest()}, content_type="application/json")
+        self.assertEqual((response.status_code, response.json()["id"]), (200, job["id"]))
+        self.assertEqual(self._put(upload_id, len(data), b"x").status_code, 409)
+
+        call_command("process_import_jobs", "--once", stdout=StringIO())
+        job = self.client.get(f"/api/sites/import-jobs/{job['id']}/").json()
+        self.assertEqual((job["status"], job["created"]), ("done", 200))
+        self.assertFalse(os.path.exists(default_storage.path(ImportJob.objects.get(id=job["id"]).file.name)))
+        self.assertEqual(Sites.objects.get(site_id="CD00199").name, "Site 199")
+
+    def test_checksum_mismatch_fails_the_job(self):
+        response, data = self._create()
+        upload_id = response.json()["id"]
+        self._put(upload_id, 0, data)
+        response = self.client.post(
+            f"/api/sites/uploads/{upload_id}/complete/", {"sha256": "0" * 64}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 202)
+        call_command("process_import_jobs", "--once", stdout=StringIO())
+        job = self.client.get(f"/api/sites/import-jobs/{response.json()['id']}/").json()
+        self.assertEqual((job["status"], job["message"]), ("failed", "Somme de contrôle SHA-256 invalide : fichier à renvoyer."))
+        self.assertFalse(Sites.objects.exists())
+        self.assertFalse(os.path.exists(default_storage.path(part_name(ImportUpload.objects.get(id=upload_id)))))
+
+    def test_invalid_requests(self):
+        self.assertEqual(self._create("sites.txt", b"abc")[0].status_code, 400)
+        with self.settings(IMPORT_UPLOAD_MAX_SIZE=10):
+            self.assertEqual(self._create()[0].status_code, 400)
+        response, data = self._create()
+        upload_id = response.json()["id"]
+        self.assertEqual(self._put(upload_id, 0, data + b"x").status_code, 400)
+        response = self.client.put(
+            f"/api/sites/uploads/{upload_id}/chunk/?offset=0", b"", content_type="application/octet-stream", CONTENT_LENGTH="0"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.put(f"/api/sites/uploads/{upload_id}/chunk/", b"x", content_type="application/octet-stream").status_code, 400)
+        self.assertEqual(self._put(uuid.uuid4(), 0, b"x").status_code, 404)
+        response = self.client.put(
+            f"/api/sites/uploads/{upload_id}/chunk/?offset=0", data[:10], content_type="application/octet-stream",
+            CONTENT_LENGTH="", HTTP_TRANSFER_ENCODING="chunked",
+        )
+        self.assertEqual(response.status_code, 411)
+        self.assertEqual(self.client.get(f"/api/sites/uploads/{upload_id}/").json()["offset"], 0)
+
+    def test_delete_and_purge_expired_uploads(self):
+        upload = ImportUpload.objects.get(id=self._create()[0].json()["id"])
+        path = default_storage.path(part_name(upload))
+        self.assertEqual(self.client.delete(f"/api/sites/uploads/{upload.id}/delete/").status_code, 204)
+        self.assertFalse(os.path.exists(path))
+
+        stale, fresh = (ImportUpload.objects.get(id=self._create()[0].json()["id"]) for _ in range(2))
+        ImportUpload.objects.filter(id=stale.id).update(updated_at=timezone.now() - timedelta(days=2))
+        out = StringIO()
+        call_command("process_import_jobs", "--once", stdout=out)
+        self.assertIn("Uploads supprimés : 1 expiré(s), 0 importé(s)", out.getvalue())
+        self.assertEqual(list(ImportUpload.objects.values_list("id", flat=True)), [fresh.id])
+        self.assertFalse(os.path.exists(default_storage.path(part_name(stale))))
+
+    def test_purge_finished_uploads(self):
+        response, data = self._create()
+        upload_id = response.json()["id"]
+        self._put(upload_id, 0, data)
+        self.client.post(
+            f"/api/sites/uploads/{upload_id}/complete/", {"sha256": hashlib.sha256(data).hexdigest()},
+            content_type="application/json",
+        )
+        self.assertEqual(purge_uploads(), (0, 0))
+        call_command("process_import_jobs", "--once", stdout=StringIO())
+        self.assertEqual(purge_uploads(), (0, 1))
+        self.assertFalse(ImportUpload.objects.exists())
+        self.assertEqual(ImportJob.objects.get().status, ImportJob.DONE)
+
+    def test_purge_deletes_file_of_abandoned_job(self):
+        response, data = self._create()
+        upload = ImportUpload.objects.get(id=response.json()["id"])
+        self._put(upload.id, 0, data)
+        self.client.post(
+            f"/api/sites/uploads/{upload.id}/complete/", {"sha256": hashlib.sha256(data).hexdigest()},
+            content_type="application/json",
+        )
+        # Worker arrêté pendant l'import : le job est marqué en échec, le fichier reste
+        ImportJob.objects.update(status=ImportJob.RUNNING, updated_at=timezone.now() - timedelta(days=1))
+        self.assertIsNone(claim_next_job())
+        path = default_storage.path(part_name(upload))
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(purge_uploads(), (0, 1))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(ImportJob.objects.get().status, ImportJob.FAILED)
+
+
+class SitesImportDryRunTests(TestCase):
+    url = "/api/sites/import-excel/?sync=1&dry_run=1"
+    unknown_zm = "00000000-0000-4000-8000-000000000000"
+
+    @classmethod
+    def setUpTestData(cls):
+        Vendor.objects.create(vendor_id="V1", name="Global-Tech")
+        Sites.objects.create(name="Existing", site_id="CD00000")
+
+    def _upload(self):
+        return make_xlsx([
+            ("CD00001", "KASALA", -4.325, 15.322, "global-tech", None, None, "Guard"),
+            ("CD00000", "Doublon base", None, None, None, None, None, None),
+            ("CD00001", "Doublon fichier", None, None, None, None, None, None),
+            ("CD00002", None, None, None, None, None, None, None),
+            ("CD00003", "Sans liens", None, None, "Unknown", "Blue", self.unknown_zm, None),
+            ("CD00004", "Hors limites", "-95", "15", None, None, None, None),
+        ])
+
+    def test_reports_every_failure_without_writing(self):
+        stats_before = list(SitesStat.objects.values_list("dimension", "key", "count"))
+        response = self.client.post(self.url, {"file": self._upload()})
+        body = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(body["dry_run"])
+        self.assertEqual((body["rows_processed"], body["created"], body["skipped"]), (6, 2, 3))
+        self.assertEqual(body["errors"], [
+            "L3: site_id 'CD00000' déjà présent en base, ligne ignorée.",
+            "L4: site_id 'CD00001' en double (ligne 2), ligne ignorée.",
+            "L5: 'site_id' ou 'name' manquant.",
+            "L6: Vendor introuvable (name='Unknown').",
+            "L6: RiskAssessment introuvable (name='Blue').",
+            f"L6: User (ZM) introuvable (id='{self.unknown_zm}').",
+            "L7: Latitude invalide ('-95').",
+        ])
+        self.assertEqual(body["error_count"], 7)
+        self.assertEqual(list(Sites.objects.values_list("site_id", flat=True)), ["CD00000"])
+        self.assertEqual(list(SitesStat.objects.values_list("dimension", "key", "count")), stats_before)
+
+        report = self.client.get(body["error_report"])
+        self.assertEqual(report["Content-Type"], "text/csv")
+        lines = b"".join(report.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "feuille,ligne,erreur")
+        self.assertEqual(lines[1], ",3,\"site_id 'CD00000' déjà présent en base, ligne ignorée.\"")
+        self.assertEqual(len(lines), 8)
+
+    def test_summary_is_capped(self):
+        upload = make_xlsx((f"CX{i:05d}", None, None, None, None, None, None, None) for i in range(150))
+        body = self.client.post(self.url, {"file": upload}).json()
+        self.assertEqual(body["error_count"], 150)
+        self.assertEqual(len(body["errors"]), 100)
+        report = self.client.get(body["error_report"])
+        self.assertEqual(len(b"".join(report.streaming_content).decode().splitlines()), 151)
+
+    def test_job_status_is_capped(self):
+        upload = make_xlsx((f"CX{i:05d}", None, None, None, None, None, None, None) for i in range(150))
+        job_id = self.client.post("/api/sites/import-excel/?dry_run=1", {"file": upload}).json()["id"]
+        call_command("process_import_jobs", "--once", stdout=StringIO())
+        self.assertEqual(len(ImportJob.objects.get(id=job_id).errors), 150)
+        job = self.client.get(f"/api/sites/import-jobs/{job_id}/").json()
+        self.assertEqual((job["error_count"], len(job["errors"])), (150, 100))
+        report = self.client.get(job["error_report"])
+        self.assertEqual(len(b"".join(report.streaming_content).decode().splitlines()), 151)
+
+    def test_background_dry_run(self):
+        response = self.client.post("/api/sites/import-excel/?dry_run=1", {"file": self._upload()})
+        self.assertTrue(response.json()["dry_run"])
+        call_command("process_import_jobs", "--once", stdout=StringIO())
+        job = self.client.get(f"/api/sites/import-jobs/{response.json()['id']}/").json()
+        self.assertEqual((job["status"], job["created"], job["error_count"]), ("done", 2, 7))
+        self.assertIsNotNone(job["error_report"])
+        self.assertEqual(Sites.objects.count(), 1)
+
+
+HEADER = ("EI Site ID", "Site Name", "Latitude", "Longitude", "Vendor", "risk_assessment", "zm", "security_type")
+
+
+def make_workbook(sheets):
+    """Classeur .xlsx (octets) d'une feuille par entrée de `sheets` (nom -> lignes, entête comprise)."""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets.items():
+        ws = wb.create_sheet(name)
+        for row in rows:
+            ws.append(list(row))
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+class SitesMultiSheetImportTests(TestCase):
+    url = "/api/sites/import-excel/?sync=1"
+    sheets = {
+        "Kinshasa": [
+            HEADER,
+            ("CD00001", "KASALA", -4.325, 15.322, "Global-Tech", None, None, "Guard"),
+            ("CD00002", "GOMBE", None, None, None, None, None, None),
+        ],
+        "Notes": [("Commentaire",), ("Fichier de test",)],
+        "Goma": [
+            HEADER,
+            ("CD00003", "BIRERE", -1.68, 29.22, None, None, None, None),
+            ("CD00001", "Doublon", None, None, None, None, None, None),
+            ("CD00004", "Hors limites", "-95", "15", None, None, None, None),
+        ],
+        "Vide": [],
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        Vendor.objects.create(vendor_id="V1", name="Global-Tech")
+
+    def test_imports_every_sheet(self):
+        upload = SimpleUploadedFile("sites.xlsx", make_workbook(self.sheets))
+        body = self.client.post(self.url, {"file": upload}).json()
+        self.assertEqual((body["processed"], body["created"], body["skipped"]), (5, 3, 1))
+        self.assertEqual(body["errors"], [
+            "[Notes] Colonne requise manquante: ei_site_id. Feuille ignorée.",
+            "[Goma] L4: Latitude invalide ('-95').",
+        ])
+        self.assertEqual(
+            sorted(Sites.objects.values_list("site_id", flat=True)), ["CD00001", "CD00002", "CD00003"]
+        )
+
+    def test_dry_run_report_has_sheets(self):
+        upload = SimpleUploadedFile("sites.xlsx", make_workbook(self.sheets))
+        body = self.client.post(self.url + "&dry_run=1", {"file": upload}).json()
+        self.assertIn("[Goma] L3: site_id 'CD00001' en double (feuille Kinshasa, ligne 2), ligne ignorée.", body["errors"])
+        lines = b"".join(self.client.get(body["error_report"]).streaming_content).decode().splitlines()
+        self.assertEqual(lines[1], "Notes,,Colonne requise manquante: ei_site_id. Feuille ignorée.")
+        self.assertEqual(lines[3], "Goma,4,Latitude invalide ('-95').")
+
+    def test_process_pool_reads_like_sequential(self):
+        with tempfile.NamedTemporaryFile(suffix=".xlsx") as f:
+            f.write(make_workbook(self.sheets))
+            f.flush()
+            sequential = [(sheet, header, list(rows)) for sheet, header, rows in read_workbook(f.name)]
+            parallel = [(sheet, header, list(rows)) for sheet, header, rows in read_workbook(f.name, workers=2)]
+        self.assertEqual(parallel, sequential)
+        self.assertEqual([sheet for sheet, _, _ in parallel], ["Kinshasa", "Notes", "Goma"])
+        self.assertEqual(parallel[2][2][0], ("CD00003", "BIRERE", -1.68, 29.22))
+
+    def test_corrupt_sheet_in_process_pool_is_an_import_error(self):
+        buf = BytesIO()
+        with zipfile.ZipFile(BytesIO(make_workbook(self.sheets))) as source, zipfile.ZipFile(buf, "w") as target:
+            for item in source.infolist():
+                data = source.read(item)
+                target.writestr(item, b"<worksheet" if item.filename == "xl/worksheets/sheet3.xml" else data)
+        with tempfile.NamedTemporaryFile(suffix=".xlsx") as f:
+            f.write(buf.getvalue())
+            f.flush()
+            with self.assertRaisesMessage(SitesImportError, "Lecture Excel impossible"):
+                for sheet, header, rows in read_workbook(f.name, workers=2):
+                    list(rows)
+
+    def test_single_sheet_is_not_labelled(self):
+        with tempfile.NamedTemporaryFile(suffix=".xlsx") as f:
+            f.write(make_workbook({"Sites": self.sheets["Kinshasa"]}))
+            f.flush()
+            [(sheet, header, rows)] = read_workbook(f.name, workers=2)
+            self.assertEqual((sheet, len(list(rows))), (None, 2))
+
+
+class WorkbookReaderTests(TestCase):
+    def test_openpyxl_internals_are_those_overridden(self):
+        self.assertEqual(openpyxl.__version__, OPENPYXL_VERSION, "sites/workbook.py à revalider pour cette version")
+        self.assertEqual(
+            list(inspect.signature(ReadOnlyWorksheet.__init__).parameters),
+            ["self", "parent_workbook", "title", "worksheet_path", "shared_strings"],
+        )
+        # Dimensions lues à l'ouverture de la feuille, puis par la lecture des lignes
+        self.assertIn("self._get_size()", inspect.getsource(ReadOnlyWorksheet.__init__))
+        for name in ("read", "read_manifest", "read_strings", "read_worksheets"):
+            self.assertTrue(callable(getattr(ExcelReader, name)), name)
+
+    def test_rows_are_read_past_declared_dimensions(self):
+        wb = Workbook()
+        for row in [HEADER, ("CD00001", "KASALA"), ("CD00002", "GOMBE")]:
+            wb.active.append(row)
+        source = BytesIO()
+        wb.save(source)
+        # Dimensions erronées (A1:B1) : openpyxl s'arrêterait à la première ligne
+        buf = BytesIO()
+        with zipfile.ZipFile(source) as archive, zipfile.ZipFile(buf, "w") as target:
+            for item in archive.infolist():
+                data = archive.read(item)
+                if item.filename == "xl/worksheets/sheet1.xml":
+                    data = re.sub(rb'<dimension ref="[^"]+"', b'<dimension ref="A1:B1"', data)
+                target.writestr(item, data)
+
+        workbook = ReadOnlyWorkbook(BytesIO(buf.getvalue()))
+        try:
+            rows = list(workbook.rows(workbook.sheet_names[0]))
+        finally:
+            workbook.close()
+        self.assertEqual(rows[1:], [("CD00001", "KASALA"), ("CD00002", "GOMBE")])
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class SitesTileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Sites.objects.bulk_create([
+            Sites(name="A", site_id="A", latitude=-4.305, longitude=15.30, vendor=Vendor.objects.create(name="V1"), security_type="Guard"),
+            Sites(name="B", site_id="B", latitude=-4.31, longitude=15.31, security_type="Guard"),
+            Sites(name="C", site_id="C", latitude=-4.32, longitude=15.32, security_type="Fence"),
+            Sites(name="L", site_id="L", latitude=-11.66, longitude=27.48),
+        ])
+
+    def test_low_zoom_returns_clusters(self):
+        tile = self.client.get("/api/sites/tiles/0/0/0/").json()
+        self.assertTrue(tile["clustered"])
+        self.assertEqual(sum(c["count"] for c in tile["clusters"]), 4)
+
+        # Tuile z=4 autour de Kinshasa : A, B et C dans une même cellule, L hors tuile
+        tile = self.client.get("/api/sites/tiles/4/8/8/").json()
+        self.assertEqual(len(tile["clusters"]), 1)
+        kinshasa = tile["clusters"][0]
+        self.assertEqual((kinshasa["count"], kinshasa["vendor_name"], kinshasa["security_type"]), (3, "V1", "Guard"))
+        self.assertAlmostEqual(kinshasa["latitude"], (-4.305 - 4.31 - 4.32) / 3)
+
+    def test_high_zoom_returns_sites(self):
+        # Tuile z=14 contenant A (15.30, -4.305) et B (15.31, -4.31)
+        tile = self.client.get("/api/sites/tiles/14/8888/8388/").json()
+        self.assertFalse(tile["clustered"])
+        self.assertEqual(sorted(s["site_id"] for s in tile["sites"]), ["A", "B"])
+
+    def test_tile_is_cached_until_sites_change(self):
+        url = "/api/sites/tiles/0/0/0/"
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/sites/import-excel/?sync=1", {"file": make_xlsx([("N", "New", -4.3, 15.3, None, None, None, None)])})
+        tile = self.client.get(url).json()
+        self.assertEqual(sum(c["count"] for c in tile["clusters"]), 5)
+
+    def test_invalid_tile(self):
+        self.assertEqual(self.client.get("/api/sites/tiles/2/4/0/").status_code, 400)
@@ -0,0 +1,86 @@
+from django.db.models import Count, F, IntegerField, Sum, Value
+from django.db.models.functions import Cast, Floor, Least
+
+from smdb.cache import versioned
+from .geo import bbox_q, tile_bbox
+from .models import Sites
+
+# À partir de ce zoom, la tuile contient les sites individuels
+CLUSTER_MAX_ZOOM = 13
+MAX_ZOOM = 22
+# Nombre de cellules de regroupement par côté de tuile
+GRID_SIZE = 8
+# Garde-fou pour les tuiles de sites individuels
+MAX_SITES_PER_TILE = 5000
+TILE_CACHE_TIMEOUT = 24 * 3600
+
+
+def get_tile(z, x, y):
+    """Contenu de la tuile z/x/y, mis en cache par génération de la table des sites."""
+    data, _ = versioned('sites', f"tile:{z}:{x}:{y}", lambda: build_tile(z, x, y), TILE_CACHE_TIMEOUT)
+    return data
+
+
+def build_tile(z, x, y):
+    min_lon, min_lat, max_lon, max_lat = tile_bbox(z, x, y)
+    queryset = Sites.objects.filter(bbox_q(min_lon, min_lat, max_lon, max_lat))
+    tile = {"z": z, "x": x, "y": y, "clustered": z < CLUSTER_MAX_ZOOM}
+
+    if not tile["clustered"]:
+        tile["sites"] = [
+            {
+                "id": str(row["id"]),
+                "site_id": row["site_id"],
+                "name": row["name"],
+                "latitude": row["latitude"],
+                "longitude": row["longitude"],
+                "vendor": str(row["vendor_id"]) if row["vendor_id"] else None,
+                "security_type": row["security_type"],
+            }
+            for row in queryset.values(
+                "id", "site_id", "name", "latitude", "longitude", "vendor_id", "security_type"
+            )[:MAX_SITES_PER_TILE]
+        ]
+        return tile
+
+    # Cellule (cx, cy) de la grille GRID_SIZE x GRID_SIZE, calculée par la base
+    cells = queryset.annotate(
+        cx=_cell(F("longitude") - min_lon, max_lon - min_lon),
+        cy=_cell(Value(max_lat) - F("latitude"), max_lat - min_lat),
+    )
+    clusters = {}
+    for row in cells.values("cx", "cy", "vendor_id", "vendor__name").annotate(
+        n=Count("id"), lat=Sum("latitude"), lon=Sum("longitude")
+    ):
+        cluster = clusters.setdefault((row["cx"], row["cy"]), {"count": 0, "lat": 0.0, "lon": 0.0, "vendors": [], "types": []})
+        cluster["count"] += row["n"]
+        cluster["lat"] += row["lat"]
+        cluster["lon"] += row["lon"]
+        if row["vendor_id"]:
+            cluster["vendors"].append((row["n"], str(row["vendor_id"]), row["vendor__name"]))
+    for row in cells.values("cx", "cy", "security_type").annotate(n=Count("id")):
+        if row["security_type"]:
+            clusters[(row["cx"], row["cy"])]["types"].append((row["n"], row["security_type"]))
+
+    tile["clusters"] = []
+    for cluster in clusters.values():
+        vendor = max(cluster["vendors"], default=(0, None, None))
+        security_type = max(cluster["types"], default=(0, None))
+        tile["clusters"].append({
+            "count": cluster["count"],
+            "latitude": cluster["lat"] / cluster["count"],
+            "longitude": cluster["lon"] / cluster["count"],
+            "vendor": vendor[1],
+            "vendor_name": vendor[2],
+            "security_type": security_type[1],
+        })
+    tile["clusters"].sort(key=lambda c: -c["count"])
+    return tile
+
+
+def _cell(offset, span):
+    # min(floor(offset / span * GRID_SIZE), GRID_SIZE - 1) : le bord max reste dans la dernière cellule
+    return Least(
+        Cast(Floor(offset * (GRID_SIZE / span)), IntegerField()),
+        Value(GRID_SIZE - 1),
+    )
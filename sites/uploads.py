@@ -0,0 +1,132 @@
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .importer import IMPORT_FORMATS
+from .models import ImportJob, ImportUpload
+
+UPLOAD_DIR = 'uploads'
+# Lecture du corps de la requête / du fichier assemblé par blocs (rien n'est gardé en mémoire)
+READ_SIZE = 1024 * 1024
+SHA256_RE = re.compile(r'[0-9a-f]{64}')
+
+
+class UploadError(Exception):
+    """Requête d'upload refusée -> `status` HTTP (409 : offset attendu dans `offset`)."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.offset = offset
+
+
+def part_name(upload):
+    """Nom (dans le stockage des fichiers déposés) du fichier en cours d'assemblage."""
+    return f"{UPLOAD_DIR}/{upload.id}.part"
+
+
+def create_upload(file_name, size):
+    if not file_name or not file_name.lower().endswith(IMPORT_FORMATS):
+        raise UploadError("Format non supporté. Utilise un .xlsx, .csv ou .csv.gz.")
+    if not 0 < size <= settings.IMPORT_UPLOAD_MAX_SIZE:
+        raise UploadError(f"Taille invalide (1 à {settings.IMPORT_UPLOAD_MAX_SIZE} octets).")
+    upload = ImportUpload.objects.create(file_name=file_name, size=size)
+    path = default_storage.path(part_name(upload))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return upload
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Écrit le morceau `stream` (`length` octets) à la position `offset` du
+    fichier, bloc par bloc, puis avance l'offset de l'upload.
+
+    L'offset attendu est vérifié avant l'écriture et de nouveau par un UPDATE
+    conditionnel après : aucun verrou n'est tenu pendant la lecture du réseau.
+    Un morceau interrompu (déconnexion) n'avance pas l'offset : le client le
+    renvoie depuis le même offset, ce qui réécrit les mêmes octets.
+    """
+    if upload.job_id:
+        raise UploadError("Upload déjà finalisé.", status=409, offset=upload.offset)
+    if offset != upload.offset:
+        raise UploadError("Offset inattendu.", status=409, offset=upload.offset)
+    if length <= 0 or offset + length > upload.size:
+        raise UploadError(f"Morceau invalide : {upload.size - offset} octets restants au plus.")
+
+    with open(default_storage.path(part_name(upload)), 'r+b') as f:
+        f.seek(offset)
+        remaining = length
+        while remaining:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                raise UploadError("Morceau incomplet.")
+            f.write(data)
+            remaining -= len(data)
+
+    updated = ImportUpload.objects.filter(id=upload.id, offset=offset, job=None).update(
+        offset=offset + length, updated_at=timezone.now()
+    )
+    upload.refresh_from_db()
+    if not updated:
+        # Morceau envoyé deux fois en parallèle : l'autre requête l'a déjà enregistré
+        raise UploadError("Offset inattendu.", status=409, offset=upload.offset)
+    return upload
+
+
+def complete_upload(upload, sha256, dry_run=False, on_conflict=ImportJob.SKIP):
+    """
+    Confie le fichier complet (sans copie) à un ImportJob traité par
+    `process_import_jobs`, qui vérifie son SHA-256 (`sha256`) avant l'import :
+    le fichier entier n'est pas relu pendant la requête. Retourne (job, créé) :
+    une finalisation répétée renvoie le même job.
+    """
+    if upload.job_id:
+        return upload.job, False
+    if upload.offset != upload.size:
+        raise UploadError(f"Upload incomplet : {upload.offset} octets reçus sur {upload.size}.", status=409, offset=upload.offset)
+    sha256 = (sha256 or '').strip().lower()
+    if not SHA256_RE.fullmatch(sha256):
+        raise UploadError("Somme de contrôle SHA-256 attendue (64 caractères hexadécimaux).")
+
+    with transaction.atomic():
+        upload = ImportUpload.objects.select_for_update().get(id=upload.id)
+        if upload.job_id:
+            return upload.job, False
+        upload.job = ImportJob.objects.create(
+            file=part_name(upload), file_name=upload.file_name, sha256=sha256, dry_run=dry_run, on_conflict=on_conflict
+        )
+        upload.save(update_fields=['job', 'updated_at'])
+    return upload.job, True
+
+
+def delete_upload(upload):
+    """Abandonne un upload non finalisé (le fichier d'un upload finalisé appartient au job)."""
+    if not upload.job_id:
+        default_storage.delete(part_name(upload))
+    upload.delete()
+
+
+def purge_uploads():
+    """
+    Supprime les uploads non finalisés sans nouveau morceau depuis
+    IMPORT_UPLOAD_EXPIRY_HOURS, et ceux dont l'import est terminé, avec leurs
+    octets : le worker supprime le fichier en fin de job, mais un job marqué en
+    échec après l'arrêt de son worker (`fail_stale_jobs`) le laisse sur le
+    disque. Retourne (expirés, terminés).
+    """
+    expired = timezone.now() - timedelta(hours=settings.IMPORT_UPLOAD_EXPIRY_HOURS)
+    uploads = list(ImportUpload.objects.filter(job=None, updated_at__lt=expired))
+    for upload in uploads:
+        delete_upload(upload)
+    finished = list(ImportUpload.objects.filter(job__status__in=[ImportJob.DONE, ImportJob.FAILED]))
+    for upload in finished:
+        default_storage.delete(part_name(upload))
+        upload.delete()
+    return len(uploads), len(finished)
@@ -4,7 +4,21 @@ from . import api
 
 urlpatterns = [
     path('create/', api.create_site, name='create_site'),
+    path('bulk-create/', api.bulk_create_sites, name='bulk_create_sites'),
     path('import-excel/', api.import_sites_excel, name='import_sites_excel'),
+    path('import-jobs/<uuid:job_id>/', api.get_import_job, name='get_import_job'),
+    path('import-jobs/<uuid:job_id>/errors/', api.get_import_job_errors, name='get_import_job_errors'),
+    path('uploads/create/', api.create_import_upload, name='create_import_upload'),
+    path('uploads/<uuid:upload_id>/', api.get_import_upload, name='get_import_upload'),
+    path('uploads/<uuid:upload_id>/chunk/', api.append_import_upload_chunk, name='append_import_upload_chunk'),
+    path('uploads/<uuid:upload_id>/complete/', api.complete_import_upload, name='complete_import_upload'),
+    path('uploads/<uuid:upload_id>/delete/', api.delete_import_upload, name='delete_import_upload'),
     path('all/', api.get_all_sites, name='get_all_sites'),
+    path('export/', api.export_sites, name='export_sites'),
+    path('sync/', api.sync_sites, name='sync_sites'),
+    path('stats/', api.get_sites_stats, name='get_sites_stats'),
+    path('nearby/', api.get_nearby_sites, name='get_nearby_sites'),
+    path('search/', api.search_sites, name='search_sites'),
+    path('tiles/<int:z>/<int:x>/<int:y>/', api.get_sites_tile, name='get_sites_tile'),
     
 ]
\ No newline at end of file
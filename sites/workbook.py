@@ -0,0 +1,108 @@
+"""
+Lecture en flux des feuilles d'un classeur .xlsx (openpyxl, lecture seule).
+
+Ce module n'importe pas Django : il est chargé par les processus de lecture
+de `read_workbook` (démarrés en `spawn`, sans copie de l'état ni des
+connexions du processus web).
+
+Deux coûts d'openpyxl sont évités :
+- `load_workbook` ouvre toutes les feuilles, et analyse chacune en entier
+  lorsqu'elle ne déclare pas ses dimensions (fichiers produits par openpyxl
+  en `write_only`, par exemple) : ici seule la feuille lue est ouverte, et
+  ses lignes sont lues sans bornes ;
+- chaque processus de lecture relirait la table des chaînes partagées de
+  tout le classeur : ils renvoient l'index des chaînes (`SharedString`),
+  résolu par le processus principal (`resolve_rows`) qui lit la table une
+  seule fois.
+"""
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+
+# Version d'openpyxl (épinglée dans requirements.txt) dont les méthodes internes
+# sont remplacées ici : `ExcelReader.read_worksheets`, `ReadOnlyWorksheet._get_size`.
+# Les tests échouent sur une autre version, à revalider avant de monter de version.
+OPENPYXL_VERSION = "3.1.5"
+
+
+class SharedString(int):
+    """Index d'une cellule texte dans la table des chaînes partagées."""
+
+
+class _StringIndex:
+    def __getitem__(self, index):
+        return SharedString(index)
+
+
+class _Reader(ExcelReader):
+    def __init__(self, f, shared_strings=True):
+        super().__init__(f, read_only=True, data_only=True)
+        self.with_strings = shared_strings
+
+    def read_strings(self):
+        if self.with_strings:
+            super().read_strings()
+        else:
+            self.shared_strings = _StringIndex()
+
+    def read_worksheets(self):
+        # Feuilles de calcul (nom, chemin dans l'archive), ouvertes à la demande
+        self.sheets = {
+            sheet.name: rel.target
+            for sheet, rel in self.parser.find_sheets()
+            if rel.target in self.valid_files and "chartsheet" not in rel.Type
+        }
+
+
+class _Sheet(ReadOnlyWorksheet):
+    def _get_size(self):
+        # Lignes lues sans bornes : une ligne s'arrête à sa dernière cellule
+        # renseignée, une ligne absente du fichier est vide
+        pass
+
+
+class ReadOnlyWorkbook:
+    """
+    Classeur .xlsx (chemin ou fichier) ouvert en lecture seule. Avec
+    `shared_strings=False`, les cellules texte sont lues sous forme de
+    `SharedString`.
+    """
+
+    def __init__(self, f, shared_strings=True):
+        self._reader = _Reader(f, shared_strings)
+        self._reader.read()
+        self.sheet_names = list(self._reader.sheets)
+
+    def rows(self, sheet_name):
+        """Itérateur des lignes (valeurs) de la feuille `sheet_name`."""
+        reader = self._reader
+        sheet = _Sheet(reader.wb, sheet_name, reader.sheets[sheet_name], reader.shared_strings)
+        return sheet.iter_rows(values_only=True)
+
+    def close(self):
+        self._reader.wb.close()
+
+
+def sheet_rows(path, sheet_name):
+    """Toutes les lignes de la feuille `sheet_name`, chaînes partagées sous forme d'index."""
+    wb = ReadOnlyWorkbook(path, shared_strings=False)
+    try:
+        return list(wb.rows(sheet_name))
+    finally:
+        wb.close()
+
+
+def shared_strings(path):
+    """Table des chaînes partagées du classeur `path`."""
+    reader = ExcelReader(path, read_only=True, data_only=True)
+    try:
+        reader.read_manifest()
+        reader.read_strings()
+    finally:
+        reader.archive.close()
+    return reader.shared_strings
+
+
+def resolve_rows(rows, strings):
+    """Lignes de `sheet_rows` avec leurs chaînes partagées."""
+    for row in rows:
+        yield tuple(strings[value] if type(value) is SharedString else value for value in row)
@@ -0,0 +1,67 @@
+import json
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Filet de sécurité pour les listes de référence modifiées hors API (admin, shell)
+REFERENCE_CACHE_TIMEOUT = 3600
+
+# Compteurs hit/miss par jeu de données, propres à chaque processus (aucune écriture dans le cache)
+_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+_stats_lock = threading.Lock()
+
+
+def _generation_key(name):
+    return f"generation:{name}"
+
+
+def get_generation(name):
+    """
+    Compteur de génération d'un jeu de données (ex: 'sites'). Toute clé de cache
+    qui l'inclut devient obsolète dès que `bump_generation(name)` est appelé.
+    """
+    key = _generation_key(name)
+    value = cache.get(key)
+    if value is None:
+        # Valeur initiale unique : un compteur perdu (éviction, redémarrage)
+        # ne peut pas faire ressortir d'anciennes entrées
+        cache.add(key, time.time_ns(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def bump_generation(name):
+    key = _generation_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def versioned(name, key, build, timeout=None):
+    """
+    Valeur mise en cache sous la génération courante de `name` : `build()` n'est
+    appelé qu'en cas d'absence (miss). Retourne (valeur, hit).
+    """
+    full_key = f"{name}:{get_generation(name)}:{key}"
+    value = cache.get(full_key)
+    hit = value is not None
+    if not hit:
+        value = build()
+        cache.set(full_key, value, timeout)
+    with _stats_lock:
+        _stats[name]["hits" if hit else "misses"] += 1
+    return value, hit
+
+
+def versioned_json(name, key, build, timeout=None):
+    """Comme `versioned`, pour des données JSON : le cache conserve directement les octets sérialisés."""
+    return versioned(name, key, lambda: json.dumps(build(), cls=DjangoJSONEncoder).encode(), timeout)
+
+
+def cache_stats():
+    with _stats_lock:
+        return {name: dict(counts) for name, counts in _stats.items()}
@@ -0,0 +1,57 @@
+import hashlib
+
+from django.db.models import Max
+from django.views.decorators.http import condition
+
+from .cache import get_generation
+
+
+def _latest(model, field):
+    return model.objects.aggregate(last=Max(field))['last']
+
+
+def table_state(request, name, model, changed_at='created_at', deletions=None):
+    """
+    État de la table `model` pour cette requête : (ETag, Last-Modified).
+
+    Last-Modified est la date de la dernière écriture connue : le plus récent
+    `changed_at` de la table (`created_at` si les lignes ne sont jamais
+    modifiées, `updated_at` sinon) et, avec `deletions` = (modèle, champ), la
+    plus récente trace de suppression. L'ETag combine le compteur de
+    génération `name` (écritures via l'API et imports), le nombre de lignes,
+    cette date (écritures hors API), plus la query string dont dépend le
+    contenu de la réponse. Mémorisé sur la requête HTTP.
+
+    Chaque agrégat est une requête distincte qui lit un index : réunis dans un
+    même SELECT, SQLite parcourt toute la table (~35 ms au lieu de <1 ms pour
+    200 000 sites).
+    """
+    cached = getattr(request, '_table_state', None)
+    if cached is None:
+        count = model.objects.count()
+        dates = [_latest(model, changed_at)]
+        if deletions is not None:
+            dates.append(_latest(*deletions))
+        last = max((date for date in dates if date is not None), default=None)
+        parts = [name, get_generation(name), count, last.isoformat() if last else '', request.GET.urlencode()]
+        digest = hashlib.sha256('|'.join(map(str, parts)).encode()).hexdigest()[:32]
+        cached = request._table_state = (f'"{digest}"', last)
+    return cached
+
+
+def conditional_list(name, model, changed_at='created_at', deletions=None):
+    """
+    GET conditionnel (If-None-Match / If-Modified-Since) pour une liste : si la
+    table n'a pas changé, la réponse est `304 Not Modified` sans exécuter la vue
+    (ni requête de liste, ni sérialisation). Voir `table_state` pour
+    `changed_at` et `deletions`.
+
+    À placer au-dessus de `@api_view`.
+    """
+    def state(request, *args, **kwargs):
+        return table_state(request, name, model, changed_at, deletions)
+
+    return condition(
+        etag_func=lambda request, *args, **kwargs: state(request)[0],
+        last_modified_func=lambda request, *args, **kwargs: state(request)[1],
+    )
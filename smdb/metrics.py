@@ -0,0 +1,182 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+# Bornes supérieures des histogrammes (secondes / nombre de requêtes SQL)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """
+    Mesures d'une requête HTTP : nombre et durée des requêtes SQL (wrapper
+    d'exécution de chaque connexion), temps de sérialisation, latence totale.
+    """
+
+    __slots__ = ("started", "queries", "sql", "serialize")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.serialize = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - start
+            self.queries += 1
+
+
+@contextmanager
+def timed(phase="serialize"):
+    """
+    Ajoute la durée du bloc à la phase `phase` de la requête HTTP en cours
+    (sans effet hors requête ou si le middleware est absent).
+    """
+    metrics = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            setattr(metrics, phase, getattr(metrics, phase) + time.perf_counter() - start)
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        # labels -> [compte par borne..., +Inf], somme
+        self.series = {}
+
+    def observe(self, labels, value):
+        counts, total = self.series.get(labels) or ([0] * (len(self.buckets) + 1), 0)
+        counts[bisect_left(self.buckets, value)] += 1
+        self.series[labels] = counts, total + value
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in sorted(self.series.items()):
+            base = _labels(labels)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}'
+            yield f"{self.name}_sum{{{base}}} {round(total, 6)}"
+            yield f"{self.name}_count{{{base}}} {cumulative}"
+
+
+def _labels(labels):
+    return ",".join(f'{name}="{value}"' for name, value in labels)
+
+
+# Registre propre à chaque processus (chaque worker gunicorn expose ses propres compteurs)
+_lock = threading.Lock()
+_requests_total = {}
+_histograms = {
+    "duration": Histogram("smdb_http_request_duration_seconds", "Latence totale de la requête HTTP.", DURATION_BUCKETS),
+    "sql": Histogram("smdb_http_request_sql_seconds", "Temps passé dans les requêtes SQL.", DURATION_BUCKETS),
+    "queries": Histogram("smdb_http_request_queries", "Nombre de requêtes SQL par requête HTTP.", QUERY_BUCKETS),
+    "serialize": Histogram(
+        "smdb_http_request_serialize_seconds", "Temps de sérialisation et de rendu de la réponse.", DURATION_BUCKETS
+    ),
+}
+
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    # Gabarit d'URL (api/sites/<uuid:site_id>/...) : un nombre borné de séries
+    return match.route if match is not None else "unmatched"
+
+
+def observe(request, response, metrics, total):
+    labels = (("route", _route(request)), ("method", request.method))
+    with _lock:
+        key = (*labels, ("status", str(response.status_code)))
+        _requests_total[key] = _requests_total.get(key, 0) + 1
+        _histograms["duration"].observe(labels, total)
+        _histograms["sql"].observe(labels, metrics.sql)
+        _histograms["queries"].observe(labels, metrics.queries)
+        _histograms["serialize"].observe(labels, metrics.serialize)
+
+
+def render_metrics():
+    """Compteurs et histogrammes du processus au format texte de Prometheus."""
+    with _lock:
+        lines = [
+            "# HELP smdb_http_requests_total Requêtes HTTP traitées.",
+            "# TYPE smdb_http_requests_total counter",
+        ]
+        lines += [f"smdb_http_requests_total{{{_labels(key)}}} {count}" for key, count in sorted(_requests_total.items())]
+        for histogram in _histograms.values():
+            lines += histogram.lines()
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics():
+    with _lock:
+        _requests_total.clear()
+        for histogram in _histograms.values():
+            histogram.series.clear()
+
+
+class RequestMetricsMiddleware:
+    """
+    Instrumente chaque requête : nombre de requêtes SQL, temps SQL, temps de
+    sérialisation (blocs `timed()` et rendu des réponses DRF) et latence totale.
+
+    Les mesures sont renvoyées dans l'en-tête `Server-Timing` et agrégées par
+    route dans des histogrammes exposés par `api/metrics/`. Coût : un wrapper
+    d'exécution par connexion et quelques `perf_counter()` par requête SQL,
+    sans `DEBUG` ni journal des requêtes.
+
+    Les phases se recouvrent : une requête SQL lancée pendant la sérialisation
+    compte dans les deux. Pour une réponse en streaming (exports), la latence
+    s'arrête à l'envoi des en-têtes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - metrics.started
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={metrics.sql * 1000:.1f};desc="{metrics.queries} queries"',
+            f"serialize;dur={metrics.serialize * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+        observe(request, response, metrics, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # Rendu (JSON...) d'une réponse DRF : effectué par Django après la vue
+        metrics = _current.get()
+        if metrics is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                metrics.serialize += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
@@ -85,6 +85,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Nombre / durée des requêtes SQL, sérialisation et latence : en-tête Server-Timing et api/metrics/
+    "smdb.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     'corsheaders.middleware.CorsMiddleware',
@@ -193,6 +195,55 @@ INSTALLED_APPS += ["whitenoise.runserver_nostatic"]
 MIDDLEWARE = ["whitenoise.middleware.WhiteNoiseMiddleware", *MIDDLEWARE]
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
+# Fichiers déposés (imports de sites en attente de traitement)
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Uploads par morceaux (api/sites/uploads/) : taille maximale d'un fichier, et délai au-delà
+# duquel un upload non finalisé est supprimé (par le worker `process_import_jobs`)
+IMPORT_UPLOAD_MAX_SIZE = int(os.getenv("IMPORT_UPLOAD_MAX_SIZE", 2 * 1024**3))
+IMPORT_UPLOAD_EXPIRY_HOURS = int(os.getenv("IMPORT_UPLOAD_EXPIRY_HOURS", 24))
+
+# Durée sans progression au-delà de laquelle un import en cours est considéré abandonné
+# (worker arrêté) et marqué en échec
+IMPORT_JOB_TIMEOUT_MINUTES = int(os.getenv("IMPORT_JOB_TIMEOUT_MINUTES", 120))
+
+# Processus de lecture des classeurs importés par le worker `process_import_jobs` (une feuille
+# par processus) ; 1 : lecture dans le processus. Les imports `sync=1` lisent dans la requête.
+IMPORT_PARSE_WORKERS = int(os.getenv("IMPORT_PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Lignes au plus d'un import `sync=1` (une seule transaction, qui doit être validée avant que la
+# synchronisation incrémentale ne dépasse ses horodatages : sites.sync.SETTLE_SECONDS)
+IMPORT_SYNC_MAX_ROWS = int(os.getenv("IMPORT_SYNC_MAX_ROWS", 5_000))
+
+# Statistiques du tableau de bord lues dans le résumé matérialisé (table sites_sitesstat,
+# tenue à jour à chaque création / import / suppression) ; False : calculées à chaque appel
+SITES_STATS_SUMMARY = os.getenv("SITES_STATS_SUMMARY", "1") == "1"
+
+# Cache (tuiles de sites, listes de référence) : CACHE_BACKEND = file | locmem | redis
+# - file (défaut) : partagé par tous les workers gunicorn d'une même machine
+# - locmem : propre à chaque processus (dev / tests)
+# - redis : REDIS_URL, partagé entre machines (nécessite le paquet `redis`)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "file")
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL", "redis://127.0.0.1:6379/1"),
+        }
+    }
+elif CACHE_BACKEND == "locmem":
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_LOCATION", BASE_DIR / "cache"),
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
+from . import views
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
@@ -14,6 +15,8 @@ urlpatterns = [
     path('api/vendor/', include('vendor.urls')),
     path('api/sites/', include('sites.urls')),
     path('api/risk-assessment/', include('risk_assessment.urls')),
+    path('api/cache/stats/', views.get_cache_stats, name='cache_stats'),
+    path('api/metrics/', views.get_metrics, name='metrics'),
     # path("api/vendor", include("vendor.urls")),
     path("admin/", admin.site.urls),
 ]
@@ -0,0 +1,40 @@
+from django.http import HttpResponse
+from drf_spectacular.utils import extend_schema, OpenApiResponse
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.response import Response
+
+from .cache import cache_stats
+from .metrics import render_metrics
+
+
+@extend_schema(
+    tags=["cache"],
+    summary="Statistiques du cache",
+    description=(
+        "Nombre de hits / misses par jeu de données (`vendors`, `risk_assessments`, `sites`) "
+        "depuis le démarrage du processus qui répond."
+    ),
+    responses={200: OpenApiResponse(description="Compteurs par jeu de données")},
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def get_cache_stats(request):
+    return Response(cache_stats())
+
+
+@extend_schema(
+    tags=["metrics"],
+    summary="Métriques des requêtes HTTP (Prometheus)",
+    description=(
+        "Format texte de Prometheus : nombre de requêtes par route, méthode et statut, et "
+        "histogrammes par route de la latence totale, du temps SQL, du nombre de requêtes SQL "
+        "et du temps de sérialisation, depuis le démarrage du processus qui répond."
+    ),
+    responses={200: OpenApiResponse(description="Métriques au format texte Prometheus")},
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def get_metrics(request):
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")